@@ -1,3 +1,48 @@
-from django.test import TestCase
+from django.test import override_settings
 
-# Create your tests here.
+from buyhive_backend.testing import QueryBudgetTestCase, make_user, make_address
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AccountsQueryBudgetTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user(password='Str0ng-pass!')
+        cls.addresses = [make_address(cls.user) for _ in range(25)]
+
+    def test_register(self):
+        self.assertQueryBudget(3, 'post', 'user-register', data={
+            'email': 'new@example.com', 'first_name': 'New', 'last_name': 'User',
+            'password': 'Str0ng-pass!', 'password2': 'Str0ng-pass!',
+        }, expected_status=201)
+
+    def test_profile(self):
+        self.assertQueryBudget(1, 'get', 'user-profile', user=self.user, expected_status=200)
+        self.assertQueryBudget(2, 'patch', 'user-profile', user=self.user,
+                               data={'first_name': 'Renamed'}, expected_status=200)
+
+    def test_address_list(self):
+        self.assertQueryBudget(2, 'get', 'address-list', user=self.user, expected_status=200)
+
+    def test_address_crud(self):
+        address = self.addresses[0]
+        self.assertQueryBudget(1, 'get', 'address-detail', args=[address.pk],
+                               user=self.user, expected_status=200)
+        self.assertQueryBudget(2, 'patch', 'address-detail', args=[address.pk],
+                               user=self.user, data={'city': 'Elsewhere'}, expected_status=200)
+        self.assertQueryBudget(1, 'post', 'address-list', user=self.user, data={
+            'street_address': '2 Test Street', 'city': 'Testville', 'state': 'TS',
+            'zip_code': '00000', 'country': 'Testland', 'address_type': 'billing',
+        }, expected_status=201)
+        self.assertQueryBudget(2, 'delete', 'address-detail', args=[address.pk],
+                               user=self.user, expected_status=204)
+
+    def test_token_obtain_and_refresh(self):
+        response = self.assertQueryBudget(2, 'post', 'token_obtain_pair', data={
+            'email': self.user.email, 'password': 'Str0ng-pass!',
+        }, expected_status=200)
+        self.assertQueryBudget(1, 'post', 'token_refresh', data={
+            'refresh': response.data['refresh'],
+        }, expected_status=200)
@@ -2,6 +2,9 @@
 
 from rest_framework import generics, permissions, viewsets
 from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.views import TokenObtainPairView
+from apps.orders.guest_cart import GuestCart, merge_guest_cart
 from .models import User, UserProfile, Address
 from .serializers import UserRegisterSerializer, UserSerializer, AddressSerializer
 
@@ -36,3 +39,19 @@ class AddressViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         # This automatically assigns the current user to the address being created
         serializer.save(user=self.request.user)
+
+class LoginView(TokenObtainPairView):
+    """
+    Issue a JWT pair, and move any cart the visitor built as a guest into
+    their account's cart.
+    """
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        guest_cart = GuestCart(request)
+        merge_guest_cart(guest_cart, serializer.user)
+        return guest_cart.save(Response(serializer.validated_data))
@@ -1,7 +1,8 @@
 # apps/orders/admin.py
 
 from django.contrib import admin
-from .models import Cart, CartItem, Order, OrderItem
+from .models import ArchivedOrder, Cart, CartItem, CheckoutJob, Order, OrderItem, OrderStatusEvent, VendorDailySales
+from .transitions import record_status_change
 
 # Inlines for easier management of related items
 class CartItemInline(admin.TabularInline):
@@ -14,6 +15,12 @@ class OrderItemInline(admin.TabularInline):
     extra = 0
     readonly_fields = ('product', 'variant', 'quantity', 'price_at_purchase')
 
+class OrderStatusEventInline(admin.TabularInline):
+    model = OrderStatusEvent
+    extra = 0
+    can_delete = False
+    readonly_fields = ('from_status', 'to_status', 'actor', 'created_at')
+
 # Register Cart and CartItem
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
@@ -34,7 +41,7 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ('order_id', 'customer', 'vendor', 'total_amount', 'status', 'payment_status', 'created_at')
     list_filter = ('status', 'payment_status', 'vendor', 'created_at')
     search_fields = ('order_id', 'customer__email', 'vendor__business_name')
-    inlines = [OrderItemInline]
+    inlines = [OrderItemInline, OrderStatusEventInline]
     readonly_fields = ('order_id', 'customer', 'vendor', 'total_amount', 'shipping_address_text', 
                        'payment_method', 'payment_status', 'transaction_id', 'created_at', 'updated_at')
     fieldsets = (
@@ -48,9 +55,45 @@ class OrderAdmin(admin.ModelAdmin):
             'fields': ('shipping_address_text',)
         }),
     )
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and 'status' in form.changed_data:  # Same history, event and rollup update as the API
+            record_status_change(obj, form.initial['status'], actor=request.user)
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ('order', 'product', 'variant', 'quantity', 'price_at_purchase', 'get_total')
     search_fields = ('order__order_id', 'product__title')
     list_filter = ('order',)
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ('order_id', 'customer', 'vendor', 'total_amount', 'status', 'created_at', 'archived_at')
+    list_filter = ('status', 'vendor')
+    search_fields = ('order_id', 'customer__email', 'vendor__business_name')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(CheckoutJob)
+class CheckoutJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('id', 'user__email')
+    readonly_fields = ('lease_token', 'order_pks', 'created_at', 'finished_at')
+
+@admin.register(VendorDailySales)
+class VendorDailySalesAdmin(admin.ModelAdmin):
+    list_display = ('vendor', 'day', 'orders', 'units', 'gross_revenue')
+    list_filter = ('vendor',)
+    date_hierarchy = 'day'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,146 @@
+# apps/orders/archive.py
+"""
+Hot/cold order storage.
+
+Orders that reached a final status and are older than ORDER_HOT_WINDOW are
+moved, in chunks, from Order/OrderItem into ArchivedOrder, which keeps the
+order's id and a JSON snapshot of its items. The hot tables and their indexes
+then only grow with recent and still-open orders. Order history reads the
+archive only when the requested date range starts before the hot window and
+the page being read runs past it.
+"""
+import heapq
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import ArchivedOrder, Order, OrderItem
+
+ARCHIVABLE_STATUSES = ('delivered', 'cancelled', 'refunded')
+
+
+def hot_cutoff(now=None):
+    """Orders created before this may have been archived."""
+    return (now or timezone.now()) - settings.ORDER_HOT_WINDOW
+
+
+def reaches_archive(date_from):
+    """Whether a date range starting at ``date_from`` (None: unbounded) can include archived orders."""
+    return date_from is None or date_from < hot_cutoff()
+
+
+def archive_orders(cutoff=None, batch_size=500):
+    """
+    Move archivable orders created before ``cutoff`` (default: the hot window)
+    into ArchivedOrder, ``batch_size`` orders per transaction. Returns the
+    number of orders archived.
+    """
+    cutoff = cutoff or hot_cutoff()
+    items = OrderItem.objects.select_related('product', 'variant').order_by('pk')
+    archived = 0
+    while True:
+        with transaction.atomic():
+            orders = list(
+                Order.objects.select_for_update()
+                .filter(status__in=ARCHIVABLE_STATUSES, created_at__lt=cutoff)
+                .order_by('pk')
+                .prefetch_related(Prefetch('items', queryset=items))[:batch_size]
+            )
+            if not orders:
+                return archived
+            ArchivedOrder.objects.bulk_create([snapshot(order) for order in orders])
+            order_ids = [order.pk for order in orders]
+            OrderItem.objects.filter(order_id__in=order_ids).delete()
+            Order.objects.filter(pk__in=order_ids).delete()
+        archived += len(orders)
+
+
+def snapshot(order):
+    return ArchivedOrder(
+        id=order.pk,
+        customer_id=order.customer_id,
+        vendor_id=order.vendor_id,
+        order_id=order.order_id,
+        total_amount=order.total_amount,
+        status=order.status,
+        shipping_address_text=order.shipping_address_text,
+        payment_method=order.payment_method,
+        payment_status=order.payment_status,
+        transaction_id=order.transaction_id,
+        tracking_number=order.tracking_number,
+        estimated_delivery=order.estimated_delivery,
+        items_data=[
+            {
+                'product_id': item.product_id,
+                'product_title': item.product.title,
+                'variant_id': item.variant_id,
+                'variant_name': item.variant.name if item.variant else None,
+                'quantity': item.quantity,
+                'price_at_purchase': str(item.price_at_purchase),
+            }
+            for item in order.items.all()
+        ],
+        created_at=order.created_at,
+        updated_at=order.updated_at,
+    )
+
+
+class OrderHistory:
+    """
+    Hot and archived orders as one sequence, newest first unless reordered
+    (all fields in one direction), that the cursor paginators can filter and
+    slice. Every archived order is older than hot_cutoff(), so a newest-first
+    page whose hot rows fill it without reaching back that far is read from
+    the hot table alone, in one query. Only a page that runs past the cutoff
+    also reads the archive, with one more query, and merges the two.
+    """
+    ordered = True
+
+    def __init__(self, hot, archived, ordering=('-created_at', '-pk')):
+        self.ordering = tuple(ordering)
+        self.hot = hot.order_by(*self.ordering)
+        self.archived = archived.order_by(*self.ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        self.reverse = self.ordering[0].startswith('-')
+        self.cutoff = hot_cutoff()
+
+    def order_by(self, *ordering):
+        return OrderHistory(self.hot, self.archived, ordering)
+
+    def filter(self, *args, **kwargs):
+        return OrderHistory(self.hot.filter(*args, **kwargs), self.archived.filter(*args, **kwargs), self.ordering)
+
+    def count(self):
+        return self.hot.count() + self.archived.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        # Cursor pages start at or near the top, so both sides are read from the top
+        rows = list(self.hot[:index.stop])
+        if (self.ordering[0] == '-created_at' and index.stop is not None and len(rows) == index.stop
+                and field_value(rows[-1], 'created_at') >= self.cutoff):
+            return rows[index]
+        rows += self.archived[:index.stop]
+        return sorted(rows, key=self.sort_key, reverse=self.reverse)[index]
+
+    def iterator(self, chunk_size=2000):
+        return heapq.merge(
+            self.hot.iterator(chunk_size=chunk_size), self.archived.iterator(chunk_size=chunk_size),
+            key=self.sort_key, reverse=self.reverse,
+        )
+
+    def sort_key(self, row):
+        return [field_value(row, field) for field in self.fields]
+
+
+def field_value(row, field):
+    """``field`` of a model instance or of a .values() row (which has ``id`` for ``pk``)."""
+    if isinstance(row, dict):
+        return row['id' if field == 'pk' else field]
+    return getattr(row, field)
@@ -0,0 +1,201 @@
+# apps/orders/checkout.py
+"""
+Turning a cart into orders. Used by CheckoutView for synchronous checkouts and
+by the checkout job worker (apps/orders/jobs.py) for queued ones.
+"""
+import uuid
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
+from apps.outbox.events import event, publish
+from apps.products.alerts import sync_low_stock
+from apps.products.inventory import exact_available
+from apps.products.models import InventoryMovement, ProductVariant
+from apps.vendors.analytics import invalidate_analytics
+from .models import EMPTY_CART_SUMMARY, Cart, CartItem, Order, OrderItem, StockReservation
+from .reservations import convert_holds
+from .sales import record_orders
+
+
+class OutOfStock(Exception):
+    """A cart line could no longer be fulfilled; the checkout was rolled back."""
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class CartLine(NamedTuple):
+    """A cart item flattened to the plain values checkout needs."""
+    item_id: int
+    cart_id: int
+    product_id: int
+    product_title: str
+    variant_id: Optional[int]
+    vendor_id: int
+    quantity: int
+    unit_price: Decimal
+
+    @property
+    def total(self):
+        return self.unit_price * self.quantity
+
+
+def snapshot_cart(user):
+    """
+    Read the user's cart once. Returns a tuple of CartLine records and a
+    {vendor id: VendorProfile} dict for the vendors they belong to.
+    """
+    lines, vendors = [], {}
+    items = CartItem.objects.filter(cart__user=user).select_related('product__vendor', 'variant')
+    for item in items:
+        product, variant = item.product, item.variant
+        vendors[product.vendor_id] = product.vendor
+        lines.append(CartLine(
+            item_id=item.pk,
+            cart_id=item.cart_id,
+            product_id=product.pk,
+            product_title=product.title,
+            variant_id=item.variant_id,
+            vendor_id=product.vendor_id,
+            quantity=item.quantity,
+            unit_price=product.base_price + (variant.price_modifier if variant else 0),
+        ))
+    return tuple(lines), vendors
+
+
+def dump_cart_lines(cart_lines):
+    """``cart_lines`` as JSON-ready dicts, for keeping with a queued checkout."""
+    return [dict(line._asdict(), unit_price=str(line.unit_price)) for line in cart_lines]
+
+
+def load_cart_lines(data):
+    """The CartLine records saved by dump_cart_lines."""
+    return tuple(CartLine(**dict(line, unit_price=Decimal(line['unit_price']))) for line in data)
+
+
+def find_shortage(cart_lines):
+    """Describe the first cart line that cannot be fulfilled, or return None if all can."""
+    # Holds on this cart's own lines count as available to it
+    held = dict(
+        StockReservation.objects.filter(
+            cart_item_id__in=[line.item_id for line in cart_lines]
+        ).values_list('variant_id', 'quantity')
+    )
+    available = exact_available(
+        ProductVariant.objects.filter(
+            pk__in=[line.variant_id for line in cart_lines if line.variant_id]
+        ).only('stock', 'reserved', 'shard_count')
+    )
+    stock = {variant_id: units + held.get(variant_id, 0) for variant_id, units in available.items()}
+    for line in cart_lines:
+        if line.variant_id and line.quantity > stock.get(line.variant_id, 0):
+            return _("Not enough stock for {title}. Available: {stock}").format(
+                title=line.product_title, stock=stock.get(line.variant_id, 0)
+            )
+    return None
+
+
+def stock_shortage_message(cart_lines):
+    """Describe the first cart line that can no longer be fulfilled after a failed checkout."""
+    return find_shortage(cart_lines) or _('Some items in your cart are no longer available.')
+
+
+def format_address(address):
+    return (
+        f"{address.street_address}"
+        + (f", {address.apartment_address}" if address.apartment_address else "")
+        + f", {address.city}, {address.state}, {address.zip_code}, {address.country}"
+    )
+
+
+def place_orders(user, cart_lines, vendors, shipping_address_text, payment_method):
+    """
+    Create one order per vendor from ``cart_lines`` (see snapshot_cart), turn
+    the cart's stock holds into sales, open low-stock alerts for variants that
+    ran low, publish order.created and empty the cart, all in one transaction (a savepoint when called inside another).
+    Returns the created orders; raises OutOfStock, with nothing written, when
+    a line can no longer be fulfilled.
+    """
+    # Mock payment processing
+    transaction_id = "mock_txn_" + str(uuid.uuid4())
+
+    # Group cart lines by vendor
+    vendor_cart_lines = {}
+    for line in cart_lines:
+        vendor_cart_lines.setdefault(line.vendor_id, []).append(line)
+
+    # Quantity to take from each variant; products without variants carry no stock
+    requested_stock = {}
+    for line in cart_lines:
+        if line.variant_id:
+            requested_stock[line.variant_id] = requested_stock.get(line.variant_id, 0) + line.quantity
+
+    created_orders = None
+    with transaction.atomic():
+        # The cart's holds become sold stock in a single conditional UPDATE.
+        # The database re-checks availability on every row it decrements, so
+        # concurrent checkouts cannot oversell; a short row count means something ran out.
+        cart_item_ids = [line.item_id for line in cart_lines]
+        if requested_stock and not convert_holds(cart_item_ids, requested_stock):
+            transaction.set_rollback(True)
+        else:
+            orders = [
+                Order(
+                    customer=user,
+                    vendor=vendors[vendor_id],
+                    total_amount=sum(line.total for line in lines),
+                    status='processing',
+                    payment_method=payment_method,
+                    payment_status='completed',
+                    transaction_id=transaction_id,
+                    shipping_address_text=shipping_address_text
+                )
+                for vendor_id, lines in vendor_cart_lines.items()
+            ]
+            created_orders = Order.objects.bulk_create(orders)
+
+            placed = [
+                (order, [
+                    OrderItem(
+                        order=order,
+                        product_id=line.product_id,
+                        variant_id=line.variant_id,
+                        quantity=line.quantity,
+                        price_at_purchase=line.unit_price
+                    )
+                    for line in lines
+                ])
+                for order, lines in zip(created_orders, vendor_cart_lines.values())
+            ]
+            order_items = [item for order, items in placed for item in items]
+            OrderItem.objects.bulk_create(order_items)
+            record_orders(placed)
+            InventoryMovement.objects.bulk_create([
+                InventoryMovement(variant_id=item.variant_id, delta=-item.quantity, reason='sale',
+                                  reference=str(item.order.order_id))
+                for item in order_items if item.variant_id
+            ])
+            sync_low_stock(requested_stock)
+            # Tell other systems, committed or rolled back with the orders
+            publish(*[
+                event('order.created', order.order_id, id=order.pk, customer_id=user.pk,
+                      vendor_id=order.vendor_id, total_amount=order.total_amount, items=len(lines))
+                for order, lines in zip(created_orders, vendor_cart_lines.values())
+            ])
+            invalidate_analytics(*vendor_cart_lines)
+
+            # Clear the user's cart after successful order creation. Going through
+            # the cart lets the delete signals see whose cart summary to drop.
+            user_cart = Cart(pk=cart_lines[0].cart_id, user=user)
+            user_cart.items.filter(pk__in=cart_item_ids).delete()
+            summary_key = Cart.summary_cache_key(user.pk)
+            transaction.on_commit(lambda: cache.set(summary_key, EMPTY_CART_SUMMARY, settings.CART_SUMMARY_TTL))
+
+    if created_orders is None:
+        raise OutOfStock(stock_shortage_message(cart_lines))
+    return created_orders
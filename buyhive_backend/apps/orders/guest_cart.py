@@ -0,0 +1,170 @@
+# apps/orders/guest_cart.py
+"""
+Carts for visitors who are not logged in. Lines live in their own signed
+cookie (GUEST_CART_COOKIE) as {"<product id>-<variant id>": quantity}, so
+browsing and filling a guest cart writes nothing to the database and leaves
+the session engine alone.
+"""
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Least, Now
+
+from apps.products.models import Product, ProductVariant
+from .models import Cart, CartItem
+
+COOKIE_SALT = 'apps.orders.guest_cart'
+MAX_QUANTITY = 99  # Same limit as CartItemSerializer.validate_quantity
+
+
+def line_key(product_id, variant_id):
+    return f"{product_id}-{variant_id or ''}"
+
+
+def parse_line_key(key):
+    """Returns (product id, variant id or None); raises ValueError for malformed keys."""
+    product_id, separator, variant_id = key.partition('-')
+    if not separator:
+        raise ValueError(key)
+    return int(product_id), int(variant_id) if variant_id else None
+
+
+class GuestCart:
+    """
+    The lines of the request's guest cart cookie. Views that change them
+    pass their response to save() to write the cookie back.
+    """
+    def __init__(self, request):
+        try:
+            lines = json.loads(request.get_signed_cookie(
+                settings.GUEST_CART_COOKIE, default='{}', salt=COOKIE_SALT, max_age=settings.GUEST_CART_COOKIE_AGE,
+            ))
+        except ValueError:
+            lines = {}
+        self.lines = lines if isinstance(lines, dict) else {}
+        self.changed = False
+
+    def __contains__(self, key):
+        return key in self.lines
+
+    def __bool__(self):
+        return bool(self.lines)
+
+    def quantity(self, key):
+        return self.lines.get(key, 0)
+
+    def set(self, key, quantity):
+        if quantity:
+            self.lines[key] = min(quantity, MAX_QUANTITY)
+        else:
+            self.lines.pop(key, None)
+        self.changed = True
+
+    def clear(self):
+        self.lines = {}
+        self.changed = True
+
+    def save(self, response):
+        if not self.changed:
+            return response
+        if self.lines:
+            response.set_signed_cookie(
+                settings.GUEST_CART_COOKIE, json.dumps(self.lines, separators=(',', ':')), salt=COOKIE_SALT,
+                max_age=settings.GUEST_CART_COOKIE_AGE, httponly=True,
+                secure=settings.SESSION_COOKIE_SECURE, samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        else:
+            response.delete_cookie(settings.GUEST_CART_COOKIE, samesite=settings.SESSION_COOKIE_SAMESITE)
+        return response
+
+    def build_items(self):
+        """
+        Unsaved CartItems for the lines whose product and variant are still on
+        sale, ready for CartItemSerializer. Two queries whatever the cart size.
+        """
+        parsed = [(parse_line_key(key), quantity) for key, quantity in self.lines.items()]
+        products = Product.objects.filter(
+            pk__in={product_id for (product_id, _), _ in parsed}, is_active=True
+        ).for_listing().in_bulk()
+        variants = ProductVariant.objects.filter(
+            pk__in={variant_id for (_, variant_id), _ in parsed if variant_id}, is_active=True
+        ).in_bulk()
+        items = []
+        for (product_id, variant_id), quantity in parsed:
+            product, variant = products.get(product_id), variants.get(variant_id)
+            if product is None or (variant_id and (variant is None or variant.product_id != product_id)):
+                continue
+            if variant:
+                variant.product = product
+            items.append(CartItem(product=product, variant=variant, quantity=quantity))
+        return items
+
+
+def merge_guest_cart(guest_cart, user):
+    """
+    Move ``guest_cart`` into the user's Cart in one upsert pass: a
+    single UPDATE adds quantities to lines the user already has, and one
+    bulk_create inserts the rest. Lines for products or variants that are no
+    longer on sale are dropped. Returns the number of lines merged.
+
+    Merged lines carry no stock hold until their quantity next changes;
+    checkout checks availability for them like any expired hold. The caller
+    saves ``guest_cart`` to its response to clear the cookie.
+    """
+    if not guest_cart:
+        return 0
+    wanted = {}
+    for key, quantity in guest_cart.lines.items():
+        try:
+            wanted[parse_line_key(key)] = quantity
+        except ValueError:
+            continue
+
+    # Which guest lines still point at something on sale
+    on_sale = set(
+        ProductVariant.objects.filter(
+            pk__in=[variant_id for _, variant_id in wanted if variant_id],
+            is_active=True, product__is_active=True,
+        ).values_list('product_id', 'pk')
+    )
+    on_sale.update(
+        (product_id, None) for product_id in Product.objects.filter(
+            pk__in=[product_id for product_id, variant_id in wanted if not variant_id], is_active=True,
+        ).values_list('pk', flat=True)
+    )
+    wanted = {line: quantity for line, quantity in wanted.items() if line in on_sale}
+
+    with transaction.atomic():
+        cart, created = Cart.objects.get_or_create(user=user)
+        existing = {
+            (product_id, variant_id): pk
+            for pk, product_id, variant_id in CartItem.objects.filter(cart=cart).values_list(
+                'pk', 'product_id', 'variant_id'
+            )
+        }
+        to_update = {existing[line]: quantity for line, quantity in wanted.items() if line in existing}
+        if to_update:
+            added = _per_item(to_update)
+            CartItem.objects.filter(pk__in=list(to_update)).update(
+                quantity=Least(F('quantity') + added, MAX_QUANTITY), updated_at=Now()
+            )
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product_id=product_id, variant_id=variant_id, quantity=quantity)
+            for (product_id, variant_id), quantity in wanted.items()
+            if (product_id, variant_id) not in existing
+        ])
+        # Bulk writes send no signals; drop the cached summary ourselves
+        summary_key = Cart.summary_cache_key(user.pk)
+        transaction.on_commit(lambda: cache.delete(summary_key))
+    guest_cart.clear()
+    return len(wanted)
+
+
+def _per_item(quantities):
+    return Case(
+        *[When(pk=pk, then=Value(quantity)) for pk, quantity in quantities.items()],
+        output_field=models.PositiveIntegerField(),
+    )
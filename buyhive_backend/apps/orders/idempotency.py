@@ -0,0 +1,151 @@
+# apps/orders/idempotency.py
+import hashlib
+import json
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+POLL_SECONDS = 0.1
+
+
+def request_fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method} {request.path}\n{payload}".encode()).hexdigest()
+
+
+class LeaseLost(Exception):
+    """The request outlived its lease and another request took the key over."""
+
+
+def idempotent(scope):
+    """
+    Honour an ``Idempotency-Key`` header on a view method. The first request
+    with a key runs normally and its response is stored; retries with the same
+    key and payload get that response back without running the view again. A
+    retry that arrives while the first request is still running waits up to
+    IDEMPOTENCY_WAIT_SECONDS for it, then gets a 409. Errors raised by the view
+    and 5xx responses are not stored, so the client may retry them.
+
+    The view runs in one transaction with the write of its response, so a
+    request that dies part way leaves neither its work nor a stored answer;
+    its in-progress marker is taken over by a retry once its
+    IDEMPOTENCY_LEASE runs out.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.META.get(HEADER)
+            if not key:
+                return view_method(self, request, *args, **kwargs)
+            if len(key) > 255:
+                return Response({'detail': _('Idempotency-Key must be at most 255 characters.')},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            records = IdempotencyKey.objects.filter(user=request.user, scope=scope, key=key)
+            fingerprint = request_fingerprint(request)
+            record, lease = _claim(request.user, scope, key, fingerprint)
+            if record is not None:
+                return _replay(record, fingerprint)
+
+            # Only the holder of the lease may store a response or release the key
+            owned = records.filter(status_code__isnull=True, locked_until=lease)
+            try:
+                with transaction.atomic():
+                    response = view_method(self, request, *args, **kwargs)
+                    if response.status_code >= 500:
+                        transaction.set_rollback(True)
+                    elif not owned.update(
+                        status_code=response.status_code,
+                        response_body=json.loads(JSONRenderer().render(response.data) or 'null'),
+                        locked_until=None,
+                    ):
+                        raise LeaseLost
+            except LeaseLost:
+                return _replay(records.first(), fingerprint)
+            except Exception:
+                owned.delete()
+                raise
+            if response.status_code >= 500:
+                owned.delete()
+            return response
+        return wrapper
+    return decorator
+
+
+def _claim(user, scope, key, fingerprint):
+    """
+    Insert the in-progress marker for ``key``, or take over one whose lease
+    ran out. Returns ``(None, lease)`` if this request now owns the key until
+    ``lease``, otherwise ``(record, None)`` with the record it should answer
+    with.
+    """
+    records = IdempotencyKey.objects.filter(user=user, scope=scope, key=key)
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        now = timezone.now()
+        lease = now + settings.IDEMPOTENCY_LEASE
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    user=user, scope=scope, key=key, request_hash=fingerprint, locked_until=lease,
+                    expires_at=now + settings.IDEMPOTENCY_KEY_TTL,
+                )
+            return None, lease
+        except IntegrityError:
+            pass
+        record = records.first()
+        if record is None:
+            continue  # Released or purged since our insert failed
+        if record.expires_at <= now:
+            records.filter(expires_at__lte=now).delete()
+            continue
+        if record.status_code is None and (record.locked_until is None or record.locked_until <= now):
+            # Its request died without storing anything; its work rolled back with it
+            if records.filter(
+                pk=record.pk, status_code__isnull=True, locked_until=record.locked_until
+            ).update(request_hash=fingerprint, locked_until=lease, expires_at=now + settings.IDEMPOTENCY_KEY_TTL):
+                return None, lease
+            continue
+        if record.status_code is not None or record.request_hash != fingerprint:
+            return record, None
+        if time.monotonic() >= deadline:
+            return record, None
+        time.sleep(POLL_SECONDS)
+
+
+def _replay(record, fingerprint):
+    if record is not None and record.request_hash != fingerprint:
+        return Response(
+            {'detail': _('This Idempotency-Key was already used with a different request.')},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if record is None or record.status_code is None:
+        return Response(
+            {'detail': _('A request with this Idempotency-Key is still being processed.')},
+            status=status.HTTP_409_CONFLICT,
+        )
+    return Response(record.response_body, status=record.status_code,
+                    headers={'Idempotent-Replayed': 'true'})
+
+
+def purge_expired(batch_size=1000):
+    """Delete expired keys in batches; returns how many were removed."""
+    purged = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return purged
+        purged += IdempotencyKey.objects.filter(pk__in=ids).delete()[0]
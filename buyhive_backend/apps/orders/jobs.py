@@ -0,0 +1,129 @@
+# apps/orders/jobs.py
+"""
+The asynchronous checkout queue, kept in the CheckoutJob table so it needs no
+broker.
+
+A worker claims a batch of jobs in a short transaction: it marks them running
+under a fresh lease token with a conditional UPDATE, so two workers can never
+both claim a job, even on SQLite where ``select_for_update`` is a no-op. It
+then places the whole batch in one transaction, each job in its own savepoint,
+and records every job's outcome in that same transaction. A job's orders and
+its 'succeeded' status therefore commit together; a worker that dies mid-batch
+commits neither, and the jobs are claimed again once CHECKOUT_JOB_LEASE runs
+out. One commit per batch also means one write-lock acquisition per batch. A
+job that fails, for whatever reason, rolls back only its own savepoint.
+
+The cart lines are saved with the job when the checkout is accepted. The job
+places exactly those lines at the accepted prices, and fails if the cart has
+changed since.
+"""
+import logging
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from buyhive_backend.db import is_lock_error, retry_on_lock
+from .checkout import OutOfStock, load_cart_lines, place_orders, snapshot_cart
+from .models import CheckoutJob
+
+logger = logging.getLogger(__name__)
+
+
+def claimable(now):
+    return Q(status='queued') | Q(status='running', available_at__lte=now)
+
+
+def claim(batch_size, now=None):
+    """Lease up to ``batch_size`` jobs, oldest first; returns the lease token, or None if none were due."""
+    now = now or timezone.now()
+    token = uuid.uuid4()
+    with transaction.atomic():
+        pks = list(
+            CheckoutJob.objects.select_for_update(skip_locked=True)
+            .filter(claimable(now))
+            .order_by('created_at')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            return None
+        claimed = CheckoutJob.objects.filter(claimable(now), pk__in=pks).update(
+            status='running', lease_token=token, available_at=now + settings.CHECKOUT_JOB_LEASE,
+            attempts=F('attempts') + 1,
+        )
+    return token if claimed else None
+
+
+def run(job):
+    """Place one job's orders, setting its status, order_pks and error (unsaved)."""
+    job.status = 'failed'
+    if job.attempts > settings.CHECKOUT_JOB_MAX_ATTEMPTS:
+        job.error = _('Checkout could not be completed. Please try again.')
+        return
+    cart_lines, vendors = snapshot_cart(job.user)
+    if not cart_lines:
+        job.error = _('Your cart is empty.')
+        return
+    if job.cart_lines:  # Jobs queued before lines were saved place the cart as it is now
+        accepted = load_cart_lines(job.cart_lines)
+        if _line_keys(accepted) != _line_keys(cart_lines):
+            job.error = _('Your cart changed after this checkout was accepted. Please check out again.')
+            return
+        cart_lines = accepted
+    try:
+        orders = place_orders(job.user, cart_lines, vendors, job.shipping_address_text, job.payment_method)
+    except OutOfStock as exc:
+        job.error = exc.message
+        return
+    job.status, job.order_pks = 'succeeded', [order.pk for order in orders]
+
+
+def _line_keys(cart_lines):
+    return sorted((line.item_id, line.variant_id or 0, line.quantity) for line in cart_lines)
+
+
+def process_batch(batch_size=20):
+    """Claim and place one batch of checkout jobs; returns how many were processed."""
+    token = claim(batch_size)
+    if token is None:
+        return 0
+    return place_claimed(token)
+
+
+@retry_on_lock
+def place_claimed(token):
+    """Place the jobs leased under ``token`` in one transaction; returns how many there were."""
+    with transaction.atomic():
+        # Locking the jobs by token skips any whose lease ran out and was taken over meanwhile
+        jobs = list(
+            CheckoutJob.objects.select_for_update(of=('self',))
+            .filter(lease_token=token, status='running')
+            .select_related('user')
+        )
+        for job in jobs:
+            try:
+                with transaction.atomic():
+                    run(job)
+            except Exception as exc:
+                if is_lock_error(exc):
+                    raise  # The batch transaction is lost; retry_on_lock reruns it
+                logger.exception('Checkout job %s failed', job.pk)
+                job.status, job.order_pks = 'failed', []
+                job.error = _('Checkout could not be completed. Please try again.')
+            job.error = str(job.error)
+            job.finished_at = timezone.now()
+        CheckoutJob.objects.bulk_update(jobs, ['status', 'order_pks', 'error', 'finished_at'])
+    return len(jobs)
+
+
+def process_pending(batch_size=20):
+    """Process batches until no job is due; returns the number of jobs processed."""
+    processed = 0
+    while True:
+        count = process_batch(batch_size)
+        if not count:
+            return processed
+        processed += count
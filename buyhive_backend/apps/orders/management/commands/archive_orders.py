@@ -0,0 +1,30 @@
+# apps/orders/management/commands/archive_orders.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.orders.archive import archive_orders, hot_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        'Move delivered, cancelled and refunded orders older than ORDER_HOT_WINDOW '
+        'out of the order tables and into the archive'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int,
+                            help='Only archive orders older than this many days (never less than ORDER_HOT_WINDOW)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Orders moved per transaction')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        days = options['older_than_days']
+        if days is not None and days < 0:
+            raise CommandError('--older-than-days cannot be negative')
+        # Never archive inside the hot window; history only reads the archive past it
+        cutoff = min(hot_cutoff(), timezone.now() - timedelta(days=days)) if days is not None else hot_cutoff()
+        archived = archive_orders(cutoff=cutoff, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} order(s) created before {cutoff:%Y-%m-%d}'))
@@ -0,0 +1,21 @@
+# apps/orders/management/commands/backfill_daily_sales.py
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.orders.sales import rebuild_daily_sales
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the vendor daily sales rollup from current and archived orders; '
+        'run once after upgrading, and again to repair orders edited outside the API'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('vendor_ids', nargs='*', type=int, help='Only rebuild these vendors (default: all)')
+        parser.add_argument('--batch-size', type=int, default=50, help='Vendors rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        written = rebuild_daily_sales(options['vendor_ids'] or None, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} daily sales row(s)'))
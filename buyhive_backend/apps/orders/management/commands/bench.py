@@ -0,0 +1,452 @@
+# apps/orders/management/commands/bench.py
+import io
+import json
+import logging
+import multiprocessing
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.accounts.models import User
+from apps.orders.models import Cart, CartItem
+from apps.products.models import Product, ProductVariant
+from apps.vendors.models import VendorProfile
+
+DEFAULT_MIX = 'browse=50,detail=30,cart_add=10,checkout=5,vendor_dashboard=5'
+PAGE_SIZE = settings.REST_FRAMEWORK['PAGE_SIZE']
+
+
+def parse_mix(value):
+    """Parse 'browse=50,detail=30' into {'browse': 50, 'detail': 30}."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise CommandError(f"Unknown scenario '{name}'. Choose from: {', '.join(SCENARIOS)}")
+        try:
+            mix[name] = int(weight)
+        except ValueError:
+            raise CommandError(f"Weight for '{name}' must be an integer")
+    if not any(mix.values()):
+        raise CommandError('At least one scenario needs a positive weight')
+    return mix
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+# --- WSGI driver ---
+def call_wsgi(app, method, path, token=None, body=None):
+    """Run one request through the WSGI callable and return the status code."""
+    path, _, query_string = path.partition('?')
+    payload = json.dumps(body).encode() if body is not None else b''
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query_string,
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver',
+        'REMOTE_ADDR': '127.0.0.1',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(payload),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    if token:
+        environ['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(status)
+
+    result = app(environ, start_response)
+    try:
+        for _chunk in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return int(statuses[0].split()[0])
+
+
+# --- Scenarios ---
+# Each scenario receives (app, rng, fixtures, worker) and returns a status code.
+def scenario_browse(app, rng, fixtures, worker):
+    page = rng.randint(1, fixtures['pages'])
+    return call_wsgi(app, 'GET', f'/api/products/products/?page={page}')
+
+
+def scenario_detail(app, rng, fixtures, worker):
+    product_id = rng.choice(fixtures['product_ids'])
+    return call_wsgi(app, 'GET', f'/api/products/products/{product_id}/')
+
+
+def scenario_cart_add(app, rng, fixtures, worker):
+    customer = rng.choice(worker['customers'])
+    product_id, variant_id = rng.choice(fixtures['variants'])
+    return call_wsgi(app, 'POST', '/api/orders/cart/items/', customer['token'], {
+        'product_id': product_id, 'variant_id': variant_id, 'quantity': 1,
+    })
+
+
+def scenario_checkout(app, rng, fixtures, worker):
+    customer = rng.choice(worker['customers'])
+    return call_wsgi(app, 'POST', '/api/orders/checkout/', customer['token'], {
+        'shipping_address_id': customer['address_id'],
+    })
+
+
+def prepare_checkout(rng, fixtures, worker):
+    """Untimed setup for the checkout scenario: put a few lines in every worker cart."""
+    for customer in worker['customers']:
+        lines = rng.sample(fixtures['variants'], k=min(3, len(fixtures['variants'])))
+        CartItem.objects.bulk_create(
+            [
+                CartItem(cart_id=customer['cart_id'], product_id=product_id,
+                         variant_id=variant_id, quantity=1)
+                for product_id, variant_id in lines
+            ],
+            ignore_conflicts=True,
+        )
+        cache.delete(Cart.summary_cache_key(customer['user_id']))
+
+
+def scenario_vendor_dashboard(app, rng, fixtures, worker):
+    vendor = rng.choice(fixtures['vendors'])
+    return call_wsgi(app, 'GET', '/api/vendors/analytics/', vendor['token'])
+
+
+SCENARIOS = {
+    'browse': scenario_browse,
+    'detail': scenario_detail,
+    'cart_add': scenario_cart_add,
+    'checkout': scenario_checkout,
+    'vendor_dashboard': scenario_vendor_dashboard,
+}
+
+
+class QueryCounter:
+    """execute_wrapper that counts statements on the current thread's connection."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def run_worker(worker_id, plan, fixtures, warmup):
+    """Execute one worker's share of the plan and return its samples."""
+    connections.close_all()  # never share a connection with the parent process
+    app = get_wsgi_application()
+    rng = random.Random(fixtures['seed'] + worker_id)
+    customers = fixtures['customers']
+    worker = {
+        'customers': [c for i, c in enumerate(customers) if i % fixtures['workers'] == worker_id]
+        or customers,
+    }
+    samples = []
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        for index, name in enumerate(plan):
+            if name == 'checkout':
+                prepare_checkout(rng, fixtures, worker)
+            counter.count = 0
+            started = time.perf_counter()
+            try:
+                status_code = SCENARIOS[name](app, rng, fixtures, worker)
+            except Exception as exc:  # Keep driving load; the failure is reported
+                status_code = f'error:{type(exc).__name__}'
+            elapsed = time.perf_counter() - started
+            if index >= warmup:
+                samples.append((name, elapsed, counter.count, status_code))
+    connections.close_all()
+    return samples
+
+
+def _run_worker_star(args):
+    return run_worker(*args)
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway database and drive a weighted request mix through the '
+        'WSGI app, reporting latency percentiles, throughput and queries per request as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=5, help='Vendors to seed')
+        parser.add_argument('--products-per-vendor', type=int, default=40, help='Products per vendor')
+        parser.add_argument('--customers', type=int, default=20, help='Customers to seed')
+        parser.add_argument('--orders-per-customer', type=int, default=2,
+                            help='Average historical orders per customer')
+        parser.add_argument('--requests', type=int, default=1000, help='Measured requests in total')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per worker')
+        parser.add_argument('--concurrency', type=int, default=4, help='Number of workers')
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread')
+        parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                            help=f'Scenario weights (default: {DEFAULT_MIX})')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the request plan')
+        parser.add_argument('--db-path', default=str(settings.BASE_DIR / 'bench.sqlite3'),
+                            help='SQLite file for the benchmark database')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Reuse the benchmark database and its data between runs')
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+        parser.add_argument('--compare', help='Previous JSON report to print deltas against')
+        parser.add_argument('--max-regression', type=float, metavar='PCT',
+                            help='With --compare, fail when an endpoint\'s p95 or queries per request '
+                                 'grew by more than PCT percent')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('bench only knows how to create throwaway SQLite databases')
+
+        verbosity = options['verbosity']
+        # Put the connection back on its own database once the run is over
+        old_name, old_test_name = connection.settings_dict['NAME'], connection.settings_dict['TEST']['NAME']
+        connection.settings_dict['TEST']['NAME'] = options['db_path']
+        connection.creation.create_test_db(
+            verbosity=max(verbosity - 1, 0), autoclobber=True, serialize=False,
+            keepdb=options['keepdb'],
+        )
+        request_logger = logging.getLogger('django.request')
+        previous_level = request_logger.level
+        # Failed requests are counted per endpoint in the report; keep the console quiet.
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                if not Product.objects.exists():
+                    self._seed(options)
+                fixtures = self._fixtures(options)
+                report = self._run(fixtures, options)
+        finally:
+            request_logger.setLevel(previous_level)
+            connection.creation.destroy_test_db(
+                old_name, verbosity=max(verbosity - 1, 0), keepdb=options['keepdb'],
+            )
+            connection.settings_dict['TEST']['NAME'] = old_test_name
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output + '\n')
+            self._print_table(report)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+        if options['compare']:
+            regressions = self._print_comparison(report, options['compare'], options['max_regression'])
+            if regressions:
+                raise CommandError(f"Regressed by more than {options['max_regression']}%: {'; '.join(regressions)}")
+
+    # --- Setup ---
+    def _seed(self, options):
+        from buyhive_backend.datagen import DatasetPlan, generate
+
+        self.stderr.write('Seeding benchmark dataset...')
+        generate(DatasetPlan(
+            vendors=options['vendors'],
+            products_per_vendor=options['products_per_vendor'],
+            customers=options['customers'],
+            orders_per_customer=options['orders_per_customer'],
+        ))
+        # Plenty of stock so checkout measures order creation, not sell-outs
+        ProductVariant.objects.update(stock=10 ** 6)
+
+    def _fixtures(self, options):
+        product_count = Product.objects.filter(is_active=True, vendor__is_approved=True).count()
+        vendor_users = User.objects.filter(vendor_profile__is_approved=True)
+        customers = []
+        for user in User.objects.filter(is_vendor=False, addresses__isnull=False).distinct():
+            cart, created = Cart.objects.get_or_create(user=user)
+            customers.append({
+                'token': str(AccessToken.for_user(user)),
+                'user_id': user.pk,
+                'cart_id': cart.id,
+                'address_id': user.addresses.values_list('id', flat=True).first(),
+            })
+        if not customers:
+            raise CommandError('The benchmark database has no customers with addresses')
+        return {
+            'seed': options['seed'],
+            'workers': options['concurrency'],
+            'pages': max(1, -(-product_count // PAGE_SIZE)),
+            'product_ids': list(Product.objects.filter(is_active=True).values_list('id', flat=True)),
+            'variants': list(
+                ProductVariant.objects.filter(is_active=True).values_list('product_id', 'id')
+            ),
+            'customers': customers,
+            'vendors': [{'token': str(AccessToken.for_user(user))} for user in vendor_users],
+            'dataset': {
+                'vendors': VendorProfile.objects.count(),
+                'products': product_count,
+                'variants': ProductVariant.objects.count(),
+                'customers': len(customers),
+            },
+        }
+
+    # --- Load ---
+    def _run(self, fixtures, options):
+        workers = options['concurrency']
+        mix = options['mix']
+        rng = random.Random(options['seed'])
+        names, weights = zip(*mix.items())
+        per_worker = -(-options['requests'] // workers)
+        plans = [
+            rng.choices(names, weights=weights, k=per_worker + options['warmup'])
+            for _ in range(workers)
+        ]
+        jobs = [(i, plans[i], fixtures, options['warmup']) for i in range(workers)]
+
+        self.stderr.write(
+            f"Running {per_worker * workers} requests on {workers} {options['mode']} worker(s)..."
+        )
+        started = time.perf_counter()
+        if options['mode'] == 'process':
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(workers) as pool:
+                results = pool.map(_run_worker_star, jobs)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_run_worker_star, jobs))
+        wall = time.perf_counter() - started
+
+        samples = [sample for result in results for sample in result]
+        return {
+            'commit': self._git_commit(),
+            'config': {
+                'mode': options['mode'],
+                'concurrency': workers,
+                'requests': len(samples),
+                'warmup_per_worker': options['warmup'],
+                'mix': mix,
+                'seed': options['seed'],
+                'dataset': fixtures['dataset'],
+            },
+            'total': self._summarise(samples, wall),
+            'endpoints': {
+                name: self._summarise([s for s in samples if s[0] == name], wall)
+                for name in mix if mix[name]
+            },
+        }
+
+    def _summarise(self, samples, wall):
+        latencies = sorted(s[1] * 1000 for s in samples)
+        statuses = defaultdict(int)
+        for sample in samples:
+            statuses[str(sample[3])] += 1
+        errors = sum(
+            count for code, count in statuses.items()
+            if code.startswith('error') or code.startswith('5')
+        )
+        count = len(samples)
+        return {
+            'count': count,
+            'errors': errors,
+            'statuses': dict(sorted(statuses.items())),
+            'rps': round(count / wall, 2) if wall else None,
+            'mean_ms': round(sum(latencies) / count, 3) if count else None,
+            'p50_ms': _round(percentile(latencies, 50)),
+            'p95_ms': _round(percentile(latencies, 95)),
+            'p99_ms': _round(percentile(latencies, 99)),
+            'max_ms': _round(latencies[-1] if latencies else None),
+            'queries_per_request': round(sum(s[2] for s in samples) / count, 2) if count else None,
+        }
+
+    def _git_commit(self):
+        try:
+            result = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, timeout=5,
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return result.stdout.strip() or None
+
+    # --- Reporting ---
+    def _print_table(self, report):
+        self.stdout.write(
+            f"{'endpoint':<18}{'count':>7}{'errors':>8}{'rps':>9}"
+            f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'q/req':>8}"
+        )
+        for name, row in [*report['endpoints'].items(), ('TOTAL', report['total'])]:
+            self.stdout.write(
+                f"{name:<18}{row['count']:>7}{row['errors']:>8}{_fmt(row['rps']):>9}"
+                f"{_fmt(row['p50_ms']):>10}{_fmt(row['p95_ms']):>10}{_fmt(row['p99_ms']):>10}"
+                f"{_fmt(row['queries_per_request']):>8}"
+            )
+
+    def _print_comparison(self, report, baseline_path, max_regression=None):
+        """Print deltas against the baseline; returns the regressions past ``max_regression`` percent."""
+        try:
+            with open(baseline_path) as fh:
+                baseline = json.load(fh)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Could not read baseline report: {exc}')
+        self.stderr.write(f"Compared with {baseline.get('commit') or baseline_path}:")
+        rows = [*report['endpoints'].items(), ('TOTAL', report['total'])]
+        regressions = []
+        for name, row in rows:
+            before = baseline['total'] if name == 'TOTAL' else baseline['endpoints'].get(name)
+            if not before:
+                continue
+            self.stderr.write(
+                f"  {name:<18} p95 {_delta(before['p95_ms'], row['p95_ms'])}  "
+                f"rps {_delta(before['rps'], row['rps'])}  "
+                f"q/req {_delta(before['queries_per_request'], row['queries_per_request'])}"
+            )
+            if max_regression is None:
+                continue
+            for metric in ('p95_ms', 'queries_per_request'):
+                change = _change(before[metric], row[metric])
+                if change is not None and change > max_regression:
+                    regressions.append(f'{name} {metric} {_delta(before[metric], row[metric])}')
+        return regressions
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+def _fmt(value):
+    return '-' if value is None else f'{value:.1f}'
+
+
+def _change(before, after):
+    """Percentage change from ``before`` to ``after``, or None when either is missing or before is 0."""
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def _delta(before, after):
+    change = _change(before, after)
+    if change is None:
+        return f'{_fmt(before)} -> {_fmt(after)}'
+    return f'{_fmt(before)} -> {_fmt(after)} ({change:+.1f}%)'
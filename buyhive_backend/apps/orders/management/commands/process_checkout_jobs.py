@@ -0,0 +1,30 @@
+# apps/orders/management/commands/process_checkout_jobs.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.orders.jobs import process_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Place queued asynchronous checkouts in batches. Run several for more throughput, '
+        'and keep them running with --interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help='Checkout jobs placed per transaction')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Poll again every this many seconds instead of exiting')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        while True:
+            processed = process_pending(batch_size=options['batch_size'])
+            if processed or options['verbosity'] > 1:
+                self.stdout.write(f'Processed {processed} checkout job(s)')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS('Checkout queue drained'))
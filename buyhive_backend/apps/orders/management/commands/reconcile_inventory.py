@@ -0,0 +1,31 @@
+# apps/orders/management/commands/reconcile_inventory.py
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.orders.reservations import reconcile_inventory
+
+
+class Command(BaseCommand):
+    help = (
+        'Check every variant\'s stock against the inventory ledger and its reserved count '
+        'against live cart holds. Exits non-zero on a mismatch unless --fix is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help='Append correction movements and reset reserved counts to the holds')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Variants checked per transaction')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        found = reconcile_inventory(fix=options['fix'], batch_size=options['batch_size'])
+        for discrepancy in found:
+            self.stdout.write(
+                f'Variant {discrepancy.variant_id}: {discrepancy.check} is {discrepancy.recorded}, '
+                f'expected {discrepancy.expected}'
+            )
+        if found and not options['fix']:
+            raise CommandError(f'{len(found)} discrepancy(ies) found; rerun with --fix to correct them')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(found)} discrepancy(ies) {"fixed" if found else "found"}'
+        ))
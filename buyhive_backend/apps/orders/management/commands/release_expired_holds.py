@@ -0,0 +1,31 @@
+# apps/orders/management/commands/release_expired_holds.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.orders.reservations import release_expired
+
+
+class Command(BaseCommand):
+    help = (
+        'Return the stock held by expired cart reservations. Run it from cron, '
+        'or keep it running with --interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Holds released per transaction')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Sweep again every this many seconds instead of exiting')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        while True:
+            released = release_expired(batch_size=options['batch_size'])
+            if released or options['verbosity'] > 1:
+                self.stdout.write(f'Released {released} expired hold(s)')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS('Expired holds released'))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 00:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_vendordailysales'),
+        ('products', '0003_inventory_ledger_and_shards'),
+        ('vendors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('orders', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='daily_sales', to='products.product')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_daily_sales', to='vendors.vendorprofile')),
+            ],
+            options={
+                'verbose_name': 'product daily sales',
+                'verbose_name_plural': 'product daily sales',
+                'ordering': ['product', 'day'],
+                'indexes': [models.Index(fields=['vendor', 'day'], name='orders_prod_vendor__9ceefe_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'day'), name='unique_product_daily_sales')],
+            },
+        ),
+    ]
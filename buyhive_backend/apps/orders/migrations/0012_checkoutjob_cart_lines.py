@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_idempotencykey_locked_until'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checkoutjob',
+            name='cart_lines',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
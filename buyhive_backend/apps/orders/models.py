@@ -1,11 +1,17 @@
+from decimal import Decimal
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _  # [UPDATED] Added translation support
 from django.core.validators import MinValueValidator  # [UPDATED] Added validators
 from apps.products.models import Product, ProductVariant
 from apps.vendors.models import VendorProfile
 import uuid
 
+EMPTY_CART_SUMMARY = {'items': 0, 'quantity': 0, 'total': Decimal('0.00')}
+
 # --- Cart Model ---
 class Cart(models.Model):
     user = models.OneToOneField(
@@ -26,16 +32,66 @@ class Cart(models.Model):
     def __str__(self):
         return f"Cart for {self.user.email if self.user else 'Guest'}"
     
+    @staticmethod
+    def summary_cache_key(user_id):
+        return f"cart-summary:{user_id}"
+    
+    @classmethod
+    def summary_for_user(cls, user_id):
+        """
+        {'items': lines, 'quantity': units, 'total': price} for the user's cart,
+        cached until one of its CartItems changes (see apps.orders.signals).
+        A miss costs one aggregate query and never loads CartItem rows.
+        """
+        key = cls.summary_cache_key(user_id)
+        summary = cache.get(key)
+        if summary is None:
+            summary = CartItem.objects.filter(cart__user_id=user_id).summary()
+            cache.set(key, summary, settings.CART_SUMMARY_TTL)
+        return summary
+    
+    def get_summary(self):
+        if self.user_id is None:
+            return CartItem.objects.filter(cart_id=self.pk).summary()
+        return self.summary_for_user(self.user_id)
+    
     @property
     def get_total_price(self):
-        return sum(item.get_total for item in self.items.all())
+        return self.get_summary()['total']
     
     @property  # [UPDATED] Added useful property
     def get_total_items(self):
         """Get total number of items in cart"""
-        return sum(item.quantity for item in self.items.all())
+        return self.get_summary()['quantity']
 
 # --- CartItem Model ---
+class CartItemQuerySet(models.QuerySet):
+    def with_line_totals(self):
+        return self.annotate(
+            line_total=models.F('quantity') * (
+                models.F('product__base_price') + Coalesce(models.F('variant__price_modifier'), Decimal('0'))
+            )
+        )
+    
+    def summary(self):
+        """Line count, unit count and total price in one aggregate query."""
+        totals = self.with_line_totals().aggregate(
+            items=models.Count('id'),
+            quantity=Coalesce(models.Sum('quantity'), 0),
+            total=Coalesce(
+                models.Sum('line_total'), Decimal('0'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2)
+            ),
+        )
+        totals['total'] = totals['total'].quantize(Decimal('0.01'))
+        return totals
+    
+    def for_display(self):
+        """Load everything CartItemSerializer reads, in a fixed number of queries."""
+        return self.select_related('variant__product').prefetch_related(
+            models.Prefetch('product', queryset=Product.objects.for_listing())
+        )
+
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
@@ -47,6 +103,8 @@ class CartItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)  # [UPDATED] Added timestamp
     updated_at = models.DateTimeField(auto_now=True)  # [UPDATED] Added timestamp
     
+    objects = CartItemQuerySet.as_manager()
+    
     class Meta:
         unique_together = ('cart', 'product', 'variant')
         ordering = ['-created_at']  # [UPDATED] Added ordering
@@ -64,6 +122,52 @@ class CartItem(models.Model):
         variant_modifier = self.variant.price_modifier if self.variant else 0
         return (base_price + variant_modifier) * self.quantity
 
+# --- StockReservation Model ---
+class StockReservation(models.Model):
+    """
+    A time-limited hold on variant stock for a cart line. The variant's
+    ``reserved`` counter always equals the sum of its hold rows; only
+    apps.orders.reservations should create, change or delete them (holds
+    deleted along with their cart item are returned by apps.orders.signals).
+    """
+    cart_item = models.OneToOneField(
+        CartItem,
+        on_delete=models.CASCADE,  # [UPDATED] Its units go back at once; see apps.orders.signals
+        null=True,
+        blank=True,
+        related_name='reservation'
+    )
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.quantity} x {self.variant_id} until {self.expires_at:%Y-%m-%d %H:%M}"
+
+ORDER_PREVIEW_ITEMS = 3
+
+class OrderQuerySet(models.QuerySet):
+    def _items(self):
+        return OrderItem.objects.select_related('product', 'variant').order_by('pk')
+    
+    def for_list(self):
+        """
+        Everything OrderListSerializer reads: the item count and the first
+        ORDER_PREVIEW_ITEMS items of each order, in two queries per page.
+        """
+        return self.select_related('customer', 'vendor').annotate(
+            items_count=models.Count('items')
+        ).prefetch_related(
+            models.Prefetch('items', queryset=self._items()[:ORDER_PREVIEW_ITEMS], to_attr='preview_items')
+        )
+    
+    def with_items(self):
+        """Everything OrderSerializer reads, in two queries."""
+        return self.select_related('customer', 'vendor').prefetch_related(
+            models.Prefetch('items', queryset=self._items())
+        )
+
 # --- Order Model ---
 class Order(models.Model):
     ORDER_STATUS_CHOICES = (
@@ -74,6 +178,14 @@ class Order(models.Model):
         ('cancelled', 'Cancelled'),
         ('refunded', 'Refunded'),
     )
+    # Which statuses each status may move to; see apps/orders/transitions.py
+    STATUS_TRANSITIONS = {
+        'pending': ['processing', 'cancelled'],
+        'processing': ['shipped', 'cancelled'],
+        'shipped': ['delivered'],
+        'delivered': [],  # Final status
+        'cancelled': [],  # Final status
+    }
     PAYMENT_STATUS_CHOICES = (
         ('pending', 'Pending'),
         ('completed', 'Completed'),
@@ -117,12 +229,18 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = OrderQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [  # [UPDATED] Added indexes for better performance
             models.Index(fields=['customer', 'status']),
-            models.Index(fields=['vendor', 'status']),
             models.Index(fields=['order_id']),
+            # Date-range listings and analytics; see apps/orders/filters.py.
+            # (vendor, status, created_at) also serves plain (vendor, status) lookups.
+            models.Index(fields=['vendor', 'created_at'], name='order_vendor_date_idx'),
+            models.Index(fields=['vendor', 'status', 'created_at'], name='order_vendor_status_date_idx'),
+            models.Index(fields=['customer', 'created_at'], name='order_customer_date_idx'),
         ]
         verbose_name = _('order')
         verbose_name_plural = _('orders')
@@ -164,3 +282,232 @@ class OrderItem(models.Model):
     @property
     def get_total(self):
         return self.quantity * self.price_at_purchase
+
+# --- IdempotencyKey Model ---
+class IdempotencyKey(models.Model):
+    """
+    The outcome of a request sent with an Idempotency-Key header, kept for
+    IDEMPOTENCY_KEY_TTL so retries get the same answer. A row without a
+    status code belongs to a request that is still running; ``locked_until``
+    is that request's lease, after which a retry may take the key over.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    scope = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'scope', 'key'], name='unique_idempotency_key'),
+        ]
+    
+    def __str__(self):
+        return f"{self.scope}:{self.key}"
+
+# --- Order Status Event Model ---
+class OrderStatusEvent(models.Model):
+    """
+    Append-only history of order status changes. ``order`` carries no database
+    constraint so the history outlives archiving, which keeps order ids.
+    """
+    order = models.ForeignKey(
+        Order, on_delete=models.DO_NOTHING, db_constraint=False, related_name='status_events'
+    )
+    from_status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['order', 'created_at']),
+        ]
+        verbose_name = _('order status event')
+        verbose_name_plural = _('order status events')
+    
+    def __str__(self):
+        return f"{self.order_id}: {self.from_status} -> {self.to_status}"
+
+# --- Archived Order Model ---
+class ArchivedOrder(models.Model):
+    """
+    A delivered, cancelled or refunded order moved out of the Order and
+    OrderItem tables once it is older than ORDER_HOT_WINDOW (see
+    apps/orders/archive.py). It keeps the order's primary key and fields, with
+    its items stored as a JSON snapshot, and reads like an Order to the order
+    serializers.
+    """
+    id = models.BigIntegerField(primary_key=True)  # The Order's own id
+    customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='archived_orders')
+    vendor = models.ForeignKey(VendorProfile, on_delete=models.PROTECT, related_name='archived_orders')
+    order_id = models.UUIDField(unique=True)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    shipping_address_text = models.TextField()
+    payment_method = models.CharField(max_length=50)
+    payment_status = models.CharField(max_length=20, choices=Order.PAYMENT_STATUS_CHOICES)
+    transaction_id = models.CharField(max_length=255, blank=True, null=True)
+    tracking_number = models.CharField(max_length=100, blank=True)
+    estimated_delivery = models.DateField(null=True, blank=True)
+    items_data = models.JSONField(default=list)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['customer', 'created_at']),
+            models.Index(fields=['vendor', 'created_at']),
+        ]
+        verbose_name = _('archived order')
+        verbose_name_plural = _('archived orders')
+    
+    def __str__(self):
+        return f"Archived order {str(self.order_id)[:8]}"
+    
+    can_be_cancelled = False  # Only finished orders are archived
+    
+    @property
+    def is_completed(self):
+        return self.status == 'delivered'
+    
+    @property
+    def items(self):
+        """The snapshot as unsaved OrderItems, so OrderItemSerializer can render it."""
+        return [
+            OrderItem(
+                product=Product(pk=item['product_id'], title=item['product_title']),
+                variant=ProductVariant(pk=item['variant_id'], name=item['variant_name']) if item['variant_id'] else None,
+                quantity=item['quantity'],
+                price_at_purchase=Decimal(item['price_at_purchase']),
+            )
+            for item in self.items_data
+        ]
+    
+    @property
+    def items_count(self):
+        return len(self.items_data)
+    
+    @property
+    def preview_items(self):
+        return self.items[:ORDER_PREVIEW_ITEMS]
+
+# --- Checkout Job Model ---
+class CheckoutJob(models.Model):
+    """
+    A checkout accepted with ``Prefer: respond-async`` and placed later by
+    ``manage.py process_checkout_jobs`` (see apps/orders/jobs.py). The table
+    is the queue: workers claim queued jobs, and running jobs whose lease ran
+    out, in batches.
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    )
+    FINISHED_STATUSES = ('succeeded', 'failed')
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='checkout_jobs')
+    shipping_address_text = models.TextField()  # Snapshot taken when the checkout was accepted
+    payment_method = models.CharField(max_length=50)
+    cart_lines = models.JSONField(default=list, blank=True)  # Likewise, see checkout.dump_cart_lines
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)  # A running job's lease expiry
+    lease_token = models.UUIDField(null=True, blank=True, editable=False)
+    order_pks = models.JSONField(default=list, blank=True)  # Orders placed by a succeeded job
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['user', 'status']),
+            models.Index(
+                fields=['available_at'], name='checkout_job_open_idx',
+                condition=models.Q(status__in=['queued', 'running']),
+            ),
+        ]
+        verbose_name = _('checkout job')
+        verbose_name_plural = _('checkout jobs')
+    
+    def __str__(self):
+        return f"Checkout job {str(self.id)[:8]} ({self.status})"
+    
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
+
+# --- Vendor Daily Sales Model ---
+class VendorDailySales(models.Model):
+    """
+    One row per vendor and day (project timezone) with the orders placed that
+    day: how many, units, paid revenue and how many of them are in each status
+    now. Maintained in the same transaction as checkouts and status changes
+    (see apps/orders/sales.py); ``manage.py backfill_daily_sales`` rebuilds it
+    from Order and ArchivedOrder. Archived orders stay counted.
+    """
+    vendor = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    orders = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    gross_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pending = models.IntegerField(default=0)
+    processing = models.IntegerField(default=0)
+    shipped = models.IntegerField(default=0)
+    delivered = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    refunded = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['vendor', 'day']
+        constraints = [
+            models.UniqueConstraint(fields=['vendor', 'day'], name='unique_vendor_daily_sales'),
+        ]
+        verbose_name = _('vendor daily sales')
+        verbose_name_plural = _('vendor daily sales')
+    
+    def __str__(self):
+        return f"{self.vendor_id} on {self.day}: {self.orders} orders"
+
+# --- Product Daily Sales Model ---
+class ProductDailySales(models.Model):
+    """
+    One row per product and day with its paid sales: how many orders
+    included it, units and revenue. Kept with VendorDailySales. ``product``
+    carries no database constraint so the history outlives the product.
+    """
+    vendor = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name='product_daily_sales')
+    product = models.ForeignKey(
+        Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name='daily_sales'
+    )
+    day = models.DateField()
+    orders = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['product', 'day']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='unique_product_daily_sales'),
+        ]
+        indexes = [
+            models.Index(fields=['vendor', 'day']),
+        ]
+        verbose_name = _('product daily sales')
+        verbose_name_plural = _('product daily sales')
+    
+    def __str__(self):
+        return f"{self.product_id} on {self.day}: {self.units} units"
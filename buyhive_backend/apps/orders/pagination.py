@@ -0,0 +1,12 @@
+# apps/orders/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class OrderHistoryCursorPagination(CursorPagination):
+    """
+    Newest orders first under ``results``, keyed on created_at: no count
+    query, and a page only reads the archive once it runs past the hot window.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,267 @@
+# apps/orders/reservations.py
+"""
+Cart stock holds.
+
+Putting a variant in the cart reserves that quantity for CART_HOLD_TTL.
+ProductVariant.reserved is the running total of live holds, so availability
+is ``stock - reserved`` and never needs a SUM over the hold rows. Every
+change to a hold row changes the counter in the same transaction, using
+conditional UPDATEs so the database refuses to over-reserve.
+
+The row UPDATEs skip sharded variants (``shard_count > 0``); when they touch
+fewer rows than asked, the sharded variants among them are found with one
+query and updated through apps.products.inventory instead.
+"""
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from apps.products.inventory import release_shards, reserve_shards, shard_totals, sharded, take_shards
+from apps.products.models import InventoryMovement, ProductVariant
+from .models import StockReservation
+
+
+def hold_expiry():
+    return timezone.now() + settings.CART_HOLD_TTL
+
+
+def _per_variant(quantities):
+    return Case(
+        *[When(pk=variant_id, then=Value(qty)) for variant_id, qty in quantities.items()],
+        output_field=models.IntegerField(),
+    )
+
+
+def _sharded_fallback(quantities, updated, apply):
+    """
+    Finish an UPDATE that skipped sharded variants: ``updated`` of the
+    variants in ``quantities`` were handled on their rows, and
+    ``apply(variant_id, shard_count, quantity)`` handles each sharded one.
+    Returns False if an unsharded variant was not updated or a shard update
+    failed.
+    """
+    if updated == len(quantities):
+        return True
+    shards = sharded(quantities)
+    if updated != len(quantities) - len(shards):
+        return False
+    return all(apply(variant_id, count, quantities[variant_id]) for variant_id, count in shards.items())
+
+
+def reserve(variant_id, quantity):
+    """Add ``quantity`` to the variant's reserved counter if that much is available."""
+    updated = ProductVariant.objects.filter(
+        pk=variant_id, shard_count=0, stock__gte=F('reserved') + quantity
+    ).update(reserved=F('reserved') + quantity)
+    return _sharded_fallback({variant_id: quantity}, updated, reserve_shards)
+
+
+def release(quantities):
+    """Give back ``quantities`` ({variant id: quantity}) to the reserved counters."""
+    quantities = {variant_id: qty for variant_id, qty in quantities.items() if qty}
+    if quantities:
+        amount = _per_variant(quantities)
+        # Clamped: a counter that drifted below its holds must not go negative
+        released = ProductVariant.objects.filter(
+            pk__in=list(quantities), shard_count=0
+        ).update(reserved=Greatest(F('reserved') - amount, 0))
+        _sharded_fallback(quantities, released, release_shards)
+
+
+def set_hold(cart_item, quantity):
+    """
+    Make the hold for ``cart_item`` cover ``quantity`` units and restart its
+    timer. Returns False, changing nothing, if the extra units are not available.
+    Items without a variant carry no stock and always succeed.
+    """
+    if not cart_item.variant_id:
+        return True
+    # No savepoint: nothing is written before the only early return
+    with transaction.atomic(savepoint=False):
+        hold = StockReservation.objects.select_for_update().filter(cart_item=cart_item).first()
+        held = hold.quantity if hold else 0
+        if quantity > held and not reserve(cart_item.variant_id, quantity - held):
+            return False
+        release({cart_item.variant_id: held - quantity} if held > quantity else {})
+        if not quantity:
+            if hold:
+                hold.delete()
+        elif hold:
+            StockReservation.objects.filter(pk=hold.pk).update(quantity=quantity, expires_at=hold_expiry())
+        else:
+            StockReservation.objects.create(
+                cart_item=cart_item, variant_id=cart_item.variant_id,
+                quantity=quantity, expires_at=hold_expiry(),
+            )
+    return True
+
+
+def set_holds(quantities):
+    """
+    Bulk form of set_hold for one cart: ``quantities`` is {CartItem: quantity}.
+    One conditional UPDATE reserves every increase and one returns every
+    decrease, then hold rows are created, updated and deleted in bulk. Returns
+    False if some variant lacks the extra stock, in which case the reserved
+    counters may be partly updated and the caller must roll back.
+    """
+    quantities = {item: qty for item, qty in quantities.items() if item.variant_id}
+    if not quantities:
+        return True
+    holds = {
+        hold.cart_item_id: hold
+        for hold in StockReservation.objects.select_for_update().filter(
+            cart_item_id__in=[item.pk for item in quantities]
+        )
+    }
+    deltas = {}
+    for item, qty in quantities.items():
+        held = holds[item.pk].quantity if item.pk in holds else 0
+        deltas[item.variant_id] = deltas.get(item.variant_id, 0) + qty - held
+    increases = {variant_id: delta for variant_id, delta in deltas.items() if delta > 0}
+    if increases:
+        amount = _per_variant(increases)
+        reserved = ProductVariant.objects.filter(
+            pk__in=list(increases), shard_count=0, stock__gte=F('reserved') + amount
+        ).update(reserved=F('reserved') + amount)
+        if not _sharded_fallback(increases, reserved, reserve_shards):
+            return False
+    release({variant_id: -delta for variant_id, delta in deltas.items() if delta < 0})
+
+    expires_at = hold_expiry()
+    changed, created, dropped = [], [], []
+    for item, qty in quantities.items():
+        hold = holds.get(item.pk)
+        if hold and not qty:
+            dropped.append(hold.pk)
+        elif hold:
+            hold.quantity, hold.expires_at = qty, expires_at
+            changed.append(hold)
+        elif qty:
+            created.append(StockReservation(
+                cart_item=item, variant_id=item.variant_id, quantity=qty, expires_at=expires_at
+            ))
+    if dropped:
+        StockReservation.objects.filter(pk__in=dropped).delete()
+    StockReservation.objects.bulk_update(changed, ['quantity', 'expires_at'])
+    StockReservation.objects.bulk_create(created)
+    return True
+
+
+def convert_holds(cart_item_ids, quantities):
+    """
+    Turn the cart's holds into sold stock. ``quantities`` is {variant id:
+    quantity ordered}. Stock is taken in one conditional UPDATE that counts the
+    cart's own holds as available to it; returns False, for the caller to roll
+    back, if any variant no longer has enough. Call inside a transaction.
+    """
+    holds = StockReservation.objects.select_for_update().filter(cart_item_id__in=cart_item_ids)
+    held = {}
+    for variant_id, qty in holds.values_list('variant_id', 'quantity'):
+        held[variant_id] = held.get(variant_id, 0) + qty
+    holds.delete()
+
+    quantity = _per_variant(quantities)
+    own_hold = _per_variant({variant_id: held.get(variant_id, 0) for variant_id in quantities})
+    # Clamped like release(): a counter that drifted below the holds must not go negative
+    others = Greatest(F('reserved') - own_hold, 0)
+    updated = ProductVariant.objects.filter(
+        pk__in=list(quantities), shard_count=0, stock__gte=others + quantity
+    ).update(stock=F('stock') - quantity, reserved=others)
+    if updated == len(quantities):
+        return True
+    shard_reserved = {variant_id: reserved for variant_id, (_, reserved) in shard_totals(quantities).items()}
+    return _sharded_fallback(quantities, updated, lambda variant_id, count, qty: (
+        release_shards(variant_id, count, min(held.get(variant_id, 0), shard_reserved.get(variant_id, 0)))
+        and take_shards(variant_id, count, qty)
+    ))
+
+
+def release_expired(now=None, batch_size=500):
+    """
+    Delete holds that expired before ``now`` in batches of ``batch_size``,
+    returning their stock. Each batch is its own short transaction so the
+    sweep never blocks checkout for long. Returns the number of holds released.
+    """
+    now = now or timezone.now()
+    released = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                StockReservation.objects.select_for_update(skip_locked=True)
+                .filter(expires_at__lte=now)
+                .order_by('expires_at')
+                .values_list('pk', 'variant_id', 'quantity')[:batch_size]
+            )
+            if not batch:
+                return released
+            quantities = {}
+            for pk, variant_id, qty in batch:
+                quantities[variant_id] = quantities.get(variant_id, 0) + qty
+            StockReservation.objects.filter(pk__in=[row[0] for row in batch]).delete()
+            release(quantities)
+        released += len(batch)
+
+
+
+class Discrepancy(NamedTuple):
+    variant_id: int
+    check: str  # 'ledger': stock vs. the ledger's sum; 'reserved': reserved vs. live holds
+    recorded: int
+    expected: int
+
+
+def reconcile_inventory(fix=False, batch_size=1000):
+    """
+    Audit every variant, ``batch_size`` at a time: its stock must equal the
+    sum of its ledger movements, and its reserved count the sum of its live
+    holds (both read from the shards of sharded variants). Returns the
+    Discrepancy list. With ``fix``, a correction movement brings the ledger
+    in line with the stock, and reserved is reset to the holds.
+    """
+    found = []
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            variants = list(
+                ProductVariant.objects.select_for_update().filter(pk__gt=last_id).order_by('pk')
+                .values_list('pk', 'stock', 'reserved', 'shard_count')[:batch_size]
+            )
+            if not variants:
+                return found
+            variant_ids = [row[0] for row in variants]
+            last_id = variant_ids[-1]
+            shards = shard_totals([pk for pk, stock, reserved, count in variants if count])
+            ledger = dict(
+                InventoryMovement.objects.filter(variant_id__in=variant_ids)
+                .values('variant_id').annotate(total=Sum('delta')).values_list('variant_id', 'total')
+            )
+            holds = dict(
+                StockReservation.objects.filter(variant_id__in=variant_ids)
+                .values('variant_id').annotate(total=Sum('quantity')).values_list('variant_id', 'total')
+            )
+            corrections = []
+            for pk, stock, reserved, shard_count in variants:
+                if shard_count:
+                    stock, reserved = shards.get(pk, (0, 0))
+                if ledger.get(pk, 0) != stock:
+                    found.append(Discrepancy(pk, 'ledger', ledger.get(pk, 0), stock))
+                    corrections.append(InventoryMovement(
+                        variant_id=pk, delta=stock - ledger.get(pk, 0), reason='correction'
+                    ))
+                held = holds.get(pk, 0)
+                if held != reserved:
+                    found.append(Discrepancy(pk, 'reserved', reserved, held))
+                    if not fix:
+                        continue
+                    if not shard_count:
+                        ProductVariant.objects.filter(pk=pk).update(reserved=held)
+                    elif held > reserved:
+                        reserve_shards(pk, shard_count, held - reserved)
+                    else:
+                        release_shards(pk, shard_count, reserved - held)
+            if fix:
+                InventoryMovement.objects.bulk_create(corrections)
@@ -0,0 +1,238 @@
+# apps/orders/sales.py
+"""
+Keeping the VendorDailySales and ProductDailySales rollups current.
+
+Checkout and status changes add their deltas to the (vendor, day) and
+(product, day) rows with one F() update per table inside their own
+transaction, so the rollups commit or roll back with the orders. Revenue and
+product sales only count orders that are paid and not cancelled or refunded
+(``earns_revenue``), so a change that moves an order in or out of that state
+adds or takes back its total and its items. Missing rows
+are inserted first with ignore_conflicts, which makes the write an upsert
+without a read: two queries per table however many vendors, products and
+days are touched. ``rebuild_daily_sales`` recomputes the rows from the order
+tables, a few vendors per transaction; it backfills history and repairs
+drift from edits made outside these paths.
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.vendors.models import VendorProfile
+from .models import ArchivedOrder, Order, OrderItem, ProductDailySales, VendorDailySales
+
+STATUS_FIELDS = [status for status, label in Order.ORDER_STATUS_CHOICES]
+UNEARNED_STATUSES = ('cancelled', 'refunded')
+
+
+class OrderChange(NamedTuple):
+    """An order's status and payment status before and after a change."""
+    pk: int
+    created_at: datetime
+    total_amount: Decimal
+    from_status: str
+    to_status: str
+    from_payment_status: str
+    to_payment_status: str
+
+
+def earns_revenue(status, payment_status):
+    """Whether an order counts toward revenue and product sales."""
+    return payment_status == 'completed' and status not in UNEARNED_STATUSES
+
+
+def earning(prefix=''):
+    """earns_revenue as a filter, on ``prefix`` (e.g. 'order__') for related models."""
+    return Q(**{f'{prefix}payment_status': 'completed'}) & ~Q(**{f'{prefix}status__in': UNEARNED_STATUSES})
+
+
+def sales_day(moment):
+    return timezone.localdate(moment)
+
+
+def apply_deltas(model, key_fields, deltas):
+    """Add {key: {field: amount}} to ``model``'s rows, a key being the values of ``key_fields``."""
+    deltas = {key: changes for key, changes in deltas.items() if any(changes.values())}
+    if not deltas:
+        return
+    model.objects.bulk_create(
+        [model(**dict(zip(key_fields, key))) for key in deltas], ignore_conflicts=True,
+    )
+    rows = Q()
+    for key in deltas:
+        rows |= Q(**dict(zip(key_fields, key)))
+    fields = {field for changes in deltas.values() for field, amount in changes.items() if amount}
+    model.objects.filter(rows).update(**{
+        field: F(field) + Case(
+            *[When(**dict(zip(key_fields, key)), then=Value(changes[field]))
+              for key, changes in deltas.items() if changes.get(field)],
+            default=Value(0),
+            output_field=model._meta.get_field(field),
+        )
+        for field in fields
+    })
+
+
+def _add(deltas, key, field, amount):
+    changes = deltas.setdefault(key, {})
+    changes[field] = changes.get(field, 0) + amount
+
+
+def _add_product_sales(deltas, vendor_id, day, lines, sign=1):
+    """Count one order's ``lines``, (product id, quantity, unit price) triples, ``sign`` times."""
+    for product_id in {product_id for product_id, quantity, price in lines}:
+        _add(deltas, (vendor_id, product_id, day), 'orders', sign)
+    for product_id, quantity, price in lines:
+        key = (vendor_id, product_id, day)
+        _add(deltas, key, 'units', sign * quantity)
+        _add(deltas, key, 'revenue', sign * quantity * price)
+
+
+def record_orders(placed):
+    """Count newly created orders, given as (order, its OrderItems) pairs."""
+    vendor_deltas, product_deltas = {}, {}
+    for order, items in placed:
+        day = sales_day(order.created_at)
+        key = (order.vendor_id, day)
+        _add(vendor_deltas, key, 'orders', 1)
+        _add(vendor_deltas, key, 'units', sum(item.quantity for item in items))
+        _add(vendor_deltas, key, order.status, 1)
+        if earns_revenue(order.status, order.payment_status):
+            _add(vendor_deltas, key, 'gross_revenue', order.total_amount)
+            _add_product_sales(product_deltas, order.vendor_id, day, [
+                (item.product_id, item.quantity, item.price_at_purchase) for item in items
+            ])
+    apply_deltas(VendorDailySales, ('vendor_id', 'day'), vendor_deltas)
+    apply_deltas(ProductDailySales, ('vendor_id', 'product_id', 'day'), product_deltas)
+
+
+def record_transitions(vendor_id, changes):
+    """
+    Apply the vendor's OrderChanges: move orders between status counts, and
+    add or take back the revenue and product sales of orders that start or
+    stop earning revenue (one more query, for their items, when any do).
+    """
+    deltas, product_deltas, flipped = {}, {}, {}
+    for change in changes:
+        key = (vendor_id, sales_day(change.created_at))
+        if change.from_status != change.to_status:
+            _add(deltas, key, change.from_status, -1)
+            _add(deltas, key, change.to_status, 1)
+        earned = earns_revenue(change.from_status, change.from_payment_status)
+        if earned != earns_revenue(change.to_status, change.to_payment_status):
+            sign = -1 if earned else 1
+            _add(deltas, key, 'gross_revenue', sign * change.total_amount)
+            flipped[change.pk] = (key[1], sign)
+    if flipped:
+        lines = {}
+        items = OrderItem.objects.filter(order_id__in=list(flipped)).values_list(
+            'order_id', 'product_id', 'quantity', 'price_at_purchase'
+        )
+        for order_pk, product_id, quantity, price in items:
+            lines.setdefault(order_pk, []).append((product_id, quantity, price))
+        for order_pk, (day, sign) in flipped.items():
+            _add_product_sales(product_deltas, vendor_id, day, lines.get(order_pk, []), sign)
+    apply_deltas(VendorDailySales, ('vendor_id', 'day'), deltas)
+    apply_deltas(ProductDailySales, ('vendor_id', 'product_id', 'day'), product_deltas)
+
+
+def _order_rows(model, vendor_ids):
+    return (
+        model.objects.filter(vendor_id__in=vendor_ids)
+        .annotate(day=TruncDate('created_at'))
+        .values('vendor_id', 'day')
+        .annotate(
+            orders=Count('id'),
+            gross_revenue=Sum('total_amount', filter=earning()),
+            **{status: Count('id', filter=Q(status=status)) for status in STATUS_FIELDS},
+        )
+        .order_by()
+    )
+
+
+def _product_rows(vendor_ids):
+    return (
+        OrderItem.objects.filter(earning('order__'), order__vendor_id__in=vendor_ids)
+        .annotate(day=TruncDate('order__created_at'))
+        .values_list('order__vendor_id', 'product_id', 'day')
+        .annotate(
+            orders=Count('order', distinct=True),
+            units=Sum('quantity'),
+            revenue=Sum(F('quantity') * F('price_at_purchase'), output_field=DecimalField()),
+        )
+        .order_by()
+    )
+
+
+def daily_sales(vendor_ids):
+    """
+    Compute the rollup rows of ``vendor_ids`` from Order, OrderItem and
+    ArchivedOrder; returns (VendorDailySales rows, ProductDailySales rows).
+    """
+    rows, product_rows = {}, {}
+    for model in (Order, ArchivedOrder):
+        for row in _order_rows(model, vendor_ids):
+            key = (row.pop('vendor_id'), row.pop('day'))
+            current = rows.setdefault(key, VendorDailySales(vendor_id=key[0], day=key[1]))
+            for field, amount in row.items():
+                setattr(current, field, getattr(current, field) + (amount or 0))
+    units = (
+        OrderItem.objects.filter(order__vendor_id__in=vendor_ids)
+        .annotate(day=TruncDate('order__created_at'))
+        .values_list('order__vendor_id', 'day')
+        .annotate(units=Sum('quantity'))
+        .order_by()
+    )
+    for vendor_id, day, quantity in units:
+        rows[vendor_id, day].units += quantity
+    for vendor_id, product_id, day, orders, quantity, revenue in _product_rows(vendor_ids):
+        product_rows[product_id, day] = ProductDailySales(
+            vendor_id=vendor_id, product_id=product_id, day=day, orders=orders, units=quantity, revenue=revenue,
+        )
+
+    archived = ArchivedOrder.objects.filter(vendor_id__in=vendor_ids).values_list(
+        'vendor_id', 'created_at', 'status', 'payment_status', 'items_data'
+    )
+    for vendor_id, created_at, status, payment_status, items in archived.iterator():
+        day = sales_day(created_at)
+        rows[vendor_id, day].units += sum(item['quantity'] for item in items)
+        if not earns_revenue(status, payment_status):
+            continue
+        for product_id in {item['product_id'] for item in items}:
+            current = product_rows.setdefault(
+                (product_id, day), ProductDailySales(vendor_id=vendor_id, product_id=product_id, day=day)
+            )
+            current.orders += 1
+        for item in items:
+            current = product_rows[item['product_id'], day]
+            current.units += item['quantity']
+            current.revenue += item['quantity'] * Decimal(item['price_at_purchase'])
+    return list(rows.values()), list(product_rows.values())
+
+
+def rebuild_daily_sales(vendor_ids=None, batch_size=50):
+    """
+    Recompute the rollups of every vendor (or those in ``vendor_ids``),
+    ``batch_size`` vendors per transaction. Returns the number of rows written.
+    """
+    vendors = VendorProfile.objects.order_by('pk').values_list('pk', flat=True)
+    if vendor_ids is not None:
+        vendors = vendors.filter(pk__in=list(vendor_ids))
+    written, last = 0, 0
+    while True:
+        chunk = list(vendors.filter(pk__gt=last)[:batch_size])
+        if not chunk:
+            return written
+        with transaction.atomic():
+            rows, product_rows = daily_sales(chunk)
+            VendorDailySales.objects.filter(vendor_id__in=chunk).delete()
+            ProductDailySales.objects.filter(vendor_id__in=chunk).delete()
+            VendorDailySales.objects.bulk_create(rows, batch_size=500)
+            ProductDailySales.objects.bulk_create(product_rows, batch_size=500)
+        written += len(rows) + len(product_rows)
+        last = chunk[-1]
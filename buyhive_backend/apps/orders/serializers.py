@@ -1,6 +1,7 @@
 from rest_framework import serializers
+from django.urls import reverse
 from django.utils.translation import gettext_lazy as _  # [UPDATED] Added translation
-from .models import Cart, CartItem, Order, OrderItem
+from .models import Cart, CartItem, CheckoutJob, Order, OrderItem
 from apps.products.models import Product, ProductVariant
 from apps.products.serializers import ProductListSerializer, ProductVariantSerializer  # [UPDATED] Use lighter serializer
 from apps.accounts.models import Address
@@ -14,7 +15,8 @@ class CartItemSerializer(serializers.ModelSerializer):
         source='product'
     )
     variant_id = serializers.PrimaryKeyRelatedField(
-        queryset=ProductVariant.objects.filter(is_active=True),  # [UPDATED] Only active variants
+        # [UPDATED] Only active variants, loaded with their shard totals for the stock check
+        queryset=ProductVariant.objects.with_shard_totals().filter(is_active=True),
         write_only=True, 
         source='variant', 
         allow_null=True, 
@@ -41,13 +43,12 @@ class CartItemSerializer(serializers.ModelSerializer):
         if variant and variant.product != product:
             raise serializers.ValidationError(_("Variant does not belong to the selected product."))
         
-        # Check stock
-        stock_item = variant if variant else product
+        # Quick check against stock not held in other carts; the hold placed by the view is authoritative
         quantity = data.get('quantity')
         
-        if hasattr(stock_item, 'stock') and stock_item.stock < quantity:
+        if variant and quantity is not None and variant.available < quantity:
             raise serializers.ValidationError(
-                f"Not enough stock for {stock_item.name if variant else product.title}. Available: {stock_item.stock}"
+                f"Not enough stock for {variant.name}. Available: {variant.available}"
             )
         
         return data
@@ -62,6 +63,65 @@ class CartSerializer(serializers.ModelSerializer):
         fields = ('id', 'items', 'total_price', 'total_items', 'created_at', 'updated_at')
         read_only_fields = ('user',)
 
+class GuestCartItemSerializer(CartItemSerializer):
+    """Guest cart lines are not rows; their id is the "<product id>-<variant id>" session key."""
+    id = serializers.SerializerMethodField()
+    
+    def get_id(self, obj):
+        return f"{obj.product_id}-{obj.variant_id or ''}"
+
+class CartSummarySerializer(serializers.Serializer):
+    items = serializers.IntegerField(read_only=True)
+    quantity = serializers.IntegerField(read_only=True)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+class CartBatchOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=('add', 'set', 'remove'))
+    product_id = serializers.IntegerField()
+    variant_id = serializers.IntegerField(allow_null=True, required=False, default=None)
+    quantity = serializers.IntegerField(min_value=0, max_value=99, required=False)
+    
+    def validate(self, data):
+        if data['op'] != 'remove' and data.get('quantity') is None:
+            raise serializers.ValidationError({'quantity': _("This field is required.")})
+        if data['op'] == 'add' and not data['quantity']:
+            raise serializers.ValidationError({'quantity': _("Quantity must be greater than 0.")})
+        return data
+
+class CartBatchSerializer(serializers.Serializer):
+    """
+    A list of cart operations applied in order. Products and variants are
+    checked for every operation in one query each; ``variants`` carries the
+    loaded variants on to the view for its stock check.
+    """
+    operations = CartBatchOperationSerializer(many=True, allow_empty=False, max_length=100)
+    
+    def validate(self, data):
+        operations = data['operations']
+        on_sale = set(
+            Product.objects.filter(
+                pk__in={op['product_id'] for op in operations}, is_active=True
+            ).values_list('pk', flat=True)
+        )
+        variants = ProductVariant.objects.with_shard_totals().filter(
+            pk__in={op['variant_id'] for op in operations if op['variant_id']}, is_active=True
+        ).in_bulk()
+        errors = []
+        for op in operations:
+            error = {}
+            # Removing a line is allowed even once its product is off sale
+            if op['op'] != 'remove':
+                variant = variants.get(op['variant_id'])
+                if op['product_id'] not in on_sale:
+                    error['product_id'] = [_("Product not found or not on sale.")]
+                elif op['variant_id'] and (variant is None or variant.product_id != op['product_id']):
+                    error['variant_id'] = [_("Variant does not belong to the selected product.")]
+            errors.append(error)
+        if any(errors):
+            raise serializers.ValidationError({'operations': errors})
+        data['variants'] = variants
+        return data
+
 class OrderItemSerializer(serializers.ModelSerializer):
     product_title = serializers.CharField(source='product.title', read_only=True)
     variant_name = serializers.CharField(source='variant.name', read_only=True, allow_null=True)
@@ -106,3 +166,43 @@ class OrderSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         raise NotImplementedError(_("Use the checkout view for order creation."))
+
+class OrderListSerializer(serializers.ModelSerializer):
+    """Order history rows: an item count and the first few items instead of every item."""
+    customer_email = serializers.EmailField(source='customer.email', read_only=True)
+    vendor_business_name = serializers.CharField(source='vendor.business_name', read_only=True)
+    items_count = serializers.IntegerField(read_only=True)
+    preview_items = OrderItemSerializer(many=True, read_only=True)
+    can_be_cancelled = serializers.BooleanField(read_only=True)
+    is_completed = serializers.BooleanField(read_only=True)
+    
+    class Meta:
+        model = Order
+        fields = (
+            'id', 'order_id', 'customer_email', 'vendor_business_name', 'total_amount',
+            'status', 'payment_status', 'payment_method', 'tracking_number', 'estimated_delivery',
+            'items_count', 'preview_items', 'can_be_cancelled', 'is_completed', 'created_at', 'updated_at',
+        )
+        read_only_fields = fields
+
+class CheckoutJobSerializer(serializers.ModelSerializer):
+    """A queued checkout; ``orders`` is filled in once it has succeeded and ``detail`` once it has failed."""
+    job_id = serializers.UUIDField(source='id', read_only=True)
+    detail = serializers.CharField(source='error', read_only=True)
+    orders = serializers.SerializerMethodField()
+    status_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = CheckoutJob
+        fields = ('job_id', 'status', 'detail', 'orders', 'status_url', 'created_at', 'finished_at')
+    
+    def get_orders(self, job):
+        if not job.order_pks:
+            return []
+        orders = Order.objects.filter(pk__in=job.order_pks).with_items()
+        return OrderSerializer(orders, many=True, context=self.context).data
+    
+    def get_status_url(self, job):
+        url = reverse('checkout-job', args=[job.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
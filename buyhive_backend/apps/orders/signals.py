@@ -0,0 +1,37 @@
+# apps/orders/signals.py
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.vendors.analytics import invalidate_analytics
+from .models import Cart, CartItem, Order, StockReservation
+from .reservations import release
+
+
+@receiver([post_save, post_delete], sender=CartItem)
+def invalidate_cart_summary(sender, instance, **kwargs):
+    if CartItem.cart.is_cached(instance):
+        user_id = instance.cart.user_id
+    else:
+        user_id = Cart.objects.filter(pk=instance.cart_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        # After commit, so a concurrent reader cannot re-cache the old totals
+        key = Cart.summary_cache_key(user_id)
+        transaction.on_commit(lambda: cache.delete(key))
+
+
+@receiver(post_save, sender=Order)
+def invalidate_order_analytics(sender, instance, raw=False, **kwargs):
+    # Bulk paths (checkout, status transitions, archiving) invalidate explicitly
+    if not raw:
+        invalidate_analytics(instance.vendor_id)
+
+
+@receiver(post_delete, sender=StockReservation)
+def release_cascaded_hold(sender, instance, origin=None, **kwargs):
+    # apps.orders.reservations returns the units of the holds it deletes; holds
+    # deleted along with their cart item (or cart, or customer) land here
+    if isinstance(origin, StockReservation) or getattr(origin, 'model', None) is StockReservation:
+        return
+    release({instance.variant_id: instance.quantity})
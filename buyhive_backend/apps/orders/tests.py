@@ -1,3 +1,888 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.orders.checkout import place_orders
+from apps.orders.filters import OrderFilterSet
+from apps.orders.idempotency import _claim, request_fingerprint
+from apps.orders.jobs import claim, process_pending
+from apps.orders.models import (
+    ArchivedOrder, CartItem, CheckoutJob, IdempotencyKey, Order, OrderItem, ProductDailySales, StockReservation,
+    VendorDailySales,
+)
+from apps.orders.reservations import release
+from apps.orders.sales import STATUS_FIELDS, daily_sales
+from apps.outbox.models import OutboxEvent
+from apps.products.models import ProductVariant
+from buyhive_backend.db import retry_on_lock
+from buyhive_backend.testing import (
+    QueryBudgetTestCase, seed_marketplace, fill_cart,
+    make_address, make_category, make_order, make_product, make_user, make_vendor,
+)
+
+
+class OrdersQueryBudgetTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_marketplace()
+        cls.customer = cls.data['customers'][0]
+        cls.vendor = cls.data['vendors'][0]
+        # Two lines from every vendor so checkout splits into several orders
+        cls.cart_variants = [
+            variant
+            for vendor in cls.data['vendors']
+            for variant in ProductVariant.objects.filter(product__vendor=vendor)[:2]
+        ]
+        cls.cart = fill_cart(cls.customer, cls.cart_variants)
+
+    def test_cart(self):
+        self.assertQueryBudget(6, 'get', 'user-cart', user=self.customer, expected_status=200)
+
+    def test_cart_item_list(self):
+        self.assertQueryBudget(6, 'get', 'cart-item-list', user=self.customer,
+                               expected_status=200)
+
+    def test_cart_summary(self):
+        self.assertQueryBudget(1, 'get', 'cart-summary', user=self.customer, expected_status=200)
+        self.assertQueryBudget(0, 'get', 'cart-summary', user=self.customer, expected_status=200)
+
+    def test_cart_item_create_update_delete(self):
+        variant = ProductVariant.objects.exclude(pk__in=[v.pk for v in self.cart_variants]).first()
+        response = self.assertQueryBudget(17, 'post', 'cart-item-list', user=self.customer, data={
+            'product_id': variant.product_id, 'variant_id': variant.pk, 'quantity': 1,
+        }, expected_status=201)
+        item_id = response.data['id']
+        self.assertQueryBudget(11, 'patch', 'cart-item-detail', args=[item_id],
+                               user=self.customer, data={'quantity': 2}, expected_status=200)
+        self.assertQueryBudget(9, 'delete', 'cart-item-detail', args=[item_id],
+                               user=self.customer, expected_status=204)
+
+    def test_cart_batch_query_count_does_not_grow_with_batch(self):
+        variants = ProductVariant.objects.exclude(pk__in=[v.pk for v in self.cart_variants])[:20]
+        operations = [
+            {'op': 'add', 'product_id': v.product_id, 'variant_id': v.pk, 'quantity': 1} for v in variants
+        ] + [
+            {'op': 'set', 'product_id': self.cart_variants[0].product_id,
+             'variant_id': self.cart_variants[0].pk, 'quantity': 2},
+            {'op': 'remove', 'product_id': self.cart_variants[1].product_id,
+             'variant_id': self.cart_variants[1].pk},
+        ]
+        self.assertQueryBudget(16, 'post', 'cart-item-batch', user=self.customer,
+                               data={'operations': operations}, expected_status=200)
+
+    def test_checkout(self):
+        address = self.customer.addresses.first()
+        self.assertQueryBudget(20, 'post', 'checkout', user=self.customer,
+                               data={'shipping_address_id': address.pk}, expected_status=201)
+
+    def test_checkout_query_count_does_not_grow_with_cart(self):
+        customer = self.data['customers'][1]
+        fill_cart(customer, ProductVariant.objects.all()[:30])
+        self.assertQueryBudget(20, 'post', 'checkout', user=customer,
+                               data={'shipping_address_id': customer.addresses.first().pk},
+                               expected_status=201)
+
+    def test_customer_order_list(self):
+        # Page and preview items, plus the archive once the hot rows run out
+        self.assertQueryBudget(3, 'get', 'customer-order-list', user=self.customer,
+                               expected_status=200)
+
+    def test_customer_order_list_full_recent_page(self):
+        # A page the recent orders fill never reads the archive
+        self.assertQueryBudget(2, 'get', 'customer-order-list', user=self.customer,
+                               data={'page_size': 1}, expected_status=200)
+
+    def test_order_list_previews_items(self):
+        order = Order.objects.filter(customer=self.customer).first()
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=variant.product, variant=variant, quantity=1, price_at_purchase=1)
+            for variant in ProductVariant.objects.all()[:4]
+        ])
+        self.client.force_authenticate(self.customer)
+        response = self.client.get(reverse('customer-order-list'))
+        row = next(row for row in response.data['results'] if row['order_id'] == str(order.order_id))
+        self.assertEqual(row['items_count'], order.items.count())
+        self.assertEqual(len(row['preview_items']), 3)
+        self.assertNotIn('items', row)
+
+    def test_customer_order_detail(self):
+        order = Order.objects.filter(customer=self.customer).first()
+        self.assertQueryBudget(2, 'get', 'customer-order-detail', args=[order.order_id],
+                               user=self.customer, expected_status=200)
+
+    def test_vendor_order_list(self):
+        self.assertQueryBudget(3, 'get', 'vendor-order-list', user=self.vendor.user,
+                               expected_status=200)
+
+    def test_vendor_order_detail(self):
+        order = Order.objects.filter(vendor=self.vendor).first()
+        self.assertQueryBudget(2, 'get', 'vendor-order-detail', args=[order.order_id],
+                               user=self.vendor.user, expected_status=200)
+
+
+class CheckoutTests(APITestCase):
+    def setUp(self):
+        self.customer = make_user()
+        self.address = make_address(self.customer)
+        category = make_category()
+        self.variants = [
+            make_product(make_vendor(), category, variants=1).variants.get()
+            for _ in range(2)
+        ]
+        self.client.force_authenticate(self.customer)
+
+    def checkout(self):
+        return self.client.post(reverse('checkout'), {'shipping_address_id': self.address.pk}, format='json')
+
+    def test_splits_orders_and_decrements_stock(self):
+        fill_cart(self.customer, self.variants, quantity=3)
+        response = self.checkout()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['orders']), 2)
+        self.assertEqual(OrderItem.objects.filter(order__customer=self.customer).count(), 2)
+        for variant in self.variants:
+            variant.refresh_from_db()
+            self.assertEqual(variant.stock, 47)
+        self.assertFalse(CartItem.objects.filter(cart__user=self.customer).exists())
+
+    def test_shortage_rolls_back_everything(self):
+        fill_cart(self.customer, self.variants, quantity=3)
+        # Another checkout took most of the second variant after this cart was filled
+        ProductVariant.objects.filter(pk=self.variants[1].pk).update(stock=2)
+        response = self.checkout()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Available: 2', str(response.data['detail']))
+        self.assertFalse(Order.objects.filter(customer=self.customer).exists())
+        self.variants[0].refresh_from_db()
+        self.assertEqual(self.variants[0].stock, 50)
+        self.assertEqual(CartItem.objects.filter(cart__user=self.customer).count(), 2)
+
+
+class AsyncCheckoutTests(APITestCase):
+    def setUp(self):
+        category = make_category()
+        self.variants = [make_product(make_vendor(), category, variants=1).variants.get() for _ in range(2)]
+
+    def enqueue(self, customer, **data):
+        self.client.force_authenticate(customer)
+        data.setdefault('shipping_address_id', make_address(customer).pk)
+        return self.client.post(reverse('checkout'), data, format='json', HTTP_PREFER='respond-async')
+
+    def test_accepts_then_places_orders_in_the_background(self):
+        customer = make_user()
+        fill_cart(customer, self.variants)
+        response = self.enqueue(customer)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'queued')
+        self.assertEqual(response['Location'], response.data['status_url'])
+        self.assertFalse(Order.objects.exists())
+        # Asking again while the job is open returns the same job; asking for something else conflicts
+        self.assertEqual(self.enqueue(customer).data['job_id'], response.data['job_id'])
+        self.assertEqual(self.enqueue(customer, payment_method='Card').status_code, 409)
+        self.assertEqual(CheckoutJob.objects.count(), 1)
+
+        out = StringIO()
+        call_command('process_checkout_jobs', stdout=out)
+        self.assertIn('Processed 1 checkout job(s)', out.getvalue())
+        job = self.client.get(reverse('checkout-job', args=[response.data['job_id']]), {'wait': 5})
+        self.assertEqual(job.data['status'], 'succeeded')
+        self.assertEqual(sorted(order['order_id'] for order in job.data['orders']),
+                         sorted(str(pk) for pk in Order.objects.values_list('order_id', flat=True)))
+        self.assertFalse(CartItem.objects.filter(cart__user=customer).exists())
+
+    def test_failed_job_does_not_spoil_its_batch(self):
+        lucky, unlucky = make_user(), make_user()
+        fill_cart(lucky, self.variants[:1])
+        fill_cart(unlucky, self.variants[1:], quantity=3)
+        jobs = {customer: self.enqueue(customer).data['job_id'] for customer in (lucky, unlucky)}
+        ProductVariant.objects.filter(pk=self.variants[1].pk).update(stock=2)  # Sold elsewhere meanwhile
+        self.assertEqual(process_pending(batch_size=10), 2)
+
+        self.assertEqual(CheckoutJob.objects.get(pk=jobs[lucky]).status, 'succeeded')
+        self.assertEqual(Order.objects.get().customer, lucky)
+        failed = CheckoutJob.objects.get(pk=jobs[unlucky])
+        self.assertEqual(failed.status, 'failed')
+        self.assertIn('Available: 2', failed.error)
+        self.assertEqual(CartItem.objects.filter(cart__user=unlucky).count(), 1)
+
+    def test_job_that_errors_rolls_back_alone(self):
+        lucky, unlucky = make_user(), make_user()
+        for customer in (lucky, unlucky):
+            fill_cart(customer, self.variants)
+        jobs = {customer: self.enqueue(customer).data['job_id'] for customer in (lucky, unlucky)}
+
+        def place_then_break(user, *args):
+            orders = place_orders(user, *args)
+            if user == unlucky:
+                raise RuntimeError('Payment gateway went away')
+            return orders
+
+        with patch('apps.orders.jobs.place_orders', place_then_break), self.assertLogs('apps.orders.jobs'):
+            self.assertEqual(process_pending(batch_size=10), 2)
+        self.assertEqual(CheckoutJob.objects.get(pk=jobs[lucky]).status, 'succeeded')
+        self.assertEqual(CheckoutJob.objects.get(pk=jobs[unlucky]).status, 'failed')
+        self.assertEqual(set(Order.objects.values_list('customer', flat=True)), {lucky.pk})
+        self.assertEqual(CartItem.objects.filter(cart__user=unlucky).count(), 2)
+
+    def test_stock_is_checked_when_accepting(self):
+        customer = make_user()
+        fill_cart(customer, self.variants[:1], quantity=3)
+        ProductVariant.objects.filter(pk=self.variants[0].pk).update(stock=2)
+        response = self.enqueue(customer)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Available: 2', response.data['detail'])
+        self.assertFalse(CheckoutJob.objects.exists())
+
+    def test_job_places_the_accepted_cart_or_fails(self):
+        customer = make_user()
+        fill_cart(customer, self.variants[:1])
+        self.enqueue(customer)
+        fill_cart(customer, self.variants[1:])  # Added after the checkout was accepted
+        process_pending()
+        job = CheckoutJob.objects.get()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('cart changed', job.error)
+        self.assertFalse(Order.objects.exists())
+
+    def test_jobs_are_claimed_once_until_the_lease_runs_out(self):
+        customer = make_user()
+        fill_cart(customer, self.variants)
+        self.enqueue(customer)
+        self.assertIsNotNone(claim(10))
+        self.assertIsNone(claim(10))
+        self.assertIsNotNone(claim(10, now=timezone.now() + timedelta(minutes=5)))
+        self.assertEqual(CheckoutJob.objects.get().attempts, 2)
+
+    def test_status_is_private_and_validates_wait(self):
+        customer = make_user()
+        fill_cart(customer, self.variants)
+        url = reverse('checkout-job', args=[self.enqueue(customer).data['job_id']])
+        self.assertEqual(self.client.get(url, {'wait': 'soon'}).status_code, 400)
+        self.client.force_authenticate(make_user())
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class BenchCommandTests(SimpleTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        # bench points the default connection at its own SQLite file. Give it a
+        # connection of its own so the in-memory test database is never closed.
+        test_connection = connections['default']
+        names = test_connection.settings_dict['NAME'], test_connection.settings_dict['TEST']['NAME']
+        self.test_db_name = names[0]
+        connections['default'] = connections.create_connection('default')
+
+        def restore():
+            connections['default'] = test_connection
+            test_connection.settings_dict['NAME'], test_connection.settings_dict['TEST']['NAME'] = names
+        self.addCleanup(restore)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def bench(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command(
+            'bench', '--vendors=1', '--products-per-vendor=3', '--customers=2', '--orders-per-customer=1',
+            '--requests=8', '--warmup=0', '--concurrency=1', '--mix=browse=1,detail=1',
+            f'--db-path={self.tmp.name}/bench.sqlite3', '--keepdb', *args, stdout=out, stderr=err,
+        )
+        return out.getvalue(), err.getvalue()
+
+    def test_report_and_regression_check(self):
+        report = json.loads(self.bench()[0])
+        self.assertEqual(set(report), {'commit', 'config', 'total', 'endpoints'})
+        self.assertEqual(set(report['endpoints']), {'browse', 'detail'})
+        self.assertEqual(report['total']['count'], 8)
+        self.assertEqual(report['total']['errors'], 0)
+        self.assertGreater(report['endpoints']['detail']['queries_per_request'], 0)
+
+        baseline = f'{self.tmp.name}/baseline.json'
+        with open(baseline, 'w') as fh:
+            json.dump(report, fh)
+        err = self.bench(f'--compare={baseline}')[1]
+        self.assertIn('detail', err)
+
+        # Query counts do not depend on timing, so halving them in the baseline is a sure regression
+        for row in [report['total'], *report['endpoints'].values()]:
+            row['queries_per_request'] /= 2
+        with open(baseline, 'w') as fh:
+            json.dump(report, fh)
+        with self.assertRaisesMessage(CommandError, 'detail queries_per_request'):
+            self.bench(f'--compare={baseline}', '--max-regression=50')
+        # The run hands the connection back pointing at the database it started on
+        self.assertEqual(connections['default'].settings_dict['NAME'], self.test_db_name)
+
+
+class SQLiteTuningTests(TestCase):
+    def test_connections_get_the_pragmas(self):
+        with connection.cursor() as cursor:
+            pragmas = {name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                       for name in ('synchronous', 'busy_timeout', 'cache_size')}
+        self.assertEqual(pragmas, {'synchronous': 1, 'busy_timeout': 20000, 'cache_size': -65536})
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+    def test_immediate_transactions_only_queue_writers(self):
+        # Reads stay out of transactions, so an open write blocks the next writer but not them
+        self.assertFalse(settings.DATABASES['default'].get('ATOMIC_REQUESTS'))
+        with tempfile.TemporaryDirectory() as tmp:
+            settings_dict = {
+                **connections['default'].settings_dict, 'NAME': f'{tmp}/wal.sqlite3',
+                'OPTIONS': {**connections['default'].settings_dict['OPTIONS'], 'timeout': 0},
+            }
+            writer, other = (type(connections['default'])(dict(settings_dict)) for _ in range(2))
+            try:
+                with writer.cursor() as cursor:
+                    cursor.execute('CREATE TABLE t (n integer)')
+                writer.set_autocommit(False)
+                with writer.cursor() as cursor:
+                    cursor.execute('INSERT INTO t VALUES (1)')
+                with other.cursor() as cursor:
+                    self.assertEqual(cursor.execute('SELECT count(*) FROM t').fetchone()[0], 0)
+                with self.assertRaisesMessage(OperationalError, 'database is locked'):
+                    other.set_autocommit(False)
+                    other.cursor().execute('INSERT INTO t VALUES (2)')
+            finally:
+                writer.rollback()
+                other.rollback()
+                writer.close()
+                other.close()
+
+
+@override_settings(DB_LOCK_RETRIES=2, DB_LOCK_RETRY_BASE=0)
+class RetryOnLockTests(SimpleTestCase):
+    def flaky(self, *errors):
+        calls = []
+
+        @retry_on_lock
+        def write():
+            calls.append(1)
+            if len(calls) <= len(errors):
+                raise errors[len(calls) - 1]
+            return 'done'
+        return write, calls
+
+    def test_retries_lock_errors(self):
+        write, calls = self.flaky(*[OperationalError('database is locked')] * 2)
+        self.assertEqual(write(), 'done')
+        self.assertEqual(len(calls), 3)
+
+    def test_gives_up_after_the_retries_and_on_other_errors(self):
+        write, calls = self.flaky(*[OperationalError('database is locked')] * 3)
+        with self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 3)
+        write, calls = self.flaky(OperationalError('no such table: nope'))
+        with self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 1)
+
+
+class OrderArchiveTests(APITestCase):
+    def setUp(self):
+        self.customer = make_user()
+        self.vendor = make_vendor()
+        self.variants = list(make_product(self.vendor, make_category(), variants=2).variants.all())
+        old = timezone.now() - timedelta(days=400)
+        self.archivable = make_order(self.customer, self.vendor, self.variants, status='delivered')
+        self.still_open = make_order(self.customer, self.vendor, self.variants[:1], status='shipped')
+        self.recent = make_order(self.customer, self.vendor, self.variants, status='delivered')
+        Order.objects.filter(pk__in=[self.archivable.pk, self.still_open.pk]).update(created_at=old)
+        Order.objects.filter(pk=self.archivable.pk).update(created_at=old - timedelta(days=1))
+        self.client.force_authenticate(self.customer)
+
+    def archive(self):
+        call_command('archive_orders', batch_size=1, stdout=StringIO())
+
+    def order_ids(self, **params):
+        response = self.client.get(reverse('customer-order-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return [row['order_id'] for row in response.data['results']]
+
+    def test_only_old_finished_orders_are_archived(self):
+        self.archive()
+        self.assertEqual(list(Order.objects.values_list('pk', flat=True).order_by('pk')),
+                         [self.still_open.pk, self.recent.pk])
+        archived = ArchivedOrder.objects.get()
+        self.assertEqual((archived.pk, archived.order_id), (self.archivable.pk, self.archivable.order_id))
+        self.assertEqual(archived.items_count, 2)
+        self.assertFalse(OrderItem.objects.filter(order_id=self.archivable.pk).exists())
+
+    def test_history_reads_the_archive_only_past_the_hot_window(self):
+        self.archive()
+        expected = [str(order.order_id) for order in (self.recent, self.still_open, self.archivable)]
+        self.assertEqual(self.order_ids(), expected)
+        self.assertEqual(self.order_ids(date_to=(timezone.now() - timedelta(days=300)).strftime('%Y-%m-%d')),
+                         expected[1:])
+        recent_only = {'date_from': timezone.localdate().strftime('%Y-%m-%d')}
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.order_ids(**recent_only), expected[:1])
+        self.assertFalse(any('orders_archivedorder' in query['sql'] for query in queries))
+        self.assertEqual(self.client.get(reverse('customer-order-list'), {'date_from': 'May 1'}).status_code, 400)
+
+    def test_history_pages_read_the_archive_only_once_they_run_past_the_window(self):
+        self.archive()
+        newer = make_order(self.customer, self.vendor, self.variants[:1], status='pending')
+        url = reverse('customer-order-list') + '?page_size=1'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual([row['order_id'] for row in response.data['results']], [str(newer.order_id)])
+        self.assertFalse(any('orders_archivedorder' in query['sql'] for query in queries))
+        seen, url = [], response.data['next']
+        while url:
+            response = self.client.get(url)
+            seen += [row['order_id'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, [str(order.order_id) for order in (self.recent, self.still_open, self.archivable)])
+
+    def test_vendor_order_management_includes_archived_orders(self):
+        self.archive()
+        self.client.force_authenticate(self.vendor.user)
+        expected = [str(order.order_id) for order in (self.recent, self.still_open, self.archivable)]
+        rows = self.client.get(reverse('vendor-orders-manage'), {'status': 'all'}).data['orders']
+        self.assertEqual([row['order_id'] for row in rows], expected)
+        self.assertEqual((rows[-1]['items_count'], rows[-1]['customer_email']), (2, self.customer.email))
+        response = self.client.get(reverse('vendor-orders-manage'), {'stream': 'ndjson', 'status': 'all'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['order_id'] for row in rows], expected)
+
+    def test_archived_order_detail_is_read_only(self):
+        self.archive()
+        response = self.client.get(reverse('customer-order-detail', args=[self.archivable.order_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['items']), 2)
+        self.assertEqual(response.data['items'][0]['product_title'], self.variants[0].product.title)
+
+        self.client.force_authenticate(self.vendor.user)
+        response = self.client.patch(reverse('vendor-order-detail', args=[self.archivable.order_id]),
+                                     {'status': 'refunded'}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+
+ROLLUP_FIELDS = ['vendor_id', 'day', 'orders', 'units', 'gross_revenue', *STATUS_FIELDS]
+PRODUCT_ROLLUP_FIELDS = ['vendor_id', 'product_id', 'day', 'orders', 'units', 'revenue']
+
+
+class VendorDailySalesTests(APITestCase):
+    def setUp(self):
+        self.customer = make_user()
+        category = make_category()
+        self.vendors = [make_vendor() for _ in range(2)]
+        self.variants = [make_product(vendor, category, variants=2).variants.first() for vendor in self.vendors]
+
+    def rollup(self):
+        return (sorted(VendorDailySales.objects.values_list(*ROLLUP_FIELDS)),
+                # Cancellations leave rows that net to zero; a rebuild just omits them
+                sorted(ProductDailySales.objects.exclude(orders=0).values_list(*PRODUCT_ROLLUP_FIELDS)))
+
+    def rebuilt(self):
+        rows, product_rows = daily_sales([vendor.pk for vendor in self.vendors])
+        return (sorted(tuple(getattr(row, field) for field in ROLLUP_FIELDS) for row in rows),
+                sorted(tuple(getattr(row, field) for field in PRODUCT_ROLLUP_FIELDS) for row in product_rows))
+
+    def test_checkout_and_status_changes_update_the_rollup(self):
+        fill_cart(self.customer, self.variants, quantity=2)
+        self.client.force_authenticate(self.customer)
+        response = self.client.post(reverse('checkout'), {
+            'shipping_address_id': make_address(self.customer).pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        first, second = (Order.objects.get(vendor=vendor) for vendor in self.vendors)
+        self.client.force_authenticate(self.vendors[0].user)
+        self.client.patch(reverse('vendor-orders-update-status'),
+                          {'order_ids': [first.pk], 'status': 'shipped'}, format='json')
+        self.client.force_authenticate(self.vendors[1].user)
+        self.client.patch(reverse('vendor-order-detail', args=[second.order_id]),
+                          {'status': 'cancelled'}, format='json')
+
+        self.assertEqual(self.rollup(), self.rebuilt())
+        row = VendorDailySales.objects.get(vendor=self.vendors[0])
+        self.assertEqual((row.orders, row.units, row.gross_revenue, row.processing, row.shipped),
+                         (1, 2, first.total_amount, 0, 1))
+        # Cancelling a paid order takes back its revenue and product sales
+        cancelled = VendorDailySales.objects.get(vendor=self.vendors[1])
+        self.assertEqual((cancelled.orders, cancelled.cancelled, cancelled.gross_revenue), (1, 1, 0))
+        self.assertFalse(ProductDailySales.objects.filter(vendor=self.vendors[1], orders__gt=0).exists())
+
+    def test_admin_status_change_is_recorded_like_the_api(self):
+        order = make_order(self.customer, self.vendors[0], [self.variants[0]], status='processing')
+        staff = make_user(is_staff=True, is_superuser=True)
+        request = RequestFactory().post('/')
+        request.user = staff
+        order.status = 'cancelled'
+        form = SimpleNamespace(changed_data=['status'], initial={'status': 'processing'})
+        admin.site._registry[Order].save_model(request, order, form, change=True)
+
+        self.assertEqual(list(order.status_events.values_list('from_status', 'to_status', 'actor')),
+                         [('processing', 'cancelled', staff.pk)])
+        self.assertTrue(OutboxEvent.objects.filter(topic='order.status_changed',
+                                                   aggregate_id=str(order.order_id)).exists())
+        self.assertEqual(self.rollup(), self.rebuilt())
+
+    def test_backfill_rebuilds_history_including_archived_orders(self):
+        vendor = self.vendors[0]
+        old = make_order(self.customer, vendor, [self.variants[0]], status='delivered', quantity=3)
+        make_order(self.customer, vendor, [self.variants[0]], status='pending')
+        Order.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=400))
+        call_command('archive_orders', stdout=StringIO())
+        VendorDailySales.objects.all().delete()
+
+        call_command('backfill_daily_sales', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.rollup(), self.rebuilt())
+        self.assertEqual(
+            list(VendorDailySales.objects.filter(vendor=vendor).values_list('day', 'units', 'delivered', 'pending')),
+            [((timezone.now() - timedelta(days=400)).date(), 3, 1, 0), (timezone.localdate(), 1, 0, 1)],
+        )
+
+
+class OrderFilterTests(APITestCase):
+    def setUp(self):
+        self.customer = make_user()
+        self.vendor = make_vendor()
+        variants = list(make_product(self.vendor, make_category(), variants=1).variants.all())
+        self.orders = [make_order(self.customer, self.vendor, variants) for _ in range(3)]
+        # Last instant of 1 March, first instant of 2 March, and 3 March
+        for order, created_at in zip(self.orders, ('2025-03-01T23:59:59Z', '2025-03-02T00:00:00Z', '2025-03-03T12:00:00Z')):
+            Order.objects.filter(pk=order.pk).update(created_at=created_at)
+
+    def filtered(self, **params):
+        return list(OrderFilterSet(params, queryset=Order.objects.order_by('created_at')).qs)
+
+    def test_days_are_half_open_ranges(self):
+        first, second, third = self.orders
+        self.assertEqual(self.filtered(date_to='2025-03-01'), [first])
+        self.assertEqual(self.filtered(date_from='2025-03-02'), [second, third])
+        self.assertEqual(self.filtered(date_from='2025-03-02', date_to='2025-03-02'), [second])
+        self.assertEqual(self.filtered(status='all', date_to='2025-03-02'), [first, second])
+
+    def test_vendor_date_ranges_use_the_composite_indexes(self):
+        range_filter = OrderFilterSet(
+            {'date_from': '2025-03-01', 'date_to': '2025-03-02'}, queryset=Order.objects.filter(vendor=self.vendor)
+        ).qs
+        self.assertIn('order_vendor_date_idx', range_filter.explain())
+        self.assertIn('order_vendor_status_date_idx', range_filter.filter(status='processing').explain())
+
+    def test_invalid_dates_are_rejected(self):
+        self.client.force_authenticate(self.vendor.user)
+        response = self.client.get(reverse('vendor-orders-manage'), {'date_from': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('date_from', response.data)
+
+
+class StockReservationTests(APITestCase):
+    def setUp(self):
+        self.customer = make_user()
+        self.variant = make_product(make_vendor(), make_category(), variants=1).variants.get()
+        ProductVariant.objects.filter(pk=self.variant.pk).update(stock=5)
+        self.client.force_authenticate(self.customer)
+
+    def add(self, quantity, user=None):
+        if user:
+            self.client.force_authenticate(user)
+        return self.client.post(reverse('cart-item-list'), {
+            'product_id': self.variant.product_id, 'variant_id': self.variant.pk, 'quantity': quantity,
+        }, format='json')
+
+    def reserved(self):
+        self.variant.refresh_from_db()
+        return self.variant.reserved
+
+    def test_cart_changes_move_the_hold(self):
+        item_id = self.add(3).data['id']
+        self.assertEqual(self.reserved(), 3)
+        self.client.patch(reverse('cart-item-detail', args=[item_id]), {'quantity': 1}, format='json')
+        self.assertEqual(self.reserved(), 1)
+        self.client.delete(reverse('cart-item-detail', args=[item_id]))
+        self.assertEqual(self.reserved(), 0)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_held_stock_is_not_available_to_other_carts(self):
+        self.add(4)
+        response = self.add(2, user=make_user())
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.reserved(), 4)
+        self.assertEqual(CartItem.objects.count(), 1)
+
+    def test_checkout_converts_the_hold(self):
+        self.add(4)
+        response = self.client.post(reverse('checkout'), {
+            'shipping_address_id': make_address(self.customer).pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.variant.refresh_from_db()
+        self.assertEqual((self.variant.stock, self.variant.reserved), (1, 0))
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_sweeper_releases_expired_holds(self):
+        self.add(4)
+        other = make_user()
+        self.add(1, user=other)
+        StockReservation.objects.filter(cart_item__cart__user=self.customer).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        call_command('release_expired_holds', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.reserved(), 1)
+        self.assertEqual(StockReservation.objects.count(), 1)
+
+    def test_deleting_the_cart_item_returns_its_hold(self):
+        self.add(3)
+        other = make_user()
+        self.add(2, user=other)
+        CartItem.objects.filter(cart__user=self.customer).delete()
+        self.assertEqual(self.reserved(), 2)
+        other.delete()  # Cart and cart items go with the customer
+        self.assertEqual(self.reserved(), 0)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_checkout_after_the_counter_drifted_below_the_hold(self):
+        self.add(4)
+        ProductVariant.objects.filter(pk=self.variant.pk).update(reserved=1)  # Lowered underneath the hold
+        response = self.client.post(reverse('checkout'), {
+            'shipping_address_id': make_address(self.customer).pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.variant.refresh_from_db()
+        self.assertEqual((self.variant.stock, self.variant.reserved), (1, 0))
+
+    def test_release_never_drives_the_counter_negative(self):
+        self.add(2)
+        ProductVariant.objects.filter(pk=self.variant.pk).update(reserved=1)  # Drifted below its holds
+        release({self.variant.pk: 2})
+        self.assertEqual(self.reserved(), 0)
+
+
+class IdempotencyKeyTests(APITestCase):
+    def setUp(self):
+        self.customer = make_user()
+        self.address = make_address(self.customer)
+        self.variants = list(make_product(make_vendor(), make_category(), variants=2).variants.all())
+        fill_cart(self.customer, self.variants)
+        self.client.force_authenticate(self.customer)
+
+    def checkout(self, key, **data):
+        data.setdefault('shipping_address_id', self.address.pk)
+        return self.client.post(reverse('checkout'), data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retried_checkout_replays_the_first_response(self):
+        first = self.checkout('retry-1')
+        self.assertEqual(first.status_code, 201)
+        fill_cart(self.customer, self.variants)  # A replay must not check this cart out
+
+        retry = self.checkout('retry-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Order.objects.filter(customer=self.customer).count(), 1)
+        self.assertEqual(CartItem.objects.filter(cart__user=self.customer).count(), 2)
+
+    def test_key_reused_with_another_payload_is_rejected(self):
+        self.checkout('reuse-1')
+        response = self.checkout('reuse-1', payment_method='Card')
+        self.assertEqual(response.status_code, 422)
+
+    @override_settings(IDEMPOTENCY_WAIT_SECONDS=0)
+    def test_duplicate_of_a_running_request_conflicts(self):
+        response = self.checkout('running-1')
+        IdempotencyKey.objects.filter(key='running-1').update(
+            status_code=None, response_body=None, locked_until=timezone.now() + timedelta(minutes=1),
+        )
+        response = self.checkout('running-1')
+        self.assertEqual(response.status_code, 409)
+
+    @override_settings(IDEMPOTENCY_WAIT_SECONDS=0)
+    def test_retry_takes_over_a_key_whose_request_died(self):
+        # The request claimed the key, then its worker died before the view ran
+        request = SimpleNamespace(method='POST', path=reverse('checkout'), data={'shipping_address_id': self.address.pk})
+        record, lease = _claim(self.customer, 'checkout', 'crash-1', request_fingerprint(request))
+        self.assertIsNone(record)
+        self.assertEqual(self.checkout('crash-1').status_code, 409)
+
+        IdempotencyKey.objects.filter(key='crash-1').update(locked_until=timezone.now() - timedelta(seconds=1))
+        response = self.checkout('crash-1')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.filter(customer=self.customer).count(), 1)
+        self.assertEqual(self.checkout('crash-1').json(), response.json())
+
+    def test_cart_item_create_is_idempotent(self):
+        variant = self.variants[0]
+        data = {'product_id': variant.product_id, 'variant_id': variant.pk, 'quantity': 1}
+        for _ in range(2):
+            response = self.client.post(reverse('cart-item-list'), data, format='json',
+                                        HTTP_IDEMPOTENCY_KEY='add-1')
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(CartItem.objects.get(variant=variant).quantity, 2)  # fill_cart's 1 + one add
+
+
+class CartSummaryTests(APITestCase):
+    def setUp(self):
+        self.customer = make_user()
+        product = make_product(make_vendor(), make_category(), variants=2, base_price=Decimal('10.00'))
+        self.variants = list(product.variants.order_by('pk'))  # price modifiers 0 and 5
+        self.cart = fill_cart(self.customer, self.variants, quantity=2)
+
+    def test_summary_is_a_single_aggregate(self):
+        with self.assertNumQueries(1):
+            summary = CartItem.objects.filter(cart=self.cart).summary()
+        self.assertEqual(summary, {'items': 2, 'quantity': 4, 'total': Decimal('50.00')})
+
+    def test_cached_summary_is_invalidated_by_item_changes(self):
+        self.assertEqual(self.cart.get_total_price, Decimal('50.00'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cart.get_total_items, 4)
+
+        item = CartItem.objects.get(variant=self.variants[1])
+        item.quantity = 1
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+        self.assertEqual(self.cart.get_total_price, Decimal('35.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        self.assertEqual(self.cart.get_summary(), {'items': 1, 'quantity': 2, 'total': Decimal('20.00')})
+
+    def test_summary_endpoint_follows_cart_changes(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.get(reverse('cart-summary'))
+        self.assertEqual(response.json(), {'items': 2, 'quantity': 4, 'total': '50.00'})
+
+        item = CartItem.objects.get(variant=self.variants[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('cart-item-detail', args=[item.pk]), {'quantity': 3}, format='json')
+        self.assertEqual(self.client.get(reverse('cart-summary')).json()['total'], '60.00')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('checkout'), {
+                'shipping_address_id': make_address(self.customer).pk,
+            }, format='json')
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('cart-summary'))
+        self.assertEqual(response.json(), {'items': 0, 'quantity': 0, 'total': '0.00'})
+
+
+class CartBatchTests(APITestCase):
+    def setUp(self):
+        self.customer = make_user()
+        product = make_product(make_vendor(), make_category(), variants=2, base_price=Decimal('10.00'))
+        self.variants = list(product.variants.order_by('pk'))  # price modifiers 0 and 5
+        ProductVariant.objects.filter(pk__in=[v.pk for v in self.variants]).update(stock=5)
+        self.client.force_authenticate(self.customer)
+
+    def op(self, op, variant, quantity=None):
+        data = {'op': op, 'product_id': variant.product_id, 'variant_id': variant.pk}
+        if quantity is not None:
+            data['quantity'] = quantity
+        return data
+
+    def batch(self, *operations):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('cart-item-batch'), {'operations': list(operations)}, format='json')
+
+    def reserved(self):
+        return list(ProductVariant.objects.order_by('pk').values_list('reserved', flat=True))
+
+    def test_operations_apply_in_order_and_return_the_summary(self):
+        first, second = self.variants
+        response = self.batch(self.op('add', first, 2), self.op('add', first, 1), self.op('add', second, 1))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'items': 2, 'quantity': 4, 'total': '45.00'})
+        self.assertEqual(self.reserved(), [3, 1])
+
+        response = self.batch(self.op('set', first, 1), self.op('remove', second))
+        self.assertEqual(response.json(), {'items': 1, 'quantity': 1, 'total': '10.00'})
+        self.assertEqual(self.reserved(), [1, 0])
+        self.assertEqual(StockReservation.objects.get().quantity, 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('cart-summary')).json()['items'], 1)
+
+    def test_batch_is_all_or_nothing(self):
+        first, second = self.variants
+        response = self.batch(self.op('add', first, 2), self.op('add', second, 6))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Available: 5', response.json()['quantity'][0])
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(self.reserved(), [0, 0])
+
+    def test_invalid_operations_are_reported_by_position(self):
+        other = make_product(make_vendor(), make_category(), variants=1).variants.get()
+        response = self.batch(self.op('add', self.variants[0], 1), self.op('set', self.variants[1]))
+        self.assertEqual(response.json()['operations'], [{}, {'quantity': ['This field is required.']}])
+
+        response = self.batch(
+            self.op('add', self.variants[0], 1),
+            {'op': 'add', 'product_id': self.variants[0].product_id, 'variant_id': other.pk, 'quantity': 1},
+        )
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['operations']
+        self.assertEqual(errors[0], {})
+        self.assertIn('variant_id', errors[1])
+        self.assertFalse(CartItem.objects.exists())
+
+
+class GuestCartTests(APITestCase):
+    def setUp(self):
+        product = make_product(make_vendor(), make_category(), variants=2)
+        self.variants = list(product.variants.order_by('pk'))
+        self.customer = make_user(password='secret-pass')
+
+    def add(self, variant, quantity=1):
+        return self.client.post(reverse('guest-cart-item-list'), {
+            'product_id': variant.product_id, 'variant_id': variant.pk, 'quantity': quantity,
+        }, format='json')
+
+    def test_guest_cart_lives_in_its_own_signed_cookie(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.add(self.variants[0], 2)
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse([q for q in ctx.captured_queries if not q['sql'].startswith('SELECT')])
+        self.assertIn(settings.GUEST_CART_COOKIE, response.cookies)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        key = response.data['id']
+
+        self.add(self.variants[0], 1)
+        cart = self.client.get(reverse('guest-cart')).data
+        self.assertEqual([(item['id'], item['quantity']) for item in cart['items']], [(key, 3)])
+
+        self.client.patch(reverse('guest-cart-item-detail', args=[key]), {'quantity': 1}, format='json')
+        self.assertEqual(self.client.get(reverse('guest-cart')).data['total_items'], 1)
+        self.assertEqual(self.client.delete(reverse('guest-cart-item-detail', args=[key])).status_code, 204)
+        self.assertEqual(self.client.get(reverse('guest-cart')).data['items'], [])
+        self.assertFalse(CartItem.objects.exists())
+
+        self.client.cookies[settings.GUEST_CART_COOKIE] = '{"%s": 5}' % key  # Unsigned: ignored
+        self.assertEqual(self.client.get(reverse('guest-cart')).data['items'], [])
+
+    def test_guest_line_is_capped_like_a_cart_item(self):
+        ProductVariant.objects.filter(pk=self.variants[0].pk).update(stock=500)
+        self.assertEqual(self.add(self.variants[0], 60).status_code, 201)
+        response = self.add(self.variants[0], 40)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cannot exceed 99', str(response.data['quantity']))
+        self.assertEqual(self.client.get(reverse('guest-cart')).data['total_items'], 60)
+
+    def test_login_merges_guest_lines_into_the_user_cart(self):
+        fill_cart(self.customer, self.variants[:1], quantity=2)
+        self.add(self.variants[0], 3)
+        self.add(self.variants[1], 1)
+
+        response = self.client.post(reverse('token_obtain_pair'), {
+            'email': self.customer.email, 'password': 'secret-pass',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        quantities = dict(
+            CartItem.objects.filter(cart__user=self.customer).values_list('variant_id', 'quantity')
+        )
+        self.assertEqual(quantities, {self.variants[0].pk: 5, self.variants[1].pk: 1})
+        self.assertEqual(self.client.get(reverse('guest-cart')).data['items'], [])
@@ -0,0 +1,86 @@
+# apps/orders/transitions.py
+"""
+Set-based order status transitions.
+
+Moving any number of orders to a status is one conditional UPDATE whose WHERE
+clause only matches the vendor's orders currently in an allowed predecessor
+status, plus one bulk insert into OrderStatusEvent, one into the outbox and
+the daily sales rollup updates (apps/orders/sales.py). Nothing is loaded or
+saved per order.
+"""
+from django.db import transaction
+from django.db.models.functions import Now
+
+from apps.outbox.events import event, publish
+from apps.vendors.analytics import invalidate_analytics
+from .models import Order, OrderStatusEvent
+from .sales import OrderChange, record_transitions
+
+UPDATED = 'updated'
+NOT_FOUND = 'not_found'
+INVALID_TRANSITION = 'invalid_transition'
+
+
+def predecessors(status):
+    """Statuses an order may move to ``status`` from."""
+    return [current for current, allowed in Order.STATUS_TRANSITIONS.items() if status in allowed]
+
+
+def status_changed_event(pk, order_id, vendor_id, from_status, to_status):
+    return event('order.status_changed', order_id, id=pk, vendor_id=vendor_id,
+                 from_status=from_status, to_status=to_status)
+
+
+def record_status_change(order, from_status, actor=None):
+    """
+    The status history row, outbox event and rollup update for one order
+    already saved with a new status, as transition_orders writes them for
+    the orders it moves. For single-order edits (vendor order form, admin).
+    """
+    OrderStatusEvent.objects.create(order=order, from_status=from_status, to_status=order.status, actor=actor)
+    publish(status_changed_event(order.pk, order.order_id, order.vendor_id, from_status, order.status))
+    record_transitions(order.vendor_id, [OrderChange(
+        order.pk, order.created_at, order.total_amount,
+        from_status, order.status, order.payment_status, order.payment_status,
+    )])
+
+
+def transition_orders(vendor, order_ids, status, actor=None, **fields):
+    """
+    Move the vendor's orders in ``order_ids`` to ``status``, also setting
+    ``fields`` (e.g. tracking_number) on the orders that move. Returns
+    {order id: UPDATED | NOT_FOUND | INVALID_TRANSITION}.
+    """
+    order_ids = set(order_ids)
+    allowed = predecessors(status)
+    with transaction.atomic():
+        # Row locks (where the backend has them) keep the recorded from_status exact;
+        # the conditional UPDATE below is what guarantees only legal moves happen
+        current = {
+            row[0]: row
+            for row in Order.objects.select_for_update()
+            .filter(vendor=vendor, pk__in=order_ids)
+            .values_list('pk', 'status', 'order_id', 'created_at', 'total_amount', 'payment_status')
+        }
+        moving = {pk: row for pk, row in current.items() if row[1] in allowed}
+        if moving:
+            Order.objects.filter(vendor=vendor, pk__in=list(moving), status__in=allowed).update(
+                status=status, updated_at=Now(), **fields
+            )
+            OrderStatusEvent.objects.bulk_create([
+                OrderStatusEvent(order_id=pk, from_status=from_status, to_status=status, actor=actor)
+                for pk, from_status, *rest in moving.values()
+            ])
+            publish(*[
+                status_changed_event(pk, order_id, vendor.pk, from_status, status)
+                for pk, from_status, order_id, *rest in moving.values()
+            ])
+            record_transitions(vendor.pk, [
+                OrderChange(pk, created_at, total_amount, from_status, status, payment_status, payment_status)
+                for pk, from_status, order_id, created_at, total_amount, payment_status in moving.values()
+            ])
+            invalidate_analytics(vendor.pk)
+    return {
+        pk: UPDATED if pk in moving else INVALID_TRANSITION if pk in current else NOT_FOUND
+        for pk in order_ids
+    }
@@ -3,7 +3,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    UserCartView, CartItemViewSet, CheckoutView,
+    UserCartView, CartSummaryView, CartItemViewSet, CheckoutView, CheckoutJobView,
+    GuestCartView, GuestCartItemListView, GuestCartItemDetailView, GuestCartMergeView,
     CustomerOrderListView, CustomerOrderDetailView,
     VendorOrderListView, VendorOrderDetailView
 )
@@ -15,10 +16,18 @@ cart_router.register(r'items', CartItemViewSet, basename='cart-item')
 urlpatterns = [
     # Cart management for customers
     path('cart/', UserCartView.as_view(), name='user-cart'),
+    path('cart/summary/', CartSummaryView.as_view(), name='cart-summary'),
     path('cart/', include(cart_router.urls)), # /api/orders/cart/items/
 
+    # Guest carts, kept in a signed cookie until login
+    path('guest-cart/', GuestCartView.as_view(), name='guest-cart'),
+    path('guest-cart/items/', GuestCartItemListView.as_view(), name='guest-cart-item-list'),
+    path('guest-cart/items/<str:key>/', GuestCartItemDetailView.as_view(), name='guest-cart-item-detail'),
+    path('guest-cart/merge/', GuestCartMergeView.as_view(), name='guest-cart-merge'),
+
     # Checkout process
     path('checkout/', CheckoutView.as_view(), name='checkout'),
+    path('checkout/jobs/<uuid:pk>/', CheckoutJobView.as_view(), name='checkout-job'),
 
     # Customer order history
     path('customer-orders/', CustomerOrderListView.as_view(), name='customer-order-list'),
@@ -1,14 +1,39 @@
-from rest_framework import generics, status, viewsets
+from rest_framework import generics, serializers, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.db.models.functions import Coalesce
+from django.http import Http404
+from django_filters.utils import translate_validation
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _  # [UPDATED] Added translation
-import uuid  # [UPDATED] Added uuid import
-from .models import Cart, CartItem, Order, OrderItem
-from .serializers import CartSerializer, CartItemSerializer, OrderSerializer
+import time
+from decimal import Decimal
+from .models import (
+    ArchivedOrder, Cart, CartItem, CheckoutJob, Order, OrderItem,
+)
+from .archive import OrderHistory, reaches_archive
+from .checkout import OutOfStock, dump_cart_lines, find_shortage, format_address, place_orders, snapshot_cart
+from .filters import OrderFilterSet
+from .pagination import OrderHistoryCursorPagination
+from .transitions import record_status_change
+from .reservations import set_hold, set_holds
+from .idempotency import idempotent
+from .guest_cart import MAX_QUANTITY, GuestCart, line_key, merge_guest_cart, parse_line_key
+from .serializers import (
+    CartBatchSerializer, CartSerializer, CartItemSerializer, CartSummarySerializer, CheckoutJobSerializer,
+    GuestCartItemSerializer, OrderListSerializer, OrderSerializer,
+)
 from apps.accounts.models import Address
-from apps.vendors.models import VendorProfile
+from apps.products.inventory import exact_available
+from apps.products.models import ProductVariant
 from apps.vendors.permissions import IsApprovedVendor
+from buyhive_backend.db import retry_on_lock
 
 # --- Cart Views ---
 class UserCartView(generics.RetrieveAPIView):
@@ -20,6 +45,8 @@ class UserCartView(generics.RetrieveAPIView):
     
     def get_object(self):
         cart, created = Cart.objects.get_or_create(user=self.request.user)
+        # [UPDATED] Items, their products and variants in a fixed number of queries
+        prefetch_related_objects([cart], Prefetch('items', queryset=CartItem.objects.for_display()))
         return cart
 
 class CartItemViewSet(viewsets.ModelViewSet):
@@ -32,7 +59,13 @@ class CartItemViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         # Ensure the user only sees/modifies items in their own cart
         user_cart, created = Cart.objects.get_or_create(user=self.request.user)  # [UPDATED] Create cart if not exists
-        return user_cart.items.all()
+        items = user_cart.items.all()
+        return items if self.action == 'destroy' else items.for_display()
+    
+    @retry_on_lock  # [UPDATED] Outermost, so a retry also re-claims the idempotency key
+    @idempotent('cart-item')
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
     
     def perform_create(self, serializer):
         user_cart, created = Cart.objects.get_or_create(user=self.request.user)
@@ -40,50 +73,249 @@ class CartItemViewSet(viewsets.ModelViewSet):
         variant = serializer.validated_data.get('variant')
         quantity = serializer.validated_data['quantity']
         
-        # Check if item already exists in cart, then update quantity
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=user_cart,
-            product=product,
-            variant=variant,
-            defaults={'quantity': quantity}
-        )
-        if not created:
-            cart_item.quantity += quantity
-            cart_item.save()
-        serializer.instance = cart_item
+        with transaction.atomic():
+            # Check if item already exists in cart, then update quantity
+            cart_item, created = CartItem.objects.get_or_create(
+                cart=user_cart,
+                product=product,
+                variant=variant,
+                defaults={'quantity': quantity}
+            )
+            if not created:
+                cart_item.quantity += quantity
+                cart_item.save()
+            # [UPDATED] Hold the stock while it sits in the cart
+            if not set_hold(cart_item, cart_item.quantity):
+                raise self.not_enough_stock(variant)
+        serializer.instance = CartItem.objects.for_display().get(pk=cart_item.pk)
     
+    @retry_on_lock
     def perform_update(self, serializer):
-        # Ensure quantity does not exceed stock
-        instance = self.get_object()
-        item_to_check_stock = instance.variant if instance.variant else instance.product
+        instance = serializer.instance
         new_quantity = serializer.validated_data.get('quantity', instance.quantity)
         
-        # [UPDATED] Better stock checking
-        if hasattr(item_to_check_stock, 'stock') and new_quantity > item_to_check_stock.stock:
-            # Return error response properly
+        # [UPDATED] Grow or shrink the stock hold along with the quantity
+        with transaction.atomic():
+            if not set_hold(instance, new_quantity):
+                raise self.not_enough_stock(instance.variant)
+            serializer.save()
+    
+    @retry_on_lock
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            set_hold(instance, 0)
+            instance.delete()
+    
+    @action(detail=False, methods=['post'], url_path='batch', serializer_class=CartBatchSerializer)
+    @retry_on_lock
+    @idempotent('cart-batch')
+    def batch(self, request, *args, **kwargs):
+        """
+        Apply a list of add/set/remove operations in one transaction and return
+        the new cart summary. The cart's lines are read in one query and
+        written back with one bulk_create, one bulk_update and one delete,
+        with their stock holds adjusted in bulk alongside.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        variants = serializer.validated_data['variants']
+        
+        with transaction.atomic():
+            cart, created = Cart.objects.get_or_create(user=request.user)
+            existing = {
+                (item.product_id, item.variant_id): item
+                for item in cart.items.annotate(held=Coalesce('reservation__quantity', 0))
+            }
+            wanted = {line: item.quantity for line, item in existing.items()}
+            for op in serializer.validated_data['operations']:
+                line = (op['product_id'], op['variant_id'])
+                if op['op'] == 'add':
+                    wanted[line] = wanted.get(line, 0) + op['quantity']
+                elif op['op'] == 'set':
+                    wanted[line] = op['quantity']
+                else:
+                    wanted[line] = 0
+            
+            # Quick check so the client learns every shortage at once; set_holds is authoritative
+            errors = []
+            needed = {}
+            for (product_id, variant_id), quantity in wanted.items():
+                if quantity > MAX_QUANTITY:
+                    errors.append(_("Quantity cannot exceed 99."))
+                if variant_id and quantity:
+                    item = existing.get((product_id, variant_id))
+                    needed[variant_id] = needed.get(variant_id, 0) + quantity - (item.held if item else 0)
+            for variant_id, quantity in needed.items():
+                variant = variants.get(variant_id)
+                if variant and quantity > variant.available:
+                    errors.append(_("Not enough stock for {name}. Available: {available}").format(
+                        name=variant.name, available=variant.available
+                    ))
+            if errors:
+                raise serializers.ValidationError({'quantity': errors})
+            
+            now = timezone.now()
+            created_items, changed, removed = [], [], []
+            for line, quantity in wanted.items():
+                item = existing.get(line)
+                if item is None:
+                    if quantity:
+                        created_items.append(CartItem(cart=cart, product_id=line[0], variant_id=line[1], quantity=quantity))
+                elif not quantity:
+                    removed.append(item)
+                elif quantity != item.quantity:
+                    item.quantity, item.updated_at = quantity, now
+                    changed.append(item)
+            CartItem.objects.bulk_create(created_items)
+            CartItem.objects.bulk_update(changed, ['quantity', 'updated_at'])
+            holds = {item: item.quantity for item in created_items + changed}
+            holds.update((item, 0) for item in removed)
+            if not set_holds(holds):
+                raise serializers.ValidationError({
+                    'quantity': [_("Not enough stock for one or more items; please review your cart.")]
+                })
+            if removed:
+                CartItem.objects.filter(pk__in=[item.pk for item in removed]).delete()
+            
+            summary = CartItem.objects.filter(cart=cart).summary()
+            # Bulk writes send no signals; cache the new summary once committed
+            summary_key = Cart.summary_cache_key(request.user.pk)
+            transaction.on_commit(lambda: cache.set(summary_key, summary, settings.CART_SUMMARY_TTL))
+        return Response(CartSummarySerializer(summary).data)
+    
+    def not_enough_stock(self, variant):
+        variant.refresh_from_db(fields=['stock', 'reserved', 'shard_count'])
+        return serializers.ValidationError({
+            'quantity': _("Not enough stock. Available: {available}").format(
+                available=exact_available([variant])[variant.pk]
+            )
+        })
+
+class CartSummaryView(generics.GenericAPIView):
+    """
+    Item count, unit count and total of the current user's cart, for the header
+    badge. Served from cache; a miss costs one aggregate query.
+    """
+    serializer_class = CartSummarySerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(Cart.summary_for_user(request.user.pk))
+        return Response(serializer.data)
+
+# --- Guest Cart Views ---
+class GuestCartView(generics.GenericAPIView):
+    """
+    The cart of a visitor who is not logged in, kept in a signed cookie.
+    Same shape as the user cart; item ids are "<product id>-<variant id>" keys.
+    """
+    serializer_class = GuestCartItemSerializer
+    permission_classes = [AllowAny]
+    
+    def get(self, request, *args, **kwargs):
+        items = GuestCart(request).build_items()
+        return Response({
+            'items': self.get_serializer(items, many=True).data,
+            'total_price': str(sum((item.get_total for item in items), Decimal('0.00'))),
+            'total_items': sum(item.quantity for item in items),
+        })
+
+class GuestCartItemListView(generics.GenericAPIView):
+    """Add a product (and variant) to the guest cart."""
+    serializer_class = GuestCartItemSerializer
+    permission_classes = [AllowAny]
+    
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        product = serializer.validated_data['product']
+        variant = serializer.validated_data.get('variant')
+        
+        guest_cart = GuestCart(request)
+        key = line_key(product.pk, variant.pk if variant else None)
+        quantity = guest_cart.quantity(key) + serializer.validated_data['quantity']
+        if quantity > MAX_QUANTITY:
+            raise serializers.ValidationError({'quantity': _("Quantity cannot exceed 99.")})
+        if variant and quantity > variant.available:
             raise serializers.ValidationError({
-                'quantity': f"Not enough stock. Available: {item_to_check_stock.stock}"
+                'quantity': _("Not enough stock. Available: {available}").format(available=variant.available)
             })
-        serializer.save()
+        guest_cart.set(key, quantity)
+        item = CartItem(product=product, variant=variant, quantity=guest_cart.quantity(key))
+        return guest_cart.save(Response(self.get_serializer(item).data, status=status.HTTP_201_CREATED))
+
+class GuestCartItemDetailView(generics.GenericAPIView):
+    """Change the quantity of, or remove, one guest cart line."""
+    serializer_class = GuestCartItemSerializer
+    permission_classes = [AllowAny]
+    
+    def get_line(self, guest_cart, key):
+        if key not in guest_cart:
+            raise NotFound(_('This item is not in your cart.'))
+        product_id, variant_id = parse_line_key(key)
+        return ProductVariant.objects.with_shard_totals().filter(pk=variant_id).first() if variant_id else None
+    
+    def patch(self, request, key, *args, **kwargs):
+        guest_cart = GuestCart(request)
+        variant = self.get_line(guest_cart, key)
+        serializer = self.get_serializer(data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        quantity = serializer.validated_data.get('quantity', guest_cart.quantity(key))
+        if variant and quantity > variant.available:
+            raise serializers.ValidationError({
+                'quantity': _("Not enough stock. Available: {available}").format(available=variant.available)
+            })
+        guest_cart.set(key, quantity)
+        return guest_cart.save(Response({'id': key, 'quantity': quantity}))
+    
+    def delete(self, request, key, *args, **kwargs):
+        guest_cart = GuestCart(request)
+        self.get_line(guest_cart, key)
+        guest_cart.set(key, 0)
+        return guest_cart.save(Response(status=status.HTTP_204_NO_CONTENT))
+
+class GuestCartMergeView(generics.GenericAPIView):
+    """
+    Move the guest cart cookie into the logged-in user's cart. Logging in
+    through /api/token/ does this automatically.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, *args, **kwargs):
+        guest_cart = GuestCart(request)
+        merged = merge_guest_cart(guest_cart, request.user)
+        return guest_cart.save(Response({
+            'merged': merged, **CartSummarySerializer(Cart.summary_for_user(request.user.pk)).data
+        }))
 
 # --- Order Views ---
 class CheckoutView(generics.CreateAPIView):
     """
     Handles the checkout process. Splits the user's cart into multiple orders
-    (one per vendor) and processes payment.
+    (one per vendor) and processes payment. Send an Idempotency-Key header to
+    make retries safe.
+    
+    With a ``Prefer: respond-async`` header, or with CHECKOUT_ASYNC on, the
+    cart, its stock and the address are only checked and a checkout job is
+    queued with the cart lines: the response is a 202 with the job, and
+    CheckoutJobView reports the outcome. While a job is open, the same
+    request gets that job back and a different one gets a 409.
     """
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
     
+    def wants_async(self, request):
+        prefer = request.META.get('HTTP_PREFER', '')
+        return settings.CHECKOUT_ASYNC or 'respond-async' in [token.strip() for token in prefer.split(',')]
+    
+    @retry_on_lock
+    @idempotent('checkout')
     def create(self, request, *args, **kwargs):
         user = request.user
         
-        # [UPDATED] Better cart retrieval
-        try:
-            user_cart = user.cart
-            if not user_cart.items.exists():
-                return Response({'detail': _('Your cart is empty.')}, status=status.HTTP_400_BAD_REQUEST)
-        except Cart.DoesNotExist:
+        # [UPDATED] Every later step works from this one-query snapshot of the cart
+        cart_lines, vendors = snapshot_cart(user)
+        if not cart_lines:
             return Response({'detail': _('Your cart is empty.')}, status=status.HTTP_400_BAD_REQUEST)
         
         # Get shipping address from request
@@ -93,105 +325,136 @@ class CheckoutView(generics.CreateAPIView):
         
         try:
             shipping_address = Address.objects.get(id=shipping_address_id, user=user)
-        except Address.DoesNotExist:
+        except (Address.DoesNotExist, ValueError):
             return Response({
                 'detail': _('Shipping address not found or does not belong to you.')
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # [UPDATED] Better address formatting
-        shipping_address_text = (
-            f"{shipping_address.street_address}"
-            + (f", {shipping_address.apartment_address}" if shipping_address.apartment_address else "")
-            + f", {shipping_address.city}, {shipping_address.state}, {shipping_address.zip_code}, {shipping_address.country}"
-        )
-        
-        # [UPDATED] Added stock validation before processing
-        for item in user_cart.items.all():
-            stock_item = item.variant if item.variant else item.product
-            if hasattr(stock_item, 'stock') and item.quantity > stock_item.stock:
-                return Response({
-                    'detail': f"Not enough stock for {item.product.title}. Available: {stock_item.stock}"
-                }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Mock payment processing
-        payment_successful = True
-        transaction_id = "mock_txn_" + str(uuid.uuid4())
+        shipping_address_text = format_address(shipping_address)
         payment_method = request.data.get('payment_method', 'Mock Payment Gateway')
         
-        if not payment_successful:
-            return Response({'detail': _('Payment failed. Please try again.')}, status=status.HTTP_400_BAD_REQUEST)
-        
-        created_orders = []
-        
-        # Group cart items by vendor
-        vendor_cart_items = {}
-        for item in user_cart.items.all():
-            vendor_id = item.product.vendor.id
-            if vendor_id not in vendor_cart_items:
-                vendor_cart_items[vendor_id] = []
-            vendor_cart_items[vendor_id].append(item)
+        if self.wants_async(request):
+            return self.enqueue(user, cart_lines, shipping_address_text, payment_method)
         
-        with transaction.atomic():
-            for vendor_id, items in vendor_cart_items.items():
-                vendor_profile = VendorProfile.objects.get(id=vendor_id)
-                
-                # Calculate total for this vendor's portion of the order
-                vendor_order_total = sum(item.get_total for item in items)
-                
-                # Create the Order
-                order = Order.objects.create(
-                    customer=user,
-                    vendor=vendor_profile,
-                    total_amount=vendor_order_total,
-                    status='processing',
-                    payment_method=payment_method,
-                    payment_status='completed',
-                    transaction_id=transaction_id,
-                    shipping_address_text=shipping_address_text
-                )
-                
-                # Create OrderItems and decrease stock
-                for cart_item in items:
-                    price_at_purchase = cart_item.product.base_price + (
-                        cart_item.variant.price_modifier if cart_item.variant else 0
-                    )
-                    OrderItem.objects.create(
-                        order=order,
-                        product=cart_item.product,
-                        variant=cart_item.variant,
-                        quantity=cart_item.quantity,
-                        price_at_purchase=price_at_purchase
-                    )
-                    
-                    # Decrease stock
-                    item_to_update_stock = cart_item.variant if cart_item.variant else cart_item.product
-                    if hasattr(item_to_update_stock, 'stock'):  # [UPDATED] Added safety check
-                        item_to_update_stock.stock -= cart_item.quantity
-                        item_to_update_stock.save(update_fields=['stock'])
-                
-                created_orders.append(order)
-            
-            # Clear the user's cart after successful order creation
-            user_cart.items.all().delete()
+        try:
+            created_orders = place_orders(user, cart_lines, vendors, shipping_address_text, payment_method)
+        except OutOfStock as exc:
+            return Response({'detail': exc.message}, status=status.HTTP_400_BAD_REQUEST)
         
         # Serialize the created orders and return them
+        prefetch_related_objects(
+            created_orders, Prefetch('items', queryset=OrderItem.objects.select_related('product', 'variant'))
+        )
         serializer = self.get_serializer(created_orders, many=True)
         return Response({
             'message': _('Orders created successfully'),
             'orders': serializer.data
         }, status=status.HTTP_201_CREATED)
+    
+    def enqueue(self, user, cart_lines, shipping_address_text, payment_method):
+        # Refuse a cart that cannot be placed now rather than accept it and fail later
+        shortage = find_shortage(cart_lines)
+        if shortage:
+            return Response({'detail': shortage}, status=status.HTTP_400_BAD_REQUEST)
+        accepted = {
+            'cart_lines': dump_cart_lines(cart_lines),
+            'shipping_address_text': shipping_address_text,
+            'payment_method': payment_method,
+        }
+        # A cart is checked out by one job at a time. Asking again with the same
+        # cart and details returns the open job; anything else conflicts with it.
+        job = CheckoutJob.objects.filter(user=user, status__in=['queued', 'running']).first()
+        if job is None:
+            job = CheckoutJob.objects.create(user=user, **accepted)
+        elif any(getattr(job, field) != value for field, value in accepted.items()):
+            return Response({
+                'detail': _('Another checkout of your cart is already in progress.')
+            }, status=status.HTTP_409_CONFLICT)
+        data = CheckoutJobSerializer(job, context=self.get_serializer_context()).data
+        return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': data['status_url']})
+
 
-class CustomerOrderListView(generics.ListAPIView):
+class CheckoutJobView(generics.RetrieveAPIView):
     """
-    List all orders for the authenticated customer.
+    Status of a queued checkout. ``?wait=<seconds>`` (at most
+    CHECKOUT_JOB_MAX_WAIT) holds the request open until the job finishes,
+    so clients can long-poll instead of polling in a tight loop.
     """
-    serializer_class = OrderSerializer
+    serializer_class = CheckoutJobSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Order.objects.filter(customer=self.request.user).select_related('vendor')  # [UPDATED] Added select_related
+        return CheckoutJob.objects.filter(user=self.request.user)
+    
+    def wait_seconds(self):
+        wait = self.request.query_params.get('wait', 0)
+        try:
+            wait = float(wait)
+        except ValueError:
+            raise serializers.ValidationError({'wait': _('A number of seconds is required.')})
+        return min(max(wait, 0), settings.CHECKOUT_JOB_MAX_WAIT)
+    
+    def retrieve(self, request, *args, **kwargs):
+        deadline = time.monotonic() + self.wait_seconds()
+        job = self.get_object()
+        while not job.is_finished and time.monotonic() < deadline:
+            time.sleep(min(settings.CHECKOUT_JOB_POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+            job.refresh_from_db(fields=['status', 'order_pks', 'error', 'finished_at'])
+        return Response(self.get_serializer(job).data)
 
-class CustomerOrderDetailView(generics.RetrieveAPIView):
+class OrderHistoryListMixin:
+    """
+    One customer's or vendor's orders, newest first, filtered by
+    OrderFilterSet and paged by cursor. The archive is read as well when the
+    requested date range reaches back past ORDER_HOT_WINDOW and the page does.
+    """
+    pagination_class = OrderHistoryCursorPagination
+    
+    def get_owner_filter(self):
+        raise NotImplementedError
+    
+    def get_queryset(self):
+        filterset = OrderFilterSet(self.request.query_params, queryset=Order.objects.filter(**self.get_owner_filter()))
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        orders = filterset.qs.for_list()
+        if not reaches_archive(filterset.created_from):
+            return orders
+        archived = OrderFilterSet(
+            self.request.query_params, queryset=ArchivedOrder.objects.filter(**self.get_owner_filter())
+        ).qs
+        return OrderHistory(orders, archived.select_related('customer', 'vendor'))
+
+class ArchivedOrderDetailMixin:
+    """Order detail that falls back, for reads, to the archive once the order has left the hot tables."""
+    def get_owner_filter(self):
+        raise NotImplementedError
+    
+    def get_queryset(self):
+        return Order.objects.filter(**self.get_owner_filter()).with_items()  # [UPDATED] Items with their products and variants
+    
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            if self.request.method not in SAFE_METHODS:
+                raise
+            return generics.get_object_or_404(
+                ArchivedOrder.objects.filter(**self.get_owner_filter()).select_related('customer', 'vendor'),
+                order_id=self.kwargs[self.lookup_url_kwarg],
+            )
+
+class CustomerOrderListView(OrderHistoryListMixin, generics.ListAPIView):
+    """
+    List all orders for the authenticated customer.
+    """
+    serializer_class = OrderListSerializer  # [UPDATED] Item count and preview instead of every item
+    permission_classes = [IsAuthenticated]
+    
+    def get_owner_filter(self):
+        return {'customer': self.request.user}
+
+class CustomerOrderDetailView(ArchivedOrderDetailMixin, generics.RetrieveAPIView):
     """
     Retrieve a single order detail for the authenticated customer.
     """
@@ -200,28 +463,30 @@ class CustomerOrderDetailView(generics.RetrieveAPIView):
     lookup_field = 'order_id'        # Tell Django to use order_id field
     lookup_url_kwarg = 'pk'
     
-    def get_queryset(self):
-        return Order.objects.filter(customer=self.request.user).select_related('vendor').prefetch_related('items')  # [UPDATED] Added optimizations
+    def get_owner_filter(self):
+        return {'customer': self.request.user}
 
-class VendorOrderListView(generics.ListAPIView):
+class VendorOrderListView(OrderHistoryListMixin, generics.ListAPIView):
     """
     List all orders for the authenticated and approved vendor.
     """
-    serializer_class = OrderSerializer
+    serializer_class = OrderListSerializer  # [UPDATED] Item count and preview instead of every item
     permission_classes = [IsApprovedVendor]
     
-    def get_queryset(self):
-        return Order.objects.filter(vendor=self.request.user.vendor_profile).select_related('customer')  # [UPDATED] Added select_related
+    def get_owner_filter(self):
+        return {'vendor': self.request.user.vendor_profile}
 
-class VendorOrderDetailView(generics.RetrieveUpdateAPIView):
+class VendorOrderDetailView(ArchivedOrderDetailMixin, generics.RetrieveUpdateAPIView):
     """
     Retrieve and update a single order status for the authenticated and approved vendor.
     """
     serializer_class = OrderSerializer
     permission_classes = [IsApprovedVendor]
+    lookup_field = 'order_id'        # URL carries the order UUID, same as the customer view
+    lookup_url_kwarg = 'pk'
     
-    def get_queryset(self):
-        return Order.objects.filter(vendor=self.request.user.vendor_profile).prefetch_related('items')  # [UPDATED] Added prefetch_related
+    def get_owner_filter(self):
+        return {'vendor': self.request.user.vendor_profile}
     
     def perform_update(self, serializer):
         # Only allow vendor to update specific fields  # [UPDATED] Allow more fields
@@ -232,7 +497,11 @@ class VendorOrderDetailView(generics.RetrieveUpdateAPIView):
                 update_data[field] = serializer.validated_data.get(field)
         
         if update_data:
-            serializer.save(**update_data)
+            previous_status = serializer.instance.status
+            with transaction.atomic():
+                order = serializer.save(**update_data)
+                if order.status != previous_status:  # [UPDATED] Keep the status history complete
+                    record_status_change(order, previous_status, actor=self.request.user)
         else:
             return Response({
                 'detail': _('Only status, tracking number, and estimated delivery can be updated.')
@@ -0,0 +1,20 @@
+# apps/outbox/admin.py
+
+from django.contrib import admin
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from .models import OutboxEvent
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'topic', 'aggregate_id', 'status', 'attempts', 'available_at', 'created_at', 'dispatched_at')
+    list_filter = ('status', 'topic')
+    search_fields = ('aggregate_id',)
+    readonly_fields = ('topic', 'aggregate_id', 'payload', 'attempts', 'last_error', 'created_at', 'dispatched_at')
+    actions = ['retry_events']
+    
+    def retry_events(self, request, queryset):
+        """Send failed events again on the next dispatcher run"""
+        count = queryset.exclude(status='dispatched').update(status='pending', attempts=0, available_at=timezone.now())
+        self.message_user(request, f'{count} event(s) queued for redelivery.')
+    retry_events.short_description = _("Retry selected events")
@@ -0,0 +1,83 @@
+# apps/outbox/dispatch.py
+"""
+Draining the outbox.
+
+A dispatcher claims a batch of due events in a short transaction, using
+``select_for_update(skip_locked=True)`` so concurrent dispatchers take
+different events, and pushes the claimed events' ``available_at`` forward by
+OUTBOX_LEASE. Delivery happens after that transaction commits, so a slow sink
+never holds locks that checkout needs; a dispatcher that dies mid-delivery
+just lets its lease run out and the batch is picked up again. Delivery is
+therefore at-least-once.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxEvent
+from .sinks import configured_sinks
+
+
+def retry_delay(attempts):
+    """Exponential backoff: OUTBOX_RETRY_BASE doubled per failed attempt, capped at OUTBOX_RETRY_MAX."""
+    return min(settings.OUTBOX_RETRY_BASE * 2 ** (attempts - 1), settings.OUTBOX_RETRY_MAX)
+
+
+def claim(batch_size, now=None):
+    now = now or timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', available_at__lte=now)
+            .order_by('available_at', 'pk')[:batch_size]
+        )
+        if events:
+            OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+                available_at=now + settings.OUTBOX_LEASE, attempts=F('attempts') + 1
+            )
+    for event in events:
+        event.attempts += 1
+    return events
+
+
+def dispatch_batch(sinks=None, batch_size=100):
+    """
+    Deliver one batch of due events to every sink. Returns (delivered, failed)
+    counts; failed events are retried after retry_delay(), and marked failed
+    once they reach OUTBOX_MAX_ATTEMPTS.
+    """
+    sinks = configured_sinks() if sinks is None else sinks
+    events = claim(batch_size)
+    if not events:
+        return 0, 0
+    try:
+        messages = [event.as_message() for event in events]
+        for sink in sinks:
+            sink.send(messages)
+    except Exception as exc:
+        now = timezone.now()
+        for event in events:
+            event.last_error = f'{type(exc).__name__}: {exc}'[:2000]
+            if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                event.status = 'failed'
+            else:
+                event.available_at = now + retry_delay(event.attempts)
+        OutboxEvent.objects.bulk_update(events, ['status', 'available_at', 'last_error'])
+        return 0, len(events)
+    OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+        status='dispatched', dispatched_at=timezone.now(), last_error=''
+    )
+    return len(events), 0
+
+
+def dispatch_pending(sinks=None, batch_size=100):
+    """Dispatch batches until nothing is due; returns total (delivered, failed)."""
+    sinks = configured_sinks() if sinks is None else sinks
+    delivered = failed = 0
+    while True:
+        sent, lost = dispatch_batch(sinks, batch_size)
+        if not sent and not lost:
+            return delivered, failed
+        delivered += sent
+        failed += lost
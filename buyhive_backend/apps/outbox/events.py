@@ -0,0 +1,24 @@
+# apps/outbox/events.py
+"""
+Writing to the outbox. Call these inside the transaction that makes the
+change, so the event is stored if and only if the change commits.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import OutboxEvent
+
+
+def event(topic, aggregate_id, **payload):
+    """An unsaved OutboxEvent; decimals, dates and UUIDs in ``payload`` become strings."""
+    return OutboxEvent(
+        topic=topic,
+        aggregate_id=str(aggregate_id),
+        payload=json.loads(json.dumps(payload, cls=DjangoJSONEncoder)),
+    )
+
+
+def publish(*events):
+    """Store ``events`` (from event()) in one INSERT."""
+    return OutboxEvent.objects.bulk_create(events)
@@ -0,0 +1,32 @@
+# apps/outbox/management/commands/dispatch_outbox.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.outbox.dispatch import dispatch_pending
+from apps.outbox.sinks import configured_sinks
+
+
+class Command(BaseCommand):
+    help = (
+        'Deliver pending outbox events to the OUTBOX_SINKS in batches. Run it from cron, '
+        'or keep it running with --interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Events claimed and sent together')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Poll again every this many seconds instead of exiting')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        sinks = configured_sinks()
+        while True:
+            delivered, failed = dispatch_pending(sinks, batch_size=options['batch_size'])
+            if delivered or failed or options['verbosity'] > 1:
+                self.stdout.write(f'Delivered {delivered} event(s), {failed} failed and will be retried')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS('Outbox drained'))
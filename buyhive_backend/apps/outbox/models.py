@@ -0,0 +1,50 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class OutboxEvent(models.Model):
+    """
+    A domain event (order created, order status changed, vendor approved)
+    written in the same transaction as the change it describes, and delivered
+    to the configured sinks afterwards by `manage.py dispatch_outbox`.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('dispatched', 'Dispatched'),
+        ('failed', 'Failed'),  # Gave up after OUTBOX_MAX_ATTEMPTS
+    )
+    
+    topic = models.CharField(max_length=64)
+    aggregate_id = models.CharField(max_length=64, help_text=_("Id of the order, vendor, ... the event is about"))
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # Earliest next delivery attempt; pushed forward while claimed and after failures
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['pk']
+        indexes = [
+            # Only the undelivered tail is ever scanned by the dispatcher
+            models.Index(fields=['available_at'], condition=models.Q(status='pending'), name='outbox_pending_idx'),
+            models.Index(fields=['topic', 'aggregate_id']),
+        ]
+        verbose_name = _('outbox event')
+        verbose_name_plural = _('outbox events')
+    
+    def __str__(self):
+        return f"{self.topic} {self.aggregate_id} ({self.status})"
+    
+    def as_message(self):
+        """What sinks deliver; ``id`` lets consumers drop the duplicates at-least-once delivery can produce."""
+        return {
+            'id': self.pk,
+            'topic': self.topic,
+            'aggregate_id': self.aggregate_id,
+            'payload': self.payload,
+            'created_at': self.created_at.isoformat(),
+        }
@@ -0,0 +1,55 @@
+# apps/outbox/sinks.py
+"""
+Where dispatched outbox events go. OUTBOX_SINKS lists sink classes with their
+options; each sink gets whole batches and raises to make the dispatcher retry
+the batch later.
+"""
+import json
+import logging
+import urllib.request
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class LogSink:
+    """Log each event; the default, and handy in development."""
+    def __init__(self, level=logging.INFO):
+        self.level = level
+
+    def send(self, messages):
+        for message in messages:
+            logger.log(self.level, 'outbox %s %s: %s', message['topic'], message['aggregate_id'],
+                       json.dumps(message['payload']))
+
+
+class FileSink:
+    """Append each event to ``path`` as one line of JSON."""
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, messages):
+        with open(self.path, 'a', encoding='utf-8') as handle:
+            handle.writelines(json.dumps(message) + '\n' for message in messages)
+
+
+class WebhookSink:
+    """POST each batch to ``url`` as {"events": [...]}; any non-2xx answer fails the batch."""
+    def __init__(self, url, timeout=10, headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+
+    def send(self, messages):
+        request = urllib.request.Request(
+            self.url, data=json.dumps({'events': messages}).encode(), headers=self.headers, method='POST'
+        )
+        # urlopen raises HTTPError for 4xx/5xx answers
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def configured_sinks():
+    return [import_string(sink['class'])(**sink.get('options', {})) for sink in settings.OUTBOX_SINKS]
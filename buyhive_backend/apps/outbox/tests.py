@@ -0,0 +1,120 @@
+import json
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.outbox.dispatch import dispatch_pending
+from apps.outbox.events import event, publish
+from apps.outbox.models import OutboxEvent
+from apps.outbox.sinks import FileSink, WebhookSink
+from apps.products.models import ProductVariant
+from buyhive_backend.testing import (
+    fill_cart, make_address, make_category, make_product, make_user, make_vendor,
+)
+
+
+class StubWebhook(BaseHTTPRequestHandler):
+    """Records posted batches; answers with the next queued status code (200 when none are queued)."""
+    statuses = []
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        type(self).received.append(json.loads(body))
+        self.send_response(type(self).statuses.pop(0) if type(self).statuses else 200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class OutboxWritesTests(APITestCase):
+    def test_checkout_publishes_one_event_per_order(self):
+        customer = make_user()
+        category = make_category()
+        variants = [make_product(make_vendor(), category, variants=1).variants.get() for _ in range(2)]
+        fill_cart(customer, variants)
+        self.client.force_authenticate(customer)
+        response = self.client.post(reverse('checkout'), {
+            'shipping_address_id': make_address(customer).pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        events = OutboxEvent.objects.filter(topic='order.created')
+        self.assertEqual(sorted(e.aggregate_id for e in events),
+                         sorted(order['order_id'] for order in response.data['orders']))
+        self.assertEqual(events[0].payload['items'], 1)
+
+    def test_failed_checkout_publishes_nothing(self):
+        customer = make_user()
+        variant = make_product(make_vendor(), make_category(), variants=1).variants.get()
+        fill_cart(customer, [variant], quantity=3)
+        ProductVariant.objects.filter(pk=variant.pk).update(stock=1)
+        self.client.force_authenticate(customer)
+        response = self.client.post(reverse('checkout'), {
+            'shipping_address_id': make_address(customer).pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_vendor_approval_publishes_events(self):
+        pending = [make_vendor(is_approved=False) for _ in range(2)]
+        self.client.force_login(make_user(is_staff=True, is_superuser=True))
+        self.client.post(reverse('admin:vendors_vendorprofile_changelist'), {
+            'action': 'approve_vendors', '_selected_action': [vendor.pk for vendor in pending],
+        })
+        self.assertEqual(
+            sorted(OutboxEvent.objects.filter(topic='vendor.approved').values_list('aggregate_id', flat=True)),
+            sorted(str(vendor.pk) for vendor in pending),
+        )
+
+
+class DispatchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = HTTPServer(('127.0.0.1', 0), StubWebhook)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/events'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        StubWebhook.statuses, StubWebhook.received = [], []
+        publish(*[event('order.created', n, id=n) for n in range(5)])
+
+    def test_batches_reach_every_sink(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'events.jsonl')
+            delivered, failed = dispatch_pending([FileSink(path), WebhookSink(self.url)], batch_size=2)
+            with open(path) as handle:
+                lines = [json.loads(line) for line in handle]
+        self.assertEqual((delivered, failed), (5, 0))
+        self.assertEqual([line['aggregate_id'] for line in lines], ['0', '1', '2', '3', '4'])
+        self.assertEqual([len(batch['events']) for batch in StubWebhook.received], [2, 2, 1])
+        self.assertFalse(OutboxEvent.objects.exclude(status='dispatched').exists())
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2)
+    def test_failures_back_off_then_give_up(self):
+        StubWebhook.statuses = [500]
+        self.assertEqual(dispatch_pending([WebhookSink(self.url)], batch_size=10), (0, 5))
+        event_row = OutboxEvent.objects.first()
+        self.assertEqual((event_row.status, event_row.attempts), ('pending', 1))
+        self.assertIn('500', event_row.last_error)
+        self.assertGreater(event_row.available_at, timezone.now())
+        # Nothing is due until the backoff passes
+        self.assertEqual(dispatch_pending([WebhookSink(self.url)]), (0, 0))
+
+        OutboxEvent.objects.update(available_at=timezone.now())
+        StubWebhook.statuses = [503]
+        dispatch_pending([WebhookSink(self.url)])
+        self.assertEqual(set(OutboxEvent.objects.values_list('status', flat=True)), {'failed'})
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html  # [UPDATED] Added for better display
-from .models import Category, Product, ProductVariant, ProductImage, ProductReview
+from .models import Category, InventoryMovement, LowStockAlert, Product, ProductVariant, ProductImage, ProductReview
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -13,7 +13,8 @@ class CategoryAdmin(admin.ModelAdmin):
 class ProductVariantInline(admin.TabularInline):
     model = ProductVariant
     extra = 1
-    fields = ('name', 'sku', 'price_modifier', 'stock', 'is_active')  # [UPDATED] Added fields
+    fields = ('name', 'sku', 'price_modifier', 'stock', 'reserved', 'shard_count', 'low_stock_threshold', 'is_active')  # [UPDATED] Added fields
+    readonly_fields = ('reserved', 'shard_count')  # Sharding goes through `manage.py shard_stock`
 
 class ProductImageInline(admin.TabularInline):
     model = ProductImage
@@ -73,3 +74,30 @@ class ProductReviewAdmin(admin.ModelAdmin):
     def disapprove_reviews(self, request, queryset):
         queryset.update(is_approved=False)
     disapprove_reviews.short_description = "Disapprove selected reviews"
+
+@admin.register(InventoryMovement)
+class InventoryMovementAdmin(admin.ModelAdmin):
+    list_display = ('variant_id', 'delta', 'reason', 'reference', 'created_at')
+    list_filter = ('reason',)
+    search_fields = ('reference',)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(LowStockAlert)
+class LowStockAlertAdmin(admin.ModelAdmin):
+    """Read-only; alerts are opened and resolved by apps/products/alerts.py."""
+    list_display = ('variant', 'vendor', 'stock', 'threshold', 'created_at', 'resolved_at')
+    list_filter = (('resolved_at', admin.EmptyFieldListFilter),)
+    list_select_related = ('variant__product', 'vendor')
+    search_fields = ('variant__sku', 'variant__product__title', 'vendor__business_name')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
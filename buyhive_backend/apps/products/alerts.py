@@ -0,0 +1,118 @@
+# apps/products/alerts.py
+"""
+Low-stock alerts.
+
+A variant is low on stock when its stock is below its own
+``low_stock_threshold`` or, without one, its vendor's. Rather than scanning
+the catalogue for such variants, every path that changes stock (checkout, and
+variant saves from the admin and vendor forms) calls ``sync_low_stock`` for
+the variants it touched, in its own transaction. That opens a LowStockAlert
+for each variant that crossed below its threshold, refreshes the stock on
+the ones still low and resolves the ones restocked: one query for the
+variants, plus one write per kind of change. Reading a vendor's open alerts
+is then an index range scan over the alerts alone.
+
+With LOW_STOCK_EVENTS on, each newly opened alert also publishes an
+``inventory.low_stock`` outbox event. ``manage.py refresh_low_stock``
+re-syncs whole vendors, after upgrading, after a vendor changes its
+threshold, and after stock edits that bypass the ORM.
+"""
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.outbox.events import event, publish
+from .inventory import shard_totals
+from .models import LowStockAlert, ProductVariant
+
+
+def open_alerts():
+    return LowStockAlert.objects.filter(resolved_at__isnull=True)
+
+
+def sync_low_stock(variant_ids):
+    """
+    Bring the open alerts of ``variant_ids`` in line with their current
+    stock; returns the newly opened alerts. Call inside the transaction that
+    changed the stock.
+    """
+    variant_ids = list(variant_ids)
+    if not variant_ids:
+        return []
+    variants = list(
+        ProductVariant.objects.filter(pk__in=variant_ids).values_list(
+            'pk', 'product__vendor_id', 'stock', 'shard_count',
+            Coalesce('low_stock_threshold', 'product__vendor__low_stock_threshold'),
+            Subquery(open_alerts().filter(variant=OuterRef('pk')).values('stock')[:1]),
+        )
+    )
+    # The row of a sharded variant is only a snapshot; its shards hold the stock
+    shards = shard_totals([pk for pk, vendor_id, stock, shard_count, threshold, alerted in variants if shard_count])
+    opened, changed, resolved = [], {}, []
+    for pk, vendor_id, stock, shard_count, threshold, alerted in variants:
+        if shard_count:
+            stock = shards.get(pk, (0, 0))[0]
+        if stock >= threshold:
+            if alerted is not None:
+                resolved.append(pk)
+        elif alerted is None:
+            opened.append(LowStockAlert(variant_id=pk, vendor_id=vendor_id, stock=stock, threshold=threshold))
+        elif alerted != stock:
+            changed[pk] = stock
+
+    _open(opened)
+    if changed:
+        open_alerts().filter(variant_id__in=list(changed)).update(stock=Case(
+            *[When(variant_id=pk, then=Value(stock)) for pk, stock in changed.items()],
+            output_field=models.PositiveIntegerField(),
+        ))
+    if resolved:
+        open_alerts().filter(variant_id__in=resolved).update(resolved_at=timezone.now())
+    return opened
+
+
+def sync_new_variant(variant):
+    """
+    sync_low_stock for a variant just created: it has no alert yet and its
+    stock is on the instance, so only a low one costs any queries.
+    """
+    threshold = variant.low_stock_threshold
+    if threshold is None:
+        threshold = variant.product.vendor.low_stock_threshold
+    if variant.stock >= threshold:
+        return []
+    return _open([LowStockAlert(
+        variant_id=variant.pk, vendor_id=variant.product.vendor_id, stock=variant.stock, threshold=threshold,
+    )])
+
+
+def _open(alerts):
+    # A concurrent sync may have opened the same alert; the partial unique constraint keeps one
+    LowStockAlert.objects.bulk_create(alerts, ignore_conflicts=True)
+    if alerts and settings.LOW_STOCK_EVENTS:
+        publish(*[
+            event('inventory.low_stock', alert.variant_id, vendor_id=alert.vendor_id,
+                  stock=alert.stock, threshold=alert.threshold)
+            for alert in alerts
+        ])
+    return alerts
+
+
+def refresh_low_stock(vendor_ids=None, batch_size=1000):
+    """
+    Re-sync the alerts of every variant (or those of ``vendor_ids``),
+    ``batch_size`` variants per transaction. Returns the number of alerts opened.
+    """
+    variants = ProductVariant.objects.order_by('pk').values_list('pk', flat=True)
+    if vendor_ids is not None:
+        variants = variants.filter(product__vendor_id__in=list(vendor_ids))
+    opened, last = 0, 0
+    while True:
+        chunk = list(variants.filter(pk__gt=last)[:batch_size])
+        if not chunk:
+            return opened
+        with transaction.atomic():
+            opened += len(sync_low_stock(chunk))
+        last = chunk[-1]
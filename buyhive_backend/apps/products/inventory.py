@@ -0,0 +1,198 @@
+# apps/products/inventory.py
+"""
+Inventory ledger and sharded stock counters.
+
+Every stock change appends an InventoryMovement, so a variant's stock is the
+sum of its movements. ``manage.py compact_inventory`` folds movements older
+than INVENTORY_LEDGER_RETENTION into one balance row per variant, and
+``manage.py reconcile_inventory`` audits the ledger and counters against
+each other.
+
+A variant's stock and reserved counters normally live on its own row
+(see apps/orders/reservations.py). A hot variant can be split into
+``shard_count`` StockShard rows with ``manage.py shard_stock``; its units are
+spread over the shards, and each hold, release or sale updates one shard
+picked at random, falling back to several shards only when that one cannot
+cover the quantity alone. The sums over the shards are the true counts. The
+variant row's stock and reserved are then a snapshot, refreshed by
+compact_inventory; listings read the sums instead
+(``ProductVariant.objects.with_shard_totals()``), and stock edits are
+measured against them.
+"""
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import InventoryMovement, ProductVariant, StockShard
+
+
+def distribute(total, count):
+    """Split ``total`` units over ``count`` shards as evenly as possible."""
+    share, extra = divmod(total, count)
+    return [share + (1 if index < extra else 0) for index in range(count)]
+
+
+def sharded(variant_ids):
+    """{variant id: shard count} for the sharded variants among ``variant_ids``."""
+    return dict(
+        ProductVariant.objects.filter(pk__in=list(variant_ids), shard_count__gt=0).values_list('pk', 'shard_count')
+    )
+
+
+def _spread(variant_id, shard_count, quantity, spare, condition, changes):
+    """
+    Apply ``changes(n)`` to the variant's shards for ``quantity`` units in
+    total, where a shard can give ``spare(stock, reserved)`` units and the
+    database re-checks ``condition(n)``. Returns False if the shards cannot
+    cover ``quantity`` together; the caller must then roll back.
+    """
+    if quantity <= 0:
+        return True
+    shards = StockShard.objects.filter(variant_id=variant_id)
+    if shards.filter(condition(quantity), index=random.randrange(shard_count)).update(**changes(quantity)):
+        return True
+    # The picked shard cannot cover it alone: take from several, fullest first, under lock
+    rows = sorted(
+        shards.select_for_update().values_list('index', 'stock', 'reserved'),
+        key=lambda row: spare(row[1], row[2]), reverse=True,
+    )
+    if sum(spare(stock, reserved) for _, stock, reserved in rows) < quantity:
+        return False
+    for index, stock, reserved in rows:
+        take = min(spare(stock, reserved), quantity)
+        if take and not shards.filter(condition(take), index=index).update(**changes(take)):
+            return False
+        quantity -= take
+        if not quantity:
+            return True
+    return False
+
+
+def reserve_shards(variant_id, shard_count, quantity):
+    return _spread(
+        variant_id, shard_count, quantity,
+        lambda stock, reserved: stock - reserved,
+        lambda n: Q(stock__gte=F('reserved') + n),
+        lambda n: {'reserved': F('reserved') + n},
+    )
+
+
+def release_shards(variant_id, shard_count, quantity):
+    return _spread(
+        variant_id, shard_count, quantity,
+        lambda stock, reserved: reserved,
+        lambda n: Q(reserved__gte=n),
+        lambda n: {'reserved': F('reserved') - n},
+    )
+
+
+def take_shards(variant_id, shard_count, quantity):
+    """Remove ``quantity`` unheld units from the variant's stock."""
+    return _spread(
+        variant_id, shard_count, quantity,
+        lambda stock, reserved: stock - reserved,
+        lambda n: Q(stock__gte=F('reserved') + n),
+        lambda n: {'stock': F('stock') - n},
+    )
+
+
+def add_shards(variant_id, shard_count, quantity):
+    for index, share in enumerate(distribute(quantity, shard_count)):
+        if share:
+            StockShard.objects.filter(variant_id=variant_id, index=index).update(stock=F('stock') + share)
+
+
+def shard_totals(variant_ids):
+    """{variant id: (stock, reserved)} summed over the shards of ``variant_ids``."""
+    return {
+        row['variant_id']: (row['stock'], row['reserved'])
+        for row in StockShard.objects.filter(variant_id__in=list(variant_ids))
+        .values('variant_id').annotate(stock=Sum('stock'), reserved=Sum('reserved'))
+    }
+
+
+def exact_available(variants):
+    """
+    {variant id: units not held in carts} for ``variants`` (loaded with stock,
+    reserved and shard_count), reading the shards of sharded ones.
+    """
+    available = {variant.pk: variant.available for variant in variants}
+    totals = shard_totals([variant.pk for variant in variants if variant.shard_count])
+    for variant_id, (stock, reserved) in totals.items():
+        available[variant_id] = max(stock - reserved, 0)
+    return available
+
+
+def shard_variant(variant_id, shard_count):
+    """
+    Spread the variant's counters over ``shard_count`` shards, or fold them
+    back on to the variant row when ``shard_count`` is 0.
+    """
+    with transaction.atomic():
+        variant = ProductVariant.objects.select_for_update().get(pk=variant_id)
+        stock, reserved = variant.stock, variant.reserved
+        if variant.shard_count:
+            stock, reserved = shard_totals([variant.pk]).get(variant.pk, (0, 0))
+            StockShard.objects.filter(variant=variant).delete()
+        shards, unplaced = [], reserved
+        for index, share in enumerate(distribute(stock, shard_count) if shard_count else []):
+            held = min(share, unplaced)
+            unplaced -= held
+            shards.append(StockShard(variant=variant, index=index, stock=share, reserved=held))
+        StockShard.objects.bulk_create(shards)
+        # Queryset update: the stock did not change, so there is no ledger movement
+        ProductVariant.objects.filter(pk=variant.pk).update(shard_count=shard_count, stock=stock, reserved=reserved)
+
+
+def refresh_sharded_totals(variant_ids=None):
+    """
+    Copy the shard sums on to the rows of sharded variants (all of them, or
+    those in ``variant_ids``); returns how many were refreshed.
+    """
+    shards = StockShard.objects.filter(variant=OuterRef('pk')).values('variant')
+    variants = ProductVariant.objects.filter(shard_count__gt=0)
+    if variant_ids is not None:
+        variants = variants.filter(pk__in=list(variant_ids))
+    return variants.update(
+        stock=Coalesce(Subquery(shards.annotate(total=Sum('stock')).values('total')), 0),
+        reserved=Coalesce(Subquery(shards.annotate(total=Sum('reserved')).values('total')), 0),
+    )
+
+
+def ledger_cutoff(now=None):
+    """Movements before this are folded into balance rows."""
+    return (now or timezone.now()) - settings.INVENTORY_LEDGER_RETENTION
+
+
+def fold_ledger(cutoff=None, batch_size=500):
+    """
+    Replace each variant's movements created before ``cutoff`` with a single
+    balance movement carrying their sum, ``batch_size`` variants per
+    transaction. Returns the number of movements folded away.
+    """
+    cutoff = cutoff or ledger_cutoff()
+    folded = 0
+    while True:
+        with transaction.atomic():
+            groups = list(
+                InventoryMovement.objects.filter(created_at__lt=cutoff)
+                .values('variant_id')
+                .annotate(total=Sum('delta'), rows=Count('id'), last=Max('created_at'))
+                .filter(rows__gt=1)
+                .order_by('variant_id')[:batch_size]
+            )
+            if not groups:
+                return folded
+            InventoryMovement.objects.filter(
+                variant_id__in=[group['variant_id'] for group in groups], created_at__lt=cutoff
+            ).delete()
+            InventoryMovement.objects.bulk_create([
+                InventoryMovement(variant_id=group['variant_id'], delta=group['total'], reason='balance',
+                                  created_at=group['last'])
+                for group in groups
+            ])
+        folded += sum(group['rows'] - 1 for group in groups)
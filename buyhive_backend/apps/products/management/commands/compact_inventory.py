@@ -0,0 +1,32 @@
+# apps/products/management/commands/compact_inventory.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.products.inventory import fold_ledger, ledger_cutoff, refresh_sharded_totals
+
+
+class Command(BaseCommand):
+    help = (
+        'Refresh the stock shown for sharded variants from their shards, and fold inventory '
+        'ledger movements older than INVENTORY_LEDGER_RETENTION into one balance row per variant'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int,
+                            help='Fold movements older than this many days instead of INVENTORY_LEDGER_RETENTION')
+        parser.add_argument('--batch-size', type=int, default=500, help='Variants folded per transaction')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        days = options['older_than_days']
+        if days is not None and days < 0:
+            raise CommandError('--older-than-days cannot be negative')
+        refreshed = refresh_sharded_totals()
+        cutoff = timezone.now() - timedelta(days=days) if days is not None else ledger_cutoff()
+        folded = fold_ledger(cutoff=cutoff, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed {refreshed} sharded variant(s); folded {folded} movement(s) from before {cutoff:%Y-%m-%d}'
+        ))
@@ -0,0 +1,21 @@
+# apps/products/management/commands/refresh_low_stock.py
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.alerts import refresh_low_stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Open, update and resolve low-stock alerts from every variant's current stock; run once "
+        'after upgrading, and again after stock edits made directly in the database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('vendor_ids', nargs='*', type=int, help="Only these vendors' variants (default: all)")
+        parser.add_argument('--batch-size', type=int, default=1000, help='Variants checked per transaction')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        opened = refresh_low_stock(options['vendor_ids'] or None, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Opened {opened} low-stock alert(s)'))
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.5 on 2026-10-19 00:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def open_ledger(apps, schema_editor):
+    """Start the ledger with each existing variant's stock as its balance."""
+    ProductVariant = apps.get_model('products', 'ProductVariant')
+    InventoryMovement = apps.get_model('products', 'InventoryMovement')
+    InventoryMovement.objects.bulk_create(
+        (
+            InventoryMovement(variant_id=pk, delta=stock, reason='balance')
+            for pk, stock in ProductVariant.objects.filter(stock__gt=0).values_list('pk', 'stock').iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_productvariant_reserved'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productvariant',
+            name='shard_count',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Stock counter shards (0: stock and reserved live on this row)'),
+        ),
+        migrations.CreateModel(
+            name='InventoryMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('reason', models.CharField(choices=[('initial', 'Initial stock'), ('adjustment', 'Stock edit'), ('sale', 'Sale'), ('removed', 'Variant removed'), ('correction', 'Reconciliation correction'), ('balance', 'Folded balance')], max_length=20)),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('variant', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='movements', to='products.productvariant')),
+            ],
+            options={
+                'verbose_name': 'inventory movement',
+                'verbose_name_plural': 'inventory movements',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['variant', 'created_at'], name='products_in_variant_bc3033_idx'), models.Index(fields=['created_at'], name='products_in_created_58a9aa_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveSmallIntegerField()),
+                ('stock', models.PositiveIntegerField(default=0)),
+                ('reserved', models.PositiveIntegerField(default=0)),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='products.productvariant')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('variant', 'index'), name='unique_stock_shard')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-19 00:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_inventory_ledger_and_shards'),
+        ('vendors', '0002_vendorprofile_low_stock_threshold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productvariant',
+            name='low_stock_threshold',
+            field=models.PositiveIntegerField(blank=True, help_text="Alert when stock falls below this (default: the vendor's threshold)", null=True),
+        ),
+        migrations.CreateModel(
+            name='LowStockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock', models.PositiveIntegerField()),
+                ('threshold', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='low_stock_alerts', to='products.productvariant')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='low_stock_alerts', to='vendors.vendorprofile')),
+            ],
+            options={
+                'verbose_name': 'low-stock alert',
+                'verbose_name_plural': 'low-stock alerts',
+                'ordering': ['stock', 'pk'],
+                'indexes': [models.Index(condition=models.Q(('resolved_at__isnull', True)), fields=['vendor', 'stock'], name='open_low_stock_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('resolved_at__isnull', True)), fields=('variant',), name='one_open_low_stock_alert')],
+            },
+        ),
+    ]
@@ -1,8 +1,10 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _  # [UPDATED] Added translation support
 from django.core.validators import MinValueValidator, MaxValueValidator  # [UPDATED] Added validators
 from apps.vendors.models import VendorProfile
+from django.utils import timezone
 from django.utils.text import slugify
 class Category(models.Model):
     name = models.CharField(max_length=255, unique=True)
@@ -35,6 +37,21 @@ class Category(models.Model):
             return f"{self.parent.get_full_path()} > {self.name}"
         return self.name
 
+class ProductQuerySet(models.QuerySet):
+    def for_listing(self):
+        """
+        Load everything ProductListSerializer reads: vendor and category,
+        images and variants (with their shard totals), plus approved review
+        stats as annotations.
+        """
+        approved = models.Q(reviews__is_approved=True)
+        return self.select_related('vendor', 'category').prefetch_related(
+            'images', models.Prefetch('variants', queryset=ProductVariant.objects.with_shard_totals()),
+        ).annotate(
+            approved_rating_avg=models.Avg('reviews__rating', filter=approved),
+            approved_review_count=models.Count('reviews', filter=approved),
+        )
+
 class Product(models.Model):
     vendor = models.ForeignKey(
         VendorProfile, 
@@ -56,6 +73,8 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ProductQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [  # [UPDATED] Added indexes for better performance
@@ -84,6 +103,8 @@ class Product(models.Model):
     @property  # [UPDATED] Added useful properties
     def average_rating(self):
         """Calculate average rating from reviews"""
+        if hasattr(self, 'approved_rating_avg'):  # Annotated by ProductQuerySet.for_listing()
+            return round(self.approved_rating_avg, 1) if self.approved_rating_avg is not None else 0
         reviews = self.reviews.filter(is_approved=True)
         if reviews.exists():
             return round(reviews.aggregate(models.Avg('rating'))['rating__avg'], 1)
@@ -92,12 +113,31 @@ class Product(models.Model):
     @property
     def review_count(self):
         """Get total number of approved reviews"""
+        if hasattr(self, 'approved_review_count'):
+            return self.approved_review_count
         return self.reviews.filter(is_approved=True).count()
     
     @property
     def in_stock(self):
         """Check if product has any variants in stock"""
-        return self.variants.filter(stock__gt=0, is_active=True).exists()
+        if 'variants' in getattr(self, '_prefetched_objects_cache', {}):
+            return any(variant.is_active and variant.available > 0 for variant in self.variants.all())
+        return self.variants.filter(stock__gt=models.F('reserved'), is_active=True).exists()
+
+class ProductVariantQuerySet(models.QuerySet):
+    def with_shard_totals(self):
+        """
+        Annotate sharded variants with the sums over their shards as
+        ``shard_stock`` and ``shard_reserved`` (None on unsharded ones), which
+        ``live_stock`` and ``available`` then read instead of the row's snapshot.
+        """
+        shards = StockShard.objects.filter(variant=models.OuterRef('pk')).values('variant')
+        return self.annotate(**{
+            f'shard_{field}': models.Case(models.When(shard_count__gt=0, then=Coalesce(
+                models.Subquery(shards.annotate(total=models.Sum(field)).values('total')), 0
+            )))
+            for field in ('stock', 'reserved')
+        })
 
 class ProductVariant(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='variants')
@@ -110,9 +150,22 @@ class ProductVariant(models.Model):
         help_text="Amount to add/subtract from base price."
     )
     stock = models.PositiveIntegerField(default=0, help_text="Available quantity")
+    reserved = models.PositiveIntegerField(
+        default=0, help_text="Units held in customers' carts"
+    )  # [UPDATED] Maintained by apps.orders.reservations
+    # [UPDATED] Hot variants keep their counters in StockShard rows; see apps/products/inventory.py
+    shard_count = models.PositiveSmallIntegerField(
+        default=0, help_text="Stock counter shards (0: stock and reserved live on this row)"
+    )
+    # [UPDATED] Falls back to the vendor's threshold; see apps/products/alerts.py
+    low_stock_threshold = models.PositiveIntegerField(
+        null=True, blank=True, help_text=_("Alert when stock falls below this (default: the vendor's threshold)")
+    )
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)  # [UPDATED] Added timestamp
     
+    objects = ProductVariantQuerySet.as_manager()
+    
     class Meta:  # [UPDATED] Added Meta class
         ordering = ['name']
         indexes = [
@@ -128,6 +181,18 @@ class ProductVariant(models.Model):
         """Calculate the final price including modifier"""
         return self.product.base_price + self.price_modifier
 
+    @property
+    def live_stock(self):
+        """Stock, summed over the shards when loaded with_shard_totals()"""
+        shard_stock = getattr(self, 'shard_stock', None)
+        return self.stock if shard_stock is None else shard_stock
+
+    @property
+    def available(self):
+        """Stock not held in anyone's cart (for sharded variants, as of the last fold unless loaded with_shard_totals())"""
+        shard_reserved = getattr(self, 'shard_reserved', None)
+        return max(self.live_stock - (self.reserved if shard_reserved is None else shard_reserved), 0)
+
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='product_images/')
@@ -171,3 +236,94 @@ class ProductReview(models.Model):
     
     def __str__(self):
         return f"Review by {self.user.email} for {self.product.title}"
+
+
+class StockShard(models.Model):
+    """
+    One of a sharded variant's stock counters. The variant's stock and
+    reserved counts are the sums over its shards; holds and checkouts update
+    one shard picked at random, so buyers of a hot variant do not all queue on
+    one row lock.
+    """
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name='shards')
+    index = models.PositiveSmallIntegerField()
+    stock = models.PositiveIntegerField(default=0)
+    reserved = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['variant', 'index'], name='unique_stock_shard'),
+        ]
+    
+    def __str__(self):
+        return f"{self.variant_id}/{self.index}: {self.stock - self.reserved} available"
+
+class InventoryMovement(models.Model):
+    """
+    Append-only ledger of stock changes. Its deltas sum to each variant's
+    stock; ``manage.py compact_inventory`` folds old rows into one balance row
+    per variant. ``variant`` carries no database constraint so the history
+    outlives deleted variants.
+    """
+    REASON_CHOICES = (
+        ('initial', 'Initial stock'),
+        ('adjustment', 'Stock edit'),
+        ('sale', 'Sale'),
+        ('removed', 'Variant removed'),
+        ('correction', 'Reconciliation correction'),
+        ('balance', 'Folded balance'),
+    )
+    
+    variant = models.ForeignKey(
+        ProductVariant, on_delete=models.DO_NOTHING, db_constraint=False, related_name='movements'
+    )
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    reference = models.CharField(max_length=100, blank=True)  # e.g. the order id of a sale
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['variant', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+        verbose_name = _('inventory movement')
+        verbose_name_plural = _('inventory movements')
+    
+    def __str__(self):
+        return f"{self.variant_id}: {self.delta:+d} ({self.reason})"
+
+
+class LowStockAlert(models.Model):
+    """
+    A variant whose stock is below its low-stock threshold. The alert stays
+    open (``resolved_at`` unset) while the variant stays low and is resolved
+    when it is restocked; the next dip opens a new one. Kept current by
+    apps/products/alerts.py, so reading a vendor's alerts never scans its catalogue.
+    """
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name='low_stock_alerts')
+    vendor = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name='low_stock_alerts')
+    stock = models.PositiveIntegerField()
+    threshold = models.PositiveIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['stock', 'pk']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['variant'], condition=models.Q(resolved_at__isnull=True), name='one_open_low_stock_alert'
+            ),
+        ]
+        indexes = [
+            # Resolved alerts pile up as history; only the open ones are read
+            models.Index(
+                fields=['vendor', 'stock'], condition=models.Q(resolved_at__isnull=True), name='open_low_stock_idx'
+            ),
+        ]
+        verbose_name = _('low-stock alert')
+        verbose_name_plural = _('low-stock alerts')
+    
+    def __str__(self):
+        return f"{self.variant_id}: {self.stock} < {self.threshold}" + (" (resolved)" if self.resolved_at else "")
@@ -11,9 +11,13 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'slug', 'parent', 'description', 'children')
 
     def get_children(self, obj):
-        if obj.children.filter(is_active=True).exists():
-            return CategorySerializer(obj.children.filter(is_active=True), many=True).data
-        return []
+        # [UPDATED] The whole active tree is read once per response and shared through the context
+        children = self.context.get('category_children')
+        if children is None:
+            children = self.context['category_children'] = {}
+            for category in Category.objects.filter(is_active=True):
+                children.setdefault(category.parent_id, []).append(category)
+        return CategorySerializer(children.get(obj.pk, []), many=True, context=self.context).data
 
 class ProductImageSerializer(serializers.ModelSerializer):
     class Meta:
@@ -22,10 +26,12 @@ class ProductImageSerializer(serializers.ModelSerializer):
 
 class ProductVariantSerializer(serializers.ModelSerializer):
     final_price = serializers.ReadOnlyField()
+    stock = serializers.IntegerField(source='live_stock', read_only=True)  # [UPDATED] Shard sums for sharded variants
+    available = serializers.ReadOnlyField()
 
     class Meta:
         model = ProductVariant
-        fields = ('id', 'name', 'sku', 'price_modifier', 'final_price', 'stock', 'is_active')
+        fields = ('id', 'name', 'sku', 'price_modifier', 'final_price', 'stock', 'available', 'is_active')
 
 class ProductReviewSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
@@ -94,19 +100,22 @@ class ProductListSerializer(serializers.ModelSerializer):
         )
 
     def get_primary_image(self, obj):
-        primary = obj.images.filter(is_primary=True).first()
-        if primary:
-            return self.context['request'].build_absolute_uri(primary.image.url)
-        first_image = obj.images.first()
-        if first_image:
-            return self.context['request'].build_absolute_uri(first_image.image.url)
+        # One pass over the (usually prefetched) images instead of two queries
+        images = list(obj.images.all())
+        image = next((image for image in images if image.is_primary), images[0] if images else None)
+        if image:
+            return self.context['request'].build_absolute_uri(image.image.url)
         return None
 
 # ✅ Product creation serializers
 class ProductVariantCreateSerializer(serializers.ModelSerializer):
+    # [UPDATED] Identify an existing variant on update, so it is edited in place
+    id = serializers.IntegerField(required=False)
+    sku = serializers.CharField(max_length=100, required=False, allow_null=True, allow_blank=True)
+
     class Meta:
         model = ProductVariant
-        fields = ('name', 'stock', 'price_modifier')
+        fields = ('id', 'name', 'sku', 'stock', 'price_modifier')
 
     def validate_stock(self, value):
         if value < 0:
@@ -117,7 +126,8 @@ class ProductCreateSerializer(serializers.ModelSerializer):
     images = serializers.ListField(
         child=serializers.ImageField(),
         required=False,
-        allow_empty=True
+        allow_empty=True,
+        write_only=True
     )
 
     class Meta:
@@ -183,19 +193,24 @@ class ProductCreateSerializer(serializers.ModelSerializer):
             setattr(instance, attr, value)
         instance.save()
 
-        # ✅ Update variants (replace existing)
+        # [UPDATED] Update variants in place, matched by id or SKU, so their stock
+        # shards, ledger, holds and order history stay with them; only variants
+        # left out of the list are deleted
         if variants_data:
-            # Delete existing variants
-            instance.variants.all().delete()
-            
-            # Create new variants
+            existing = list(instance.variants.all())
+            by_id = {variant.pk: variant for variant in existing}
+            by_sku = {variant.sku: variant for variant in existing if variant.sku}
+            kept = set()
             for variant_data in variants_data:
-                ProductVariant.objects.create(
-                    product=instance,
-                    name=variant_data.get('name', 'Default'),
-                    stock=int(variant_data.get('stock', 0)),
-                    price_modifier=variant_data.get('price_modifier', 0)
-                )
+                variant = by_id.get(variant_data.get('id')) or by_sku.get(variant_data.get('sku'))
+                if variant is None or variant.pk in kept:
+                    variant = ProductVariant(product=instance)
+                variant.name = variant_data.get('name', 'Default')
+                variant.stock = int(variant_data.get('stock', 0))
+                variant.price_modifier = variant_data.get('price_modifier', 0)
+                variant.save()
+                kept.add(variant.pk)
+            instance.variants.exclude(pk__in=kept).delete()
 
         # ✅ Update images (replace existing if new images provided)
         if images_data:
@@ -0,0 +1,89 @@
+# apps/products/signals.py
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from apps.vendors.analytics import invalidate_analytics
+from .alerts import sync_low_stock, sync_new_variant
+from .inventory import add_shards, refresh_sharded_totals, shard_totals, take_shards
+from .models import InventoryMovement, Product, ProductVariant
+
+
+@receiver(pre_save, sender=ProductVariant)
+def note_stock_edit(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._stock_delta = 0
+    instance._threshold_changed = False
+    if raw or instance._state.adding or (
+        update_fields is not None and not {'stock', 'low_stock_threshold'} & set(update_fields)
+    ):
+        return
+    # A sharded variant's row is only a snapshot: a save that changes it sets
+    # the stock, measured against what the shards hold
+    previous = (
+        ProductVariant.objects.with_shard_totals().filter(pk=instance.pk)
+        .values_list('stock', Coalesce('shard_stock', 'stock'), 'low_stock_threshold').first()
+    )
+    if previous is not None:
+        snapshot, stock, threshold = previous
+        instance._stock_delta = instance.stock - stock if instance.stock != snapshot else 0
+        instance._threshold_changed = instance.low_stock_threshold != threshold
+
+
+@receiver(post_save, sender=ProductVariant)
+def record_stock_edit(sender, instance, created, raw=False, **kwargs):
+    """
+    Ledger entries and low-stock alerts for new variants and for saves that
+    change ``stock`` (admin, vendor forms); alerts also follow threshold edits.
+    """
+    if raw:
+        return
+    if created:
+        if instance.stock:
+            InventoryMovement.objects.create(variant=instance, delta=instance.stock, reason='initial')
+        sync_new_variant(instance)
+        return
+    delta = getattr(instance, '_stock_delta', 0)
+    if not delta:
+        if getattr(instance, '_threshold_changed', False):
+            sync_low_stock([instance.pk])
+        return
+    if instance.shard_count:
+        # The row is only a snapshot for sharded variants; the edit has to land on the shards
+        if delta > 0:
+            add_shards(instance.pk, instance.shard_count, delta)
+        elif not take_shards(instance.pk, instance.shard_count, -delta):
+            raise ValueError(f"Variant {instance.pk} does not have {-delta} unheld units to remove")
+        refresh_sharded_totals([instance.pk])
+    InventoryMovement.objects.create(variant=instance, delta=delta, reason='adjustment')
+    sync_low_stock([instance.pk])
+
+
+@receiver(pre_delete, sender=ProductVariant)
+def note_variant_removed(sender, instance, **kwargs):
+    # Read the shards before they are deleted along with the variant
+    instance._removed_stock = shard_totals([instance.pk]).get(instance.pk, (0, 0))[0] if instance.shard_count else instance.stock
+
+
+@receiver(post_delete, sender=ProductVariant)
+def record_variant_removed(sender, instance, **kwargs):
+    stock = getattr(instance, '_removed_stock', instance.stock)
+    if stock:
+        InventoryMovement.objects.create(variant_id=instance.pk, delta=-stock, reason='removed')
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_analytics(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_analytics(instance.vendor_id)
+
+
+@receiver([post_save, post_delete], sender=ProductVariant)
+def invalidate_variant_analytics(sender, instance, raw=False, origin=None, **kwargs):
+    # Variants deleted along with their product are covered by the product's own signal
+    if raw or isinstance(origin, Product):
+        return
+    if ProductVariant.product.is_cached(instance):
+        vendor_id = instance.product.vendor_id
+    else:
+        vendor_id = Product.objects.filter(pk=instance.product_id).values_list('vendor_id', flat=True).first()
+    invalidate_analytics(vendor_id)
@@ -1,3 +1,299 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.db.models import Sum
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.orders.reservations import reconcile_inventory
+from apps.outbox.models import OutboxEvent
+from apps.products.alerts import open_alerts, sync_low_stock
+from apps.products.inventory import fold_ledger, shard_totals, shard_variant, take_shards
+from apps.products.models import InventoryMovement, LowStockAlert, ProductVariant, StockShard
+from buyhive_backend.testing import (
+    QueryBudgetTestCase, seed_marketplace, fill_cart, make_address, make_category, make_product, make_user,
+    make_vendor,
+)
+
+
+class ProductsQueryBudgetTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_marketplace()
+        cls.product = cls.data['products'][0]
+        cls.vendor = cls.data['vendors'][0]
+        cls.customer = cls.data['customers'][0]
+
+    def product_form(self, **overrides):
+        form = {
+            'title': 'Budget Chair',
+            'description': 'A chair',
+            'base_price': '49.99',
+            'category': str(self.data['category'].pk),
+            'is_active': 'true',
+            'featured': 'false',
+        }
+        for i in range(3):
+            form[f'variants[{i}][name]'] = f'Colour {i}'
+            form[f'variants[{i}][stock]'] = '5'
+            form[f'variants[{i}][price_modifier]'] = '0'
+        form.update(overrides)
+        return form
+
+    def test_product_list(self):
+        self.assertQueryBudget(6, 'get', 'product-list', expected_status=200)
+
+    def test_product_detail(self):
+        self.assertQueryBudget(9, 'get', 'product-detail', args=[self.product.pk],
+                               expected_status=200)
+
+    def test_product_create(self):
+        self.assertQueryBudget(16, 'post', 'product-list', user=self.vendor.user,
+                               data=self.product_form(), format='multipart',
+                               expected_status=201)
+
+    def test_product_update(self):
+        # Both existing variants are edited in place and a third is added
+        product = make_product(self.vendor, self.data['category'])
+        ids = {f'variants[{i}][id]': str(pk) for i, pk in enumerate(product.variants.values_list('pk', flat=True))}
+        self.assertQueryBudget(26, 'put', 'product-detail', args=[product.pk],
+                               user=self.vendor.user,
+                               data=self.product_form(title='Renamed Chair', **ids),
+                               format='multipart', expected_status=200)
+
+    def test_product_delete(self):
+        product = make_product(self.vendor, self.data['category'])
+        self.assertQueryBudget(16, 'delete', 'product-detail', args=[product.pk],
+                               user=self.vendor.user, expected_status=204)
+
+    def test_category_list(self):
+        self.assertQueryBudget(4, 'get', 'category-list', expected_status=200)
+
+    def test_category_detail(self):
+        self.assertQueryBudget(3, 'get', 'category-detail', args=[self.data['category'].pk],
+                               expected_status=200)
+
+    def test_review_list(self):
+        self.assertQueryBudget(2, 'get', 'product-reviews-list',
+                               kwargs={'product_pk': self.product.pk}, expected_status=200)
+
+    def test_review_create_and_detail(self):
+        reviewer = make_user()
+        response = self.assertQueryBudget(2, 'post', 'product-reviews-list',
+                                          kwargs={'product_pk': self.product.pk},
+                                          user=reviewer, data={'rating': 4, 'comment': 'Solid'},
+                                          expected_status=201)
+        review_id = response.data['id']
+        self.assertQueryBudget(1, 'get', 'product-reviews-detail',
+                               kwargs={'product_pk': self.product.pk, 'pk': review_id},
+                               expected_status=200)
+        self.assertQueryBudget(2, 'put', 'product-reviews-detail',
+                               kwargs={'product_pk': self.product.pk, 'pk': review_id},
+                               data={'rating': 5, 'comment': 'Great'}, expected_status=200)
+        self.assertQueryBudget(2, 'delete', 'product-reviews-detail',
+                               kwargs={'product_pk': self.product.pk, 'pk': review_id},
+                               expected_status=204)
+
+
+class InventoryTests(APITestCase):
+    def setUp(self):
+        self.customer = make_user()
+        self.variant = make_product(make_vendor(), make_category(), variants=1).variants.get()
+        shard_variant(self.variant.pk, 4)
+        self.client.force_authenticate(self.customer)
+
+    def add(self, quantity, user=None):
+        self.client.force_authenticate(user or self.customer)
+        return self.client.post(reverse('cart-item-list'), {
+            'product_id': self.variant.product_id, 'variant_id': self.variant.pk, 'quantity': quantity,
+        }, format='json')
+
+    def ledger(self):
+        return InventoryMovement.objects.filter(variant=self.variant).aggregate(total=Sum('delta'))['total']
+
+    def test_sharded_holds_and_checkout(self):
+        self.assertEqual(list(StockShard.objects.filter(variant=self.variant).values_list('stock', flat=True)),
+                         [13, 13, 12, 12])
+        # More than any one shard holds, so the hold spans several
+        self.assertEqual(self.add(40).status_code, 201)
+        self.assertEqual(shard_totals([self.variant.pk])[self.variant.pk], (50, 40))
+        response = self.add(11, user=make_user())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Available: 10', str(response.data))
+
+        self.client.force_authenticate(self.customer)
+        response = self.client.post(reverse('checkout'), {
+            'shipping_address_id': make_address(self.customer).pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(shard_totals([self.variant.pk])[self.variant.pk], (10, 0))
+        self.assertEqual(self.ledger(), 10)
+        self.assertEqual(reconcile_inventory(), [])
+
+        call_command('compact_inventory', stdout=StringIO())
+        self.variant.refresh_from_db()
+        self.assertEqual((self.variant.stock, self.variant.reserved), (10, 0))
+
+    def test_stock_edits_land_on_the_shards(self):
+        self.variant.refresh_from_db()
+        self.variant.stock = 30
+        self.variant.save()
+        self.assertEqual(shard_totals([self.variant.pk])[self.variant.pk], (30, 0))
+        self.assertEqual(self.ledger(), 30)
+        shard_variant(self.variant.pk, 0)
+        self.variant.refresh_from_db()
+        self.assertEqual((self.variant.stock, self.variant.shard_count), (30, 0))
+        self.assertFalse(StockShard.objects.exists())
+
+    def test_stock_is_read_from_the_shards_between_folds(self):
+        take_shards(self.variant.pk, 4, 10)  # A sale leaves the row's snapshot at 50
+        rows = self.client.get(reverse('product-list')).data['results']
+        variant = next(row for row in rows if row['id'] == self.variant.product_id)['variants'][0]
+        self.assertEqual((variant['stock'], variant['available']), (40, 40))
+        self.client.force_authenticate(self.variant.product.vendor.user)
+        rows = self.client.get(reverse('vendor-products-manage')).data['products']
+        self.assertEqual(rows[0]['total_stock'], 40)
+
+        self.variant.refresh_from_db()
+        self.variant.name = 'Renamed'
+        self.variant.save()
+        self.assertEqual(shard_totals([self.variant.pk])[self.variant.pk], (40, 0))
+        self.variant.stock = 45
+        self.variant.save()
+        self.assertEqual(shard_totals([self.variant.pk])[self.variant.pk], (45, 0))
+        self.assertEqual(
+            list(InventoryMovement.objects.filter(variant=self.variant, reason='adjustment').values_list('delta', flat=True)),
+            [5],
+        )
+        take_shards(self.variant.pk, 4, 3)
+        variant_id = self.variant.pk
+        self.variant.delete()
+        self.assertEqual(InventoryMovement.objects.get(variant_id=variant_id, reason='removed').delta, -42)
+
+    def test_availability_checks_read_the_shards(self):
+        take_shards(self.variant.pk, 4, 10)  # The row's snapshot still says 50
+        self.client.force_authenticate(None)
+        response = self.client.post(reverse('guest-cart-item-list'), {
+            'product_id': self.variant.product_id, 'variant_id': self.variant.pk, 'quantity': 45,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Available: 40', str(response.data))
+
+        self.client.force_authenticate(self.variant.product.vendor.user)
+        response = self.client.get(reverse('vendor-variant-threshold', args=[self.variant.pk]))
+        self.assertEqual(response.data['stock'], 40)
+
+    def test_product_edit_keeps_variants_shards_and_ledger(self):
+        product = self.variant.product
+        shards = list(StockShard.objects.filter(variant=self.variant).values_list('index', 'stock', 'reserved'))
+        ledger = list(InventoryMovement.objects.values_list('pk', 'delta'))
+        self.client.force_authenticate(product.vendor.user)
+        response = self.client.put(reverse('product-detail', args=[product.pk]), {
+            'title': 'Renamed', 'description': product.description, 'base_price': str(product.base_price),
+            'category': product.category_id, 'is_active': 'true', 'featured': 'false',
+            'variants[0][id]': self.variant.pk, 'variants[0][name]': 'Oak',
+            'variants[0][stock]': '50', 'variants[0][price_modifier]': '5',
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(product.variants.values_list('pk', 'name')), [(self.variant.pk, 'Oak')])
+        self.assertEqual(
+            list(StockShard.objects.filter(variant=self.variant).values_list('index', 'stock', 'reserved')), shards
+        )
+        self.assertEqual(list(InventoryMovement.objects.values_list('pk', 'delta')), ledger)
+
+    def test_fold_keeps_the_balance(self):
+        old = timezone.now() - timedelta(days=100)
+        InventoryMovement.objects.update(created_at=old)
+        InventoryMovement.objects.bulk_create([
+            InventoryMovement(variant=self.variant, delta=delta, reason='adjustment', created_at=old)
+            for delta in (5, -2)
+        ])
+        InventoryMovement.objects.create(variant=self.variant, delta=-3, reason='sale')
+        self.assertEqual(fold_ledger(), 2)
+        self.assertEqual(
+            list(InventoryMovement.objects.filter(variant=self.variant).values_list('reason', 'delta')),
+            [('balance', 53), ('sale', -3)],
+        )
+        self.assertEqual(fold_ledger(), 0)
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        StockShard.objects.filter(variant=self.variant, index=0).update(stock=3, reserved=2)
+        with self.assertRaises(CommandError):
+            call_command('reconcile_inventory', stdout=StringIO())
+        self.assertEqual(
+            {(found.check, found.recorded, found.expected) for found in reconcile_inventory(fix=True)},
+            {('ledger', 50, 40), ('reserved', 2, 0)},
+        )
+        self.assertEqual(self.ledger(), 40)
+        self.assertEqual(reconcile_inventory(), [])
+
+
+class LowStockAlertTests(APITestCase):
+    def setUp(self):
+        self.vendor = make_vendor()
+        self.variant = make_product(self.vendor, make_category(), variants=1).variants.get()
+        self.customer = make_user()
+
+    def checkout(self, quantity):
+        fill_cart(self.customer, [self.variant], quantity=quantity)
+        self.client.force_authenticate(self.customer)
+        response = self.client.post(reverse('checkout'), {
+            'shipping_address_id': make_address(self.customer).pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def set_stock(self, stock):
+        self.variant.refresh_from_db()
+        self.variant.stock = stock
+        self.variant.save()
+
+    def alerts(self):
+        return list(LowStockAlert.objects.order_by('pk').values_list('stock', 'threshold', 'resolved_at'))
+
+    def test_checkout_and_edits_open_update_and_resolve_alerts(self):
+        self.checkout(45)
+        self.assertEqual(self.alerts(), [(5, 10, None)])
+        self.assertEqual(
+            list(OutboxEvent.objects.filter(topic='inventory.low_stock').values_list('aggregate_id', 'payload')),
+            [(str(self.variant.pk), {'vendor_id': self.vendor.pk, 'stock': 5, 'threshold': 10})],
+        )
+        self.checkout(1)
+        self.assertEqual(self.alerts(), [(4, 10, None)])
+        self.set_stock(30)
+        self.assertFalse(open_alerts().exists())
+        self.assertIsNotNone(self.alerts()[0][2])
+        # The next dip opens a new alert, and a new event
+        self.set_stock(2)
+        self.assertEqual(open_alerts().get().stock, 2)
+        self.assertEqual(OutboxEvent.objects.filter(topic='inventory.low_stock').count(), 2)
+
+    def test_thresholds(self):
+        self.variant.low_stock_threshold = 60
+        self.variant.save(update_fields=['low_stock_threshold'])
+        self.assertEqual(self.alerts(), [(50, 60, None)])
+        self.variant.low_stock_threshold = 0  # Never alert
+        self.variant.save(update_fields=['low_stock_threshold'])
+        self.assertFalse(open_alerts().exists())
+        # Without an override the vendor's threshold applies
+        self.variant.low_stock_threshold = None
+        self.variant.save()
+        ProductVariant.objects.filter(pk=self.variant.pk).update(stock=5)
+        self.assertEqual(len(sync_low_stock([self.variant.pk])), 1)
+        self.assertEqual(sync_low_stock([self.variant.pk]), [])
+        self.assertEqual(open_alerts().get().threshold, 10)
+
+    def test_sharded_stock_is_read_from_the_shards(self):
+        shard_variant(self.variant.pk, 4)
+        StockShard.objects.filter(variant=self.variant).update(stock=1)
+        sync_low_stock([self.variant.pk])
+        self.assertEqual(open_alerts().get().stock, 4)
+
+    def test_refresh_command(self):
+        ProductVariant.objects.filter(pk=self.variant.pk).update(stock=0)
+        out = StringIO()
+        call_command('refresh_low_stock', self.vendor.pk, stdout=out)
+        self.assertIn('Opened 1 low-stock alert(s)', out.getvalue())
+        call_command('refresh_low_stock', stdout=out)
+        self.assertEqual(open_alerts().count(), 1)
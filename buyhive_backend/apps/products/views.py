@@ -3,9 +3,10 @@ from rest_framework import viewsets, permissions, filters, serializers, status
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Prefetch
 from django.utils.text import slugify
 
-from .models import Product, Category, ProductReview, ProductVariant, ProductImage
+from .models import Product, Category, ProductReview, ProductImage
 from .serializers import (
     ProductSerializer, ProductManageSerializer, ProductListSerializer,
     CategorySerializer, ProductReviewSerializer, ProductCreateSerializer
@@ -51,8 +52,13 @@ class ProductViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        if self.action in ['list', 'retrieve']:
-            return queryset.filter(vendor__is_approved=True)
+        if self.action == 'list':
+            return queryset.filter(vendor__is_approved=True).for_listing()
+        if self.action == 'retrieve':
+            # [UPDATED] ProductSerializer also lists every review with its author
+            return queryset.filter(vendor__is_approved=True).for_listing().prefetch_related(
+                Prefetch('reviews', queryset=ProductReview.objects.select_related('user'))
+            )
         else:
             if hasattr(self.request.user, 'vendor_profile'):
                 return queryset.filter(vendor=self.request.user.vendor_profile)
@@ -229,14 +235,16 @@ class ProductViewSet(viewsets.ModelViewSet):
                 'stock': stock_int,
                 'price_modifier': float(price_modifier_value) if price_modifier_value else 0
             }
+            # [UPDATED] Lets the serializer edit the existing variant in place
+            for key in ('id', 'sku'):
+                if request.data.get(f'variants[{i}][{key}]'):
+                    variant[key] = request.data[f'variants[{i}][{key}]']
             variants.append(variant)
             i += 1
 
         if variants:
             data['variants'] = variants
-        else:
-            # Keep existing variants if none provided
-            data['variants'] = [{'name': 'Default', 'stock': 0, 'price_modifier': 0}]
+        # [UPDATED] Otherwise leave the variants out, which keeps the existing ones
 
         # ✅ Handle images (optional for updates)
         images = request.FILES.getlist('images')
@@ -272,19 +280,8 @@ class ProductViewSet(viewsets.ModelViewSet):
                         alt_text=f"Image for {product.title}"
                     )
             
-            # ✅ Handle variants update
-            if variants:
-                # Delete existing variants
-                instance.variants.all().delete()
-                
-                # Create new variants
-                for variant_data in variants:
-                    ProductVariant.objects.create(
-                        product=product,
-                        name=variant_data['name'],
-                        stock=variant_data['stock'],
-                        price_modifier=variant_data['price_modifier']
-                    )
+            # [UPDATED] Variants were already replaced by ProductCreateSerializer.update;
+            # replacing them again here wrote every stock change to the ledger twice
 
             return Response(serializer.data)
             
@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.utils.html import format_html  # [UPDATED] Added for better display
 from django.utils.translation import gettext_lazy as _
+from django.db import transaction
+from apps.outbox.events import event, publish
 from .models import VendorProfile
 
 @admin.register(VendorProfile)
@@ -55,14 +57,18 @@ class VendorProfileAdmin(admin.ModelAdmin):
     
     def approve_vendors(self, request, queryset):
         """Approve selected vendors and mark user as vendor"""
-        count = 0
-        for profile in queryset.filter(is_approved=False):
-            profile.is_approved = True
-            profile.rejection_reason = ''  # Clear any rejection reason
-            profile.user.is_vendor = True
-            profile.user.save(update_fields=['is_vendor'])
-            profile.save(update_fields=['is_approved', 'rejection_reason'])
-            count += 1
+        approved = []
+        with transaction.atomic():  # [UPDATED] Approvals and their outbox events commit together
+            for profile in queryset.filter(is_approved=False).select_related('user'):
+                profile.is_approved = True
+                profile.rejection_reason = ''  # Clear any rejection reason
+                profile.user.is_vendor = True
+                profile.user.save(update_fields=['is_vendor'])
+                profile.save(update_fields=['is_approved', 'rejection_reason'])
+                approved.append(event('vendor.approved', profile.pk, user_id=profile.user_id,
+                                      business_name=profile.business_name))
+            publish(*approved)
+        count = len(approved)
         
         self.message_user(request, f'{count} vendor(s) approved successfully.')
     approve_vendors.short_description = _("Approve selected vendors")
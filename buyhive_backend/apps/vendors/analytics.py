@@ -0,0 +1,134 @@
+# apps/vendors/analytics.py
+"""
+The vendor dashboard figures. Product statistics are one conditional
+aggregate, low-stock variants one read of the open LowStockAlert rows
+(apps/products/alerts.py). Order and revenue figures are summed from the
+VendorDailySales rollup and top products from ProductDailySales
+(apps/orders/sales.py), so they cost one row per day of sales rather than one
+per order. The result is
+cached per vendor for VENDOR_ANALYTICS_TTL and dropped, after commit,
+whenever the vendor's orders, products or stock change.
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from apps.orders.models import ProductDailySales, VendorDailySales
+from apps.products.models import LowStockAlert
+
+
+def analytics_cache_key(vendor_id):
+    return f"vendor-analytics:{vendor_id}"
+
+
+def generation_cache_key(vendor_id):
+    return f"vendor-analytics-generation:{vendor_id}"
+
+
+def analytics_generation(vendor_id):
+    """
+    A token for the current state of the vendor's figures, for caches keyed by
+    request parameters (see apps.vendors.timeseries). invalidate_analytics
+    drops it, which orphans every entry keyed by the old token.
+    """
+    key = generation_cache_key(vendor_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        generation = cache.get(key)
+    return generation
+
+
+def invalidate_analytics(*vendor_ids):
+    """Drop the vendors' cached analytics once the current transaction commits."""
+    keys = [
+        key
+        for vendor_id in set(vendor_ids) if vendor_id is not None
+        for key in (analytics_cache_key(vendor_id), generation_cache_key(vendor_id))
+    ]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def low_stock_products(vendor):
+    """Active products with active variants on an open low-stock alert, newest product first."""
+    products = {}
+    variants = (
+        LowStockAlert.objects.filter(
+            vendor=vendor, resolved_at__isnull=True, variant__is_active=True, variant__product__is_active=True
+        )
+        .order_by('-variant__product__created_at', 'variant__product_id', 'variant__name')
+        .values_list('variant__product_id', 'variant__product__title', 'variant__name', 'stock')
+    )
+    for product_id, title, name, stock in variants:
+        products.setdefault(product_id, {
+            'product_title': title,
+            'product_id': product_id,
+            'variants': [],
+        })['variants'].append({'name': name, 'stock': stock})
+    return list(products.values())
+
+
+def compute_analytics(vendor):
+    first_day = timezone.localdate() - timedelta(days=30)
+    recent = Q(day__gte=first_day)
+
+    products = vendor.products.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        featured=Count('id', filter=Q(featured=True)),
+    )
+    orders = VendorDailySales.objects.filter(vendor=vendor).aggregate(
+        total=Sum('orders'),
+        pending=Sum('pending'),
+        processing=Sum('processing'),
+        shipped=Sum('shipped'),
+        delivered=Sum('delivered'),
+        recent_30_days=Sum('orders', filter=recent),
+        revenue=Sum('gross_revenue'),
+        monthly_revenue=Sum('gross_revenue', filter=recent),
+    )
+    low_stock = low_stock_products(vendor)
+    top_products = ProductDailySales.objects.filter(
+        recent,
+        vendor=vendor
+    ).values('product__title', 'product__id').annotate(
+        total_sold=Sum('units')
+    ).filter(total_sold__gt=0).order_by('-total_sold')[:5]
+
+    return {
+        'products': {
+            **products,
+            'low_stock_count': len(low_stock),
+            'low_stock_items': low_stock[:10]  # Limit to 10 items
+        },
+        'orders': {
+            key: orders[key] or 0
+            for key in ('total', 'pending', 'processing', 'shipped', 'delivered', 'recent_30_days')
+        },
+        'revenue': {
+            'total': float(orders['revenue'] or 0),
+            'monthly': float(orders['monthly_revenue'] or 0)
+        },
+        'top_products': list(top_products),
+        'business_info': {
+            'business_name': vendor.business_name,
+            'member_since': vendor.created_at.date(),
+            'status': 'approved'
+        }
+    }
+
+
+def vendor_analytics(vendor):
+    """The vendor's dashboard figures, from cache when fresh."""
+    key = analytics_cache_key(vendor.pk)
+    data = cache.get(key)
+    if data is None:
+        data = compute_analytics(vendor)
+        cache.set(key, data, settings.VENDOR_ANALYTICS_TTL)
+    return data
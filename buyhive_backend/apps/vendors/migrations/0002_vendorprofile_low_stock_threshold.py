@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 00:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendorprofile',
+            name='low_stock_threshold',
+            field=models.PositiveIntegerField(default=10, help_text="Alert when a variant's stock falls below this."),
+        ),
+    ]
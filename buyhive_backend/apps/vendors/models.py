@@ -42,6 +42,12 @@ class VendorProfile(models.Model):
         help_text=_("Reason for rejection (filled by admin)")
     )
     
+    # [UPDATED] Variants below this stock get a low-stock alert unless they set their own threshold
+    low_stock_threshold = models.PositiveIntegerField(
+        default=10,
+        help_text=_("Alert when a variant's stock falls below this.")
+    )
+    
     # --- Timestamps ---
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
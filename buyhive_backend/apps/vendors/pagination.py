@@ -0,0 +1,34 @@
+# apps/vendors/pagination.py
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class VendorOrderCursorPagination(CursorPagination):
+    """
+    Newest orders first, keyed on created_at so every page is one index range
+    scan however deep the vendor pages. Rows stay under ``orders`` as before;
+    follow ``next`` instead of counting pages.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    rows_key = 'orders'
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            self.rows_key: data,
+        })
+
+
+class VendorProductCursorPagination(VendorOrderCursorPagination):
+    """Newest products first, under ``products``; same keyset paging as orders."""
+    rows_key = 'products'
+
+
+class LowStockCursorPagination(VendorOrderCursorPagination):
+    """Open low-stock alerts, emptiest variant first, under ``alerts``."""
+    ordering = ('stock', 'id')
+    rows_key = 'alerts'
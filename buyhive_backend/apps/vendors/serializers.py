@@ -1,7 +1,13 @@
 # apps/vendors/serializers.py
+from datetime import timedelta
+
 from rest_framework import serializers
+from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _  # [UPDATED] Added translation
+from apps.products.models import ProductVariant
 from .models import VendorProfile
+from .timeseries import GRANULARITIES
 
 class VendorApplicationSerializer(serializers.ModelSerializer):
     """
@@ -36,7 +42,8 @@ class VendorProfileSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'user_email', 'user_name', 'business_name', 'business_logo', 
             'description', 'tax_id', 'business_license', 'is_approved', 
-            'status', 'rejection_reason', 'created_at', 'updated_at'  # [UPDATED] Added more fields
+            'status', 'rejection_reason', 'low_stock_threshold',
+            'created_at', 'updated_at'  # [UPDATED] Added more fields
         )
         read_only_fields = (
             'is_approved', 'rejection_reason', 'created_at', 'updated_at'  # [UPDATED] Enhanced read-only fields
@@ -88,3 +95,42 @@ class VendorAnalyticsSerializer(serializers.Serializer):
     
     class Meta:
         fields = ['products', 'orders', 'revenue', 'top_products', 'business_info']
+
+
+class TimeseriesQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of the vendor timeseries. The range defaults to the last
+    30 days, 12 weeks or 12 months, depending on the granularity.
+    """
+    DEFAULT_SPAN_DAYS = {'day': 30, 'week': 84, 'month': 365}
+    
+    granularity = serializers.ChoiceField(choices=GRANULARITIES, default='day')
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    product = serializers.IntegerField(required=False, min_value=1)
+    category = serializers.IntegerField(required=False, min_value=1)
+    
+    def validate(self, attrs):
+        if 'product' in attrs and 'category' in attrs:
+            raise serializers.ValidationError(_("Filter by product or by category, not both."))
+        date_to = attrs.setdefault('date_to', timezone.localdate())
+        date_from = attrs.setdefault(
+            'date_from', date_to - timedelta(days=self.DEFAULT_SPAN_DAYS[attrs['granularity']] - 1)
+        )
+        if date_from > date_to:
+            raise serializers.ValidationError({'date_from': _("Must not be after date_to.")})
+        if (date_to - date_from).days >= settings.VENDOR_TIMESERIES_MAX_DAYS:
+            raise serializers.ValidationError(
+                _("The range can span at most {days} days.").format(days=settings.VENDOR_TIMESERIES_MAX_DAYS)
+            )
+        return attrs
+
+
+class VariantThresholdSerializer(serializers.ModelSerializer):
+    """A vendor's low-stock threshold override for one variant; null falls back to the vendor's."""
+    stock = serializers.IntegerField(source='live_stock', read_only=True)
+    
+    class Meta:
+        model = ProductVariant
+        fields = ('id', 'name', 'sku', 'stock', 'low_stock_threshold')
+        read_only_fields = ('id', 'name', 'sku', 'stock')
@@ -1,3 +1,312 @@
+import csv
+import json
+from datetime import date, datetime, time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.orders.models import Order, OrderStatusEvent
+from apps.orders.sales import rebuild_daily_sales
+from apps.products.alerts import refresh_low_stock
+from apps.products.models import Product
+from apps.vendors.models import VendorProfile
+from buyhive_backend.datagen import DatasetPlan
+from buyhive_backend.testing import (
+    QueryBudgetTestCase, seed_marketplace, make_category, make_order, make_product, make_user, make_vendor,
+)
+
+
+class VendorsQueryBudgetTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_marketplace()
+        cls.vendor = cls.data['vendors'][0]
+
+    def test_apply(self):
+        applicant = make_user()
+        self.assertQueryBudget(4, 'post', 'vendor-apply', user=applicant, data={
+            'business_name': 'Fresh Vendor', 'description': 'New here',
+        }, format='multipart', expected_status=201)
+
+    def test_status_and_profile(self):
+        self.assertQueryBudget(1, 'get', 'vendor-status', user=self.vendor.user,
+                               expected_status=200)
+        self.assertQueryBudget(1, 'get', 'vendor-profile-manage', user=self.vendor.user,
+                               expected_status=200)
+        self.assertQueryBudget(1, 'patch', 'vendor-profile-manage', user=self.vendor.user,
+                               data={'description': 'Updated'}, expected_status=200)
+
+    def test_public_list(self):
+        self.assertQueryBudget(2, 'get', 'public-vendor-list', expected_status=200)
+
+    def test_analytics(self):
+        self.assertQueryBudget(4, 'get', 'vendor-analytics', user=self.vendor.user,
+                               expected_status=200)
+        # Served from cache until something changes
+        self.assertQueryBudget(0, 'get', 'vendor-analytics', user=self.vendor.user,
+                               expected_status=200)
+
+    def test_analytics_figures(self):
+        orders = Order.objects.filter(vendor=self.vendor)
+        product = Product.objects.filter(vendor=self.vendor).first()
+        product.variants.update(stock=3, is_active=True)
+        refresh_low_stock([self.vendor.pk])  # Queryset updates bypass the alert sync
+        self.client.force_authenticate(self.vendor.user)
+        data = self.client.get(reverse('vendor-analytics')).data
+        self.assertEqual(data['orders']['total'], orders.count())
+        self.assertEqual(data['orders']['pending'], orders.filter(status='pending').count())
+        self.assertEqual(data['revenue']['total'], float(sum(
+            order.total_amount for order in orders.filter(payment_status='completed')
+        )))
+        low = next(item for item in data['products']['low_stock_items'] if item['product_id'] == product.pk)
+        self.assertEqual(sorted(variant['name'] for variant in low['variants']),
+                         sorted(product.variants.values_list('name', flat=True)))
+
+    def test_analytics_invalidated_by_status_changes(self):
+        order = Order.objects.filter(vendor=self.vendor).first()
+        Order.objects.filter(pk=order.pk).update(status='pending')
+        self.client.force_authenticate(self.vendor.user)
+        before = self.client.get(reverse('vendor-analytics')).data['orders']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('vendor-orders-update-status'), {
+                'order_ids': [order.pk], 'status': 'processing',
+            }, format='json')
+        after = self.client.get(reverse('vendor-analytics')).data['orders']
+        self.assertEqual((after['pending'], after['processing']),
+                         (before['pending'] - 1, before['processing'] + 1))
+
+    def test_products_manage(self):
+        self.assertQueryBudget(4, 'get', 'vendor-products-manage', user=self.vendor.user,
+                               expected_status=200)
+
+    def test_products_manage_figures_and_filters(self):
+        products = list(Product.objects.filter(vendor=self.vendor))
+        empty, low = products[0], products[1]
+        empty.variants.update(stock=0)
+        low.variants.update(stock=1)
+        empty.variants.filter(pk=empty.variants.first().pk).update(is_active=False, stock=50)
+        self.client.force_authenticate(self.vendor.user)
+        url = reverse('vendor-products-manage')
+
+        rows = {row['id']: row for row in self.client.get(url, {'page_size': 200}).data['products']}
+        self.assertEqual(len(rows), len(products))
+        for product in (empty, low, products[2]):
+            row = rows[product.pk]
+            self.assertEqual(
+                (row['total_stock'], row['variants_count'], row['images_count'],
+                 row['review_count'], row['average_rating'], row['category']),
+                (sum(v.stock for v in product.variants.filter(is_active=True)), product.variants.count(),
+                 product.images.count(), product.review_count, product.average_rating, product.category.name),
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            out = self.client.get(url, {'stock': 'out'}).data['products']
+        self.assertTrue(any('HAVING' in query['sql'] for query in queries))
+        self.assertEqual([row['id'] for row in out], [empty.pk])
+        low_ids = {row['id'] for row in self.client.get(url, {'stock': 'low'}).data['products']}
+        self.assertEqual(low_ids, {empty.pk, low.pk})
+        Product.objects.filter(pk=low.pk).update(is_active=False)
+        inactive = self.client.get(url, {'status': 'inactive', 'stock': 'low'}).data['products']
+        self.assertEqual([row['id'] for row in inactive], [low.pk])
+
+    def test_products_manage_pages_by_cursor(self):
+        self.client.force_authenticate(self.vendor.user)
+        url = reverse('vendor-products-manage') + '?page_size=4'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            seen += [row['id'] for row in response.data['products']]
+            url = response.data['next']
+        self.assertEqual(seen, list(Product.objects.filter(vendor=self.vendor)
+                                    .order_by('-created_at', '-id').values_list('id', flat=True)))
+
+    def test_low_stock(self):
+        product = Product.objects.filter(vendor=self.vendor).first()
+        product.variants.update(stock=2)
+        refresh_low_stock([self.vendor.pk])
+        response = self.assertQueryBudget(1, 'get', 'vendor-low-stock', user=self.vendor.user,
+                                          expected_status=200)
+        self.assertEqual(
+            {(row['variant_id'], row['product_id'], row['stock'], row['threshold']) for row in response.data['alerts']},
+            {(pk, product.pk, 2, 10) for pk in product.variants.values_list('pk', flat=True)},
+        )
+
+    def test_low_stock_thresholds(self):
+        variant = Product.objects.filter(vendor=self.vendor).first().variants.first()
+        other = Product.objects.exclude(vendor=self.vendor).first().variants.first()
+        self.client.force_authenticate(self.vendor.user)
+        url = reverse('vendor-variant-threshold', args=[variant.pk])
+        response = self.client.patch(url, {'low_stock_threshold': variant.stock + 1}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['variant_id'] for row in self.client.get(reverse('vendor-low-stock')).data['alerts']],
+                         [variant.pk])
+        self.client.patch(url, {'low_stock_threshold': None}, format='json')
+        self.assertEqual(self.client.get(reverse('vendor-low-stock')).data['alerts'], [])
+        response = self.client.patch(reverse('vendor-variant-threshold', args=[other.pk]),
+                                     {'low_stock_threshold': 5}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+        # Raising the vendor's threshold re-checks its whole catalogue
+        stock = Product.objects.filter(vendor=self.vendor).values_list('variants__stock', flat=True)
+        response = self.client.patch(reverse('vendor-profile-manage'),
+                                     {'low_stock_threshold': max(stock) + 1}, format='json')
+        self.assertEqual(response.status_code, 200)
+        alerts = self.client.get(reverse('vendor-low-stock') + '?page_size=200').data['alerts']
+        self.assertEqual(len(alerts), len(stock))
+
+    def test_orders_manage(self):
+        # The page, plus the archive once the hot rows run out
+        self.assertQueryBudget(2, 'get', 'vendor-orders-manage', user=self.vendor.user,
+                               expected_status=200)
+
+    def test_orders_manage_full_recent_page(self):
+        self.assertQueryBudget(1, 'get', 'vendor-orders-manage', user=self.vendor.user,
+                               data={'page_size': 2}, expected_status=200)
+
+    def test_orders_manage_pages_by_cursor(self):
+        self.client.force_authenticate(self.vendor.user)
+        url = reverse('vendor-orders-manage') + '?page_size=2'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertLessEqual(len(response.data['orders']), 2)
+            seen += [row['order_id'] for row in response.data['orders']]
+            url = response.data['next']
+        orders = Order.objects.filter(vendor=self.vendor).order_by('-created_at', '-id')
+        self.assertEqual(seen, [str(order_id) for order_id in orders.values_list('order_id', flat=True)])
+        first = orders.annotate(items_count=Count('items')).first()
+        row = self.client.get(reverse('vendor-orders-manage')).data['orders'][0]
+        self.assertEqual((row['items_count'], row['customer_email']), (first.items_count, first.customer.email))
+
+    def test_orders_manage_streams_ndjson(self):
+        self.client.force_authenticate(self.vendor.user)
+        response = self.client.get(reverse('vendor-orders-manage'), {'stream': 'ndjson', 'status': 'all'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), Order.objects.filter(vendor=self.vendor).count())
+        self.assertIn('items_count', rows[0])
+
+    def test_orders_update_status(self):
+        order_ids = list(
+            Order.objects.filter(vendor=self.vendor).values_list('id', flat=True)
+        )
+        self.assertQueryBudget(8, 'patch', 'vendor-orders-update-status', user=self.vendor.user,
+                               data={'order_ids': order_ids, 'status': 'shipped'},
+                               expected_status=200)
+
+
+    def test_orders_update_status_reports_each_order(self):
+        orders = list(Order.objects.filter(vendor=self.vendor).order_by('pk')[:3])
+        Order.objects.filter(pk=orders[0].pk).update(status='processing')
+        Order.objects.filter(pk=orders[1].pk).update(status='delivered')
+        other_vendor_order = Order.objects.exclude(vendor=self.vendor).first()
+        self.client.force_authenticate(self.vendor.user)
+        response = self.client.patch(reverse('vendor-orders-update-status'), {
+            'order_ids': [orders[0].pk, orders[1].pk, other_vendor_order.pk],
+            'status': 'shipped', 'tracking_number': 'TRK-1',
+        }, format='json')
+        self.assertEqual(response.data['updated_count'], 1)
+        self.assertEqual({row['id']: row['outcome'] for row in response.data['results']}, {
+            orders[0].pk: 'updated', orders[1].pk: 'invalid_transition', other_vendor_order.pk: 'not_found',
+        })
+        orders[0].refresh_from_db()
+        self.assertEqual((orders[0].status, orders[0].tracking_number), ('shipped', 'TRK-1'))
+        event = OrderStatusEvent.objects.get()
+        self.assertEqual((event.order_id, event.from_status, event.to_status, event.actor),
+                         (orders[0].pk, 'processing', 'shipped', self.vendor.user))
+
+
+class VendorTimeseriesTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = make_vendor()
+        customer = make_user()
+        cls.chairs, cls.tables = make_category(), make_category()
+        cls.chair = make_product(cls.vendor, cls.chairs, variants=1).variants.get()
+        cls.table = make_product(cls.vendor, cls.tables, variants=1).variants.get()
+        # Monday 2 June (a chair and a table), Sunday 8 June (two chairs), 2 July (a table)
+        for day, variants, quantity in [(date(2025, 6, 2), [cls.chair, cls.table], 1),
+                                        (date(2025, 6, 8), [cls.chair], 2),
+                                        (date(2025, 7, 2), [cls.table], 1)]:
+            order = make_order(customer, cls.vendor, variants, quantity=quantity)
+            Order.objects.filter(pk=order.pk).update(
+                created_at=timezone.make_aware(datetime.combine(day, time(12)))
+            )
+        rebuild_daily_sales([cls.vendor.pk])
+
+    def series(self, **params):
+        self.client.force_authenticate(self.vendor.user)
+        response = self.client.get(reverse('vendor-analytics-timeseries'), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [(row['period'], row['orders'], row['units'], row['revenue']) for row in response.data['series']]
+
+    def test_days_are_zero_filled(self):
+        series = self.series(date_from='2025-06-01', date_to='2025-06-10')
+        self.assertEqual(len(series), 10)
+        self.assertEqual(series[:2], [('2025-06-01', 0, 0, 0.0), ('2025-06-02', 1, 2, 200.0)])
+        self.assertEqual(series[7], ('2025-06-08', 1, 2, 200.0))
+
+    def test_weeks_and_months(self):
+        self.assertEqual(self.series(granularity='week', date_from='2025-06-02', date_to='2025-06-15'),
+                         [('2025-06-02', 2, 4, 400.0), ('2025-06-09', 0, 0, 0.0)])
+        self.assertEqual(self.series(granularity='month', date_from='2025-05-20', date_to='2025-07-31'),
+                         [('2025-05-01', 0, 0, 0.0), ('2025-06-01', 2, 4, 400.0), ('2025-07-01', 1, 1, 100.0)])
+
+    def test_product_and_category_filters(self):
+        product = self.chair.product_id
+        self.assertEqual(self.series(granularity='month', date_from='2025-06-01', date_to='2025-07-31',
+                                     product=product),
+                         [('2025-06-01', 2, 3, 300.0), ('2025-07-01', 0, 0, 0.0)])
+        self.assertEqual(self.series(granularity='month', date_from='2025-06-01', date_to='2025-07-31',
+                                     category=self.tables.pk),
+                         [('2025-06-01', 1, 1, 100.0), ('2025-07-01', 1, 1, 100.0)])
+
+    def test_csv_export(self):
+        self.client.force_authenticate(self.vendor.user)
+        response = self.client.get(reverse('vendor-analytics-timeseries'), {
+            'granularity': 'week', 'date_from': '2025-06-02', 'date_to': '2025-06-08', 'export': 'csv',
+        })
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(StringIO(response.content.decode())))
+        self.assertEqual(rows, [{'period': '2025-06-02', 'orders': '2', 'units': '4', 'revenue': '400.0'}])
+
+    def test_invalid_queries(self):
+        self.client.force_authenticate(self.vendor.user)
+        url = reverse('vendor-analytics-timeseries')
+        for params in ({'granularity': 'hour'}, {'date_from': '2025-06-02', 'date_to': '2025-06-01'},
+                       {'date_from': '2020-01-01', 'date_to': '2025-01-01'},
+                       {'product': self.chair.product_id, 'category': self.chairs.pk}):
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
+        other = make_product(make_vendor(), self.chairs)
+        self.assertEqual(self.client.get(url, {'product': other.pk}).status_code, 404)
+
+    def test_query_budget(self):
+        params = '?granularity=week&date_from=2025-01-01&date_to=2025-12-31'
+        url = reverse('vendor-analytics-timeseries') + params
+        self.assertQueryBudget(2, 'get', url, user=self.vendor.user, expected_status=200)
+        self.assertQueryBudget(1, 'get', url, user=self.vendor.user, expected_status=200)
+
+
+class PopulateFurnitureVendorsTests(TestCase):
+    def test_generates_deterministic_dataset(self):
+        call_command('populate_furniture_vendors', vendors=2, products_per_vendor=3, customers=4,
+                     workers=1, seed=7, stdout=StringIO())
+        self.assertEqual(VendorProfile.objects.filter(is_approved=True).count(), 2)
+        self.assertEqual(Product.objects.count(), 6)
+        # Prices are a pure function of the seed and the product's position
+        plan = DatasetPlan(vendors=2, products_per_vendor=3, customers=4, seed=7)
+        prices = list(Product.objects.order_by('id').values_list('base_price', flat=True))
+        self.assertEqual(prices, [plan.base_price(p) for p in range(6)])
 
-# Create your tests here.
+    def test_rerunning_a_seed_is_reported(self):
+        options = dict(vendors=1, products_per_vendor=1, customers=1, workers=1, seed=3, stdout=StringIO())
+        call_command('populate_furniture_vendors', **options)
+        with self.assertRaises(CommandError):
+            call_command('populate_furniture_vendors', **options)
@@ -0,0 +1,78 @@
+# apps/vendors/timeseries.py
+"""
+Vendor sales over time, per day, week or month.
+
+The figures come from the daily rollups (apps/orders/sales.py): one query
+fetches the days with sales in the range, for the whole shop from
+VendorDailySales or for one product or category from ProductDailySales.
+NumPy then zero-fills the range and sums the days into buckets, so the cost
+is one query plus array work over the days in the range, whatever the
+granularity. Responses are cached per vendor until its analytics are next
+invalidated (see apps/vendors/analytics.py).
+"""
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.orders.models import ProductDailySales, VendorDailySales
+from .analytics import analytics_generation
+
+GRANULARITIES = ('day', 'week', 'month')
+METRICS = ('orders', 'units', 'revenue')
+
+
+def daily_rows(vendor_id, date_from, date_to, product=None, category=None):
+    """(day, orders, units, revenue) for each day in the range with sales."""
+    if product is None and category is None:
+        rows = VendorDailySales.objects.filter(vendor_id=vendor_id)
+        revenue = 'gross_revenue'
+    else:
+        rows = ProductDailySales.objects.filter(vendor_id=vendor_id)
+        rows = rows.filter(product_id=product) if product is not None else rows.filter(product__category_id=category)
+        revenue = 'revenue'
+    return rows.filter(day__gte=date_from, day__lte=date_to).values_list('day', 'orders', 'units', revenue)
+
+
+def bucket_starts(days, granularity):
+    """The first day of the bucket each of ``days`` (datetime64[D]) falls in; weeks start on Monday."""
+    if granularity == 'week':
+        # Day 0 of datetime64 is a Thursday
+        return days - (days.astype('int64') + 3) % 7
+    if granularity == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    return days
+
+
+def resample(rows, date_from, date_to, granularity):
+    """
+    Sum daily ``rows`` into buckets covering date_from..date_to, with zeros
+    for buckets without sales. The first and last buckets may be partial.
+    """
+    start = np.datetime64(date_from, 'D')
+    days = np.arange(start, np.datetime64(date_to, 'D') + 1)
+    daily = np.zeros((len(METRICS), len(days)))
+    if rows:
+        day, *values = zip(*rows)
+        index = (np.array(day, dtype='datetime64[D]') - start).astype('int64')
+        for metric, column in enumerate(values):
+            daily[metric] = np.bincount(index, weights=np.array(column, dtype=float), minlength=len(days))
+    periods, bucket = np.unique(bucket_starts(days, granularity), return_inverse=True)
+    totals = [np.bincount(bucket, weights=series, minlength=len(periods)) for series in daily]
+    return [
+        {'period': str(period), 'orders': int(orders), 'units': int(units), 'revenue': round(float(revenue), 2)}
+        for period, orders, units, revenue in zip(periods, *totals)
+    ]
+
+
+def vendor_timeseries(vendor_id, granularity, date_from, date_to, product=None, category=None):
+    """The resampled series, from cache when the vendor's figures have not changed since."""
+    key = ':'.join(str(part) for part in (
+        'vendor-timeseries', vendor_id, analytics_generation(vendor_id),
+        granularity, date_from, date_to, product, category,
+    ))
+    series = cache.get(key)
+    if series is None:
+        rows = list(daily_rows(vendor_id, date_from, date_to, product=product, category=category))
+        series = resample(rows, date_from, date_to, granularity)
+        cache.set(key, series, settings.VENDOR_ANALYTICS_TTL)
+    return series
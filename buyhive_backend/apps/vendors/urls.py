@@ -6,9 +6,12 @@ from .views import (
     VendorStatusView,  # [UPDATED] Added new view
     PublicVendorListView,
     VendorAnalyticsView,
+    VendorAnalyticsTimeseriesView,
     VendorProductManagementView,
     VendorOrderManagementView,
     VendorOrderStatusUpdateView,
+    VendorLowStockView,
+    VendorVariantThresholdView,
 )
 
 urlpatterns = [
@@ -17,7 +20,10 @@ urlpatterns = [
     path('profile/', VendorProfileManageView.as_view(), name='vendor-profile-manage'),
     path('public/', PublicVendorListView.as_view(), name='public-vendor-list'),
     path('analytics/', VendorAnalyticsView.as_view(), name='vendor-analytics'),
+    path('analytics/timeseries/', VendorAnalyticsTimeseriesView.as_view(), name='vendor-analytics-timeseries'),
     path('products/manage/', VendorProductManagementView.as_view(), name='vendor-products-manage'),
+    path('low-stock/', VendorLowStockView.as_view(), name='vendor-low-stock'),
+    path('low-stock/variants/<int:pk>/', VendorVariantThresholdView.as_view(), name='vendor-variant-threshold'),
     path('orders/manage/', VendorOrderManagementView.as_view(), name='vendor-orders-manage'),
     path('orders/update-status/', VendorOrderStatusUpdateView.as_view(),name='vendor-orders-update-status'),
 ]
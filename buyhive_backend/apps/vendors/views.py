@@ -1,15 +1,29 @@
 # apps/vendors/views.py
+import csv
+import json
 from rest_framework import generics, permissions, serializers, status  # [UPDATED] Added status
 from rest_framework.response import Response
 from django.utils.translation import gettext_lazy as _
 from .models import VendorProfile
-from .serializers import VendorApplicationSerializer, VendorProfileSerializer, PublicVendorSerializer  
+from .serializers import (
+    VendorApplicationSerializer, VendorProfileSerializer, PublicVendorSerializer, TimeseriesQuerySerializer,
+    VariantThresholdSerializer,
+)
 from .permissions import IsApprovedVendor
-from django.db.models import Count, Sum, Q
-from django.utils import timezone
-from datetime import timedelta
-from apps.products.models import Product
-from apps.orders.models import Order
+from .pagination import LowStockCursorPagination, VendorOrderCursorPagination, VendorProductCursorPagination
+from .analytics import invalidate_analytics, vendor_analytics
+from .timeseries import METRICS, vendor_timeseries
+from django.db import transaction
+from django.db.models import Avg, Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+from apps.products.alerts import open_alerts, refresh_low_stock
+from apps.products.models import ProductImage, ProductReview, ProductVariant, StockShard
+from apps.orders.archive import OrderHistory, reaches_archive
+from apps.orders.filters import OrderFilterSet
+from apps.orders.transitions import UPDATED, transition_orders
+from django_filters.utils import translate_validation
 class VendorApplyView(generics.CreateAPIView):
     queryset = VendorProfile.objects.all()
     serializer_class = VendorApplicationSerializer
@@ -45,6 +59,17 @@ class VendorProfileManageView(generics.RetrieveUpdateAPIView):
     
     def get_object(self):
         return self.request.user.vendor_profile
+    
+    def perform_update(self, serializer):
+        # [UPDATED] A new low-stock threshold changes which variants are low
+        previous_threshold = serializer.instance.low_stock_threshold
+        if serializer.validated_data.get('low_stock_threshold', previous_threshold) == previous_threshold:
+            serializer.save()
+            return
+        with transaction.atomic():
+            vendor = serializer.save()
+            refresh_low_stock([vendor.pk])
+            invalidate_analytics(vendor.pk)
 
 class VendorStatusView(generics.RetrieveAPIView):  # [UPDATED] Added new view for checking application status
     """View for users to check their vendor application status"""
@@ -69,7 +94,7 @@ class VendorStatusView(generics.RetrieveAPIView):  # [UPDATED] Added new view fo
         return Response(serializer.data)
 
 class PublicVendorListView(generics.ListAPIView):
-    queryset = VendorProfile.objects.filter(is_approved=True)
+    queryset = VendorProfile.objects.filter(is_approved=True).select_related('user')  # [UPDATED] Names come from the user
     serializer_class = PublicVendorSerializer  # [UPDATED] Use separate public serializer
     permission_classes = [permissions.AllowAny]
     
@@ -87,216 +112,201 @@ class VendorAnalyticsView(generics.RetrieveAPIView):
     permission_classes = [IsApprovedVendor]
     
     def get(self, request, *args, **kwargs):
+        # [UPDATED] Conditional aggregates, cached per vendor (see apps.vendors.analytics)
+        return Response(vendor_analytics(request.user.vendor_profile))
+
+
+class VendorAnalyticsTimeseriesView(generics.GenericAPIView):
+    """
+    Orders, units and revenue per day, week or month over a date range, for
+    the whole shop or one product or category (see apps.vendors.timeseries).
+    Pass ?export=csv for a CSV download.
+    """
+    permission_classes = [IsApprovedVendor]
+    serializer_class = TimeseriesQuerySerializer
+    
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
         vendor = request.user.vendor_profile
-        
-        # Get date ranges
-        today = timezone.now().date()
-        last_30_days = today - timedelta(days=30)
-        
-        # Product statistics
-        total_products = vendor.products.count()
-        active_products = vendor.products.filter(is_active=True).count()
-        featured_products = vendor.products.filter(featured=True).count()
-        
-        # Order statistics
-        total_orders = vendor.vendor_orders.count()
-        pending_orders = vendor.vendor_orders.filter(status='pending').count()
-        processing_orders = vendor.vendor_orders.filter(status='processing').count()
-        shipped_orders = vendor.vendor_orders.filter(status='shipped').count()
-        delivered_orders = vendor.vendor_orders.filter(status='delivered').count()
-        
-        # Revenue calculations
-        total_revenue = vendor.vendor_orders.filter(
-            payment_status='completed'
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        monthly_revenue = vendor.vendor_orders.filter(
-            payment_status='completed',
-            created_at__date__gte=last_30_days
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        # Recent orders (last 30 days)
-        recent_orders = vendor.vendor_orders.filter(
-            created_at__date__gte=last_30_days
-        ).count()
-        
-        # Low stock products (stock < 10)
-        low_stock_products = []
-        for product in vendor.products.filter(is_active=True):
-            if product.variants.exists():
-                low_stock_variants = product.variants.filter(stock__lt=10, is_active=True)
-                if low_stock_variants.exists():
-                    low_stock_products.append({
-                        'product_title': product.title,
-                        'product_id': product.id,
-                        'variants': [
-                            {
-                                'name': variant.name,
-                                'stock': variant.stock
-                            } for variant in low_stock_variants
-                        ]
-                    })
-        
-        # Top selling products (by order items)
-        from apps.orders.models import OrderItem
-        top_products = OrderItem.objects.filter(
-            order__vendor=vendor,
-            order__created_at__date__gte=last_30_days
-        ).values('product__title', 'product__id').annotate(
-            total_sold=Sum('quantity')
-        ).order_by('-total_sold')[:5]
-        
-        analytics_data = {
-            'products': {
-                'total': total_products,
-                'active': active_products,
-                'featured': featured_products,
-                'low_stock_count': len(low_stock_products),
-                'low_stock_items': low_stock_products[:10]  # Limit to 10 items
-            },
-            'orders': {
-                'total': total_orders,
-                'pending': pending_orders,
-                'processing': processing_orders,
-                'shipped': shipped_orders,
-                'delivered': delivered_orders,
-                'recent_30_days': recent_orders
-            },
-            'revenue': {
-                'total': float(total_revenue),
-                'monthly': float(monthly_revenue)
-            },
-            'top_products': list(top_products),
-            'business_info': {
-                'business_name': vendor.business_name,
-                'member_since': vendor.created_at.date(),
-                'status': 'approved'
-            }
-        }
-        
-        return Response(analytics_data)
+        if 'product' in params and not vendor.products.filter(pk=params['product']).exists():
+            return Response({'detail': _('Product not found.')}, status=status.HTTP_404_NOT_FOUND)
+        series = vendor_timeseries(vendor.pk, params['granularity'], params['date_from'], params['date_to'],
+                                   product=params.get('product'), category=params.get('category'))
+        if request.query_params.get('export') == 'csv':
+            response = HttpResponse(content_type='text/csv')
+            response['Content-Disposition'] = (
+                f'attachment; filename="sales-{params["granularity"]}-{params["date_from"]}-{params["date_to"]}.csv"'
+            )
+            writer = csv.DictWriter(response, fieldnames=['period', *METRICS])
+            writer.writeheader()
+            writer.writerows(series)
+            return response
+        return Response({
+            'granularity': params['granularity'],
+            'date_from': params['date_from'],
+            'date_to': params['date_to'],
+            'product': params.get('product'),
+            'category': params.get('category'),
+            'series': series,
+        })
 
 # ADD THIS NEW VIEW to vendors/views.py
 class VendorProductManagementView(generics.ListAPIView):
     """
-    Enhanced product management for vendors
+    Enhanced product management for vendors.
+    [UPDATED] Total stock and variant count are annotations over the variants
+    join, so the stock filter is a HAVING clause; image and review figures are
+    grouped queries over just the page. Cursor-paginated like the order listing.
     """
     permission_classes = [IsApprovedVendor]
+    pagination_class = VendorProductCursorPagination
+    row_fields = ('id', 'title', 'base_price', 'is_active', 'featured', 'created_at', 'updated_at')
     
     def get_queryset(self):
-        return self.request.user.vendor_profile.products.all().select_related('category').prefetch_related('variants', 'images')
-    
-    def get(self, request, *args, **kwargs):
-        vendor = request.user.vendor_profile
+        status_filter = self.request.query_params.get('status', 'all')  # all, active, inactive
+        stock_filter = self.request.query_params.get('stock', 'all')    # all, low, out
         
-        # Get filter parameters
-        status_filter = request.query_params.get('status', 'all')  # all, active, inactive
-        stock_filter = request.query_params.get('stock', 'all')    # all, low, out
-        
-        queryset = self.get_queryset()
-        
-        # Apply filters
+        queryset = self.request.user.vendor_profile.products.all()
         if status_filter == 'active':
             queryset = queryset.filter(is_active=True)
         elif status_filter == 'inactive':
             queryset = queryset.filter(is_active=False)
-            
-        products_data = []
-        for product in queryset:
-            # Calculate total stock across variants
-            total_stock = 0
-            if product.variants.exists():
-                total_stock = sum(variant.stock for variant in product.variants.filter(is_active=True))
-            
-            # Apply stock filter
-            if stock_filter == 'low' and total_stock >= 10:
-                continue
-            elif stock_filter == 'out' and total_stock > 0:
-                continue
-                
-            product_data = {
-                'id': product.id,
-                'title': product.title,
-                'base_price': float(product.base_price),
-                'is_active': product.is_active,
-                'featured': product.featured,
-                'category': product.category.name,
-                'total_stock': total_stock,
-                'variants_count': product.variants.count(),
-                'images_count': product.images.count(),
-                'average_rating': product.average_rating,
-                'review_count': product.review_count,
-                'created_at': product.created_at,
-                'updated_at': product.updated_at
-            }
-            products_data.append(product_data)
         
-        return Response({
-            'count': len(products_data),
-            'products': products_data
-        })
+        # Sharded variants' rows are only snapshots; their stock is summed over the shards
+        shards = StockShard.objects.filter(
+            variant__product=OuterRef('pk'), variant__is_active=True, variant__shard_count__gt=0
+        ).values('variant__product')
+        queryset = queryset.annotate(
+            total_stock=(
+                Coalesce(Sum('variants__stock', filter=Q(variants__is_active=True, variants__shard_count=0)), 0)
+                + Coalesce(Subquery(shards.annotate(total=Sum('stock')).values('total')), 0)
+            ),
+            variants_count=Count('variants'),
+        )
+        if stock_filter == 'low':
+            queryset = queryset.filter(total_stock__lt=self.request.user.vendor_profile.low_stock_threshold)
+        elif stock_filter == 'out':
+            queryset = queryset.filter(total_stock=0)
+        return queryset.values(*self.row_fields, 'category__name', 'total_stock', 'variants_count')
+    
+    def get(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        ids = [row['id'] for row in page]
+        images = dict(
+            ProductImage.objects.filter(product_id__in=ids).order_by()
+            .values('product').annotate(count=Count('pk')).values_list('product', 'count')
+        )
+        reviews = {
+            product: (count, average)
+            for product, count, average in ProductReview.objects.filter(product_id__in=ids, is_approved=True)
+            .order_by().values('product').annotate(count=Count('pk'), average=Avg('rating'))
+            .values_list('product', 'count', 'average')
+        }
+        return self.get_paginated_response([product_row(row, images, reviews) for row in page])
+
+def product_row(row, images, reviews):
+    review_count, average_rating = reviews.get(row['id'], (0, None))
+    row['category'] = row.pop('category__name')
+    row['base_price'] = float(row['base_price'])
+    row['images_count'] = images.get(row['id'], 0)
+    row['review_count'] = review_count
+    # Same rounding as Product.average_rating
+    row['average_rating'] = round(average_rating, 1) if average_rating is not None else 0
+    return row
+
+class VendorLowStockView(generics.ListAPIView):
+    """
+    [UPDATED] The vendor's open low-stock alerts on active variants, emptiest
+    first. Reads the maintained alert rows, so the cost follows the number of
+    alerts, not the size of the catalogue.
+    """
+    permission_classes = [IsApprovedVendor]
+    pagination_class = LowStockCursorPagination
+    
+    def get_queryset(self):
+        return open_alerts().filter(
+            vendor=self.request.user.vendor_profile, variant__is_active=True, variant__product__is_active=True
+        ).values(
+            'id', 'stock', 'threshold', 'created_at', 'variant_id',
+            'variant__name', 'variant__sku', 'variant__product_id', 'variant__product__title',
+        )
+    
+    def get(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response([alert_row(row) for row in page])
+
+def alert_row(row):
+    row['since'] = row.pop('created_at')
+    row['variant_name'] = row.pop('variant__name')
+    row['sku'] = row.pop('variant__sku')
+    row['product_id'] = row.pop('variant__product_id')
+    row['product_title'] = row.pop('variant__product__title')
+    return row
+
+class VendorVariantThresholdView(generics.RetrieveUpdateAPIView):
+    """[UPDATED] Set or clear (null) one variant's low-stock threshold; its alert follows on save."""
+    serializer_class = VariantThresholdSerializer
+    permission_classes = [IsApprovedVendor]
+    
+    def get_queryset(self):
+        return ProductVariant.objects.with_shard_totals().filter(product__vendor=self.request.user.vendor_profile)
+    
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
 
 # ADD THIS NEW VIEW to vendors/views.py  
 class VendorOrderManagementView(generics.ListAPIView):
     """
-    Enhanced order management for vendors with filtering
+    Enhanced order management for vendors with filtering.
+    [UPDATED] Cursor-paginated rows built from .values(); pass ?stream=ndjson
+    to stream every matching order as newline-delimited JSON instead. Archived
+    orders are included once the date range and the page reach back to them.
     """
     permission_classes = [IsApprovedVendor]
+    pagination_class = VendorOrderCursorPagination
+    row_fields = (
+        'id', 'order_id', 'total_amount', 'status', 'payment_status', 'tracking_number',
+        'estimated_delivery', 'created_at', 'updated_at',
+    )
+    
+    def get_queryset(self):
+        # [UPDATED] Status and half-open date range filters shared with the order endpoints
+        vendor = self.request.user.vendor_profile
+        filterset = OrderFilterSet(self.request.query_params, queryset=vendor.vendor_orders.all())
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        orders = filterset.qs.annotate(items_count=Count('items')).values(
+            *self.row_fields, 'items_count', customer_email=F('customer__email')
+        )
+        if not reaches_archive(filterset.created_from):
+            return orders
+        archived = OrderFilterSet(self.request.query_params, queryset=vendor.archived_orders.all()).qs.values(
+            *self.row_fields, 'items_data', customer_email=F('customer__email')
+        )
+        return OrderHistory(orders, archived)
     
     def get(self, request, *args, **kwargs):
-        vendor = request.user.vendor_profile
-        
-        # Get filter parameters
-        status_filter = request.query_params.get('status', 'all')
-        date_from = request.query_params.get('date_from')
-        date_to = request.query_params.get('date_to')
-        
-        queryset = vendor.vendor_orders.all().select_related('customer').prefetch_related('items')
-        
-        # Apply status filter
-        if status_filter != 'all':
-            queryset = queryset.filter(status=status_filter)
-        
-        # Apply date filters
-        if date_from:
-            try:
-                from datetime import datetime
-                date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-                queryset = queryset.filter(created_at__date__gte=date_from_obj)
-            except ValueError:
-                pass
-                
-        if date_to:
-            try:
-                from datetime import datetime
-                date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-                queryset = queryset.filter(created_at__date__lte=date_to_obj)
-            except ValueError:
-                pass
-        
-        orders_data = []
-        for order in queryset.order_by('-created_at'):
-            order_data = {
-                'id': order.id,
-                'order_id': str(order.order_id),
-                'customer_email': order.customer.email,
-                'total_amount': float(order.total_amount),
-                'status': order.status,
-                'payment_status': order.payment_status,
-                'tracking_number': order.tracking_number,
-                'estimated_delivery': order.estimated_delivery,
-                'created_at': order.created_at,
-                'updated_at': order.updated_at,
-                'items_count': order.items.count(),
-                'can_be_cancelled': order.can_be_cancelled,
-                'is_completed': order.is_completed
-            }
-            orders_data.append(order_data)
-        
-        return Response({
-            'count': len(orders_data),
-            'orders': orders_data
-        })
+        queryset = self.get_queryset()
+        if request.query_params.get('stream') == 'ndjson':
+            rows = queryset.order_by(*self.pagination_class.ordering).iterator(chunk_size=2000)
+            return StreamingHttpResponse(
+                (json.dumps(order_row(row), cls=DjangoJSONEncoder) + '\n' for row in rows),
+                content_type='application/x-ndjson',
+            )
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response([order_row(row) for row in page])
+
+def order_row(row):
+    if 'items_data' in row:  # An archived order keeps its items as a snapshot
+        row['items_count'] = len(row.pop('items_data'))
+    row['order_id'] = str(row['order_id'])
+    row['total_amount'] = float(row['total_amount'])
+    row['can_be_cancelled'] = row['status'] in ('pending', 'processing')  # Same rules as Order.can_be_cancelled
+    row['is_completed'] = row['status'] == 'delivered'
+    return row
 
 # ADD THIS NEW VIEW to vendors/views.py
 class VendorOrderStatusUpdateView(generics.UpdateAPIView):
@@ -325,34 +335,24 @@ class VendorOrderStatusUpdateView(generics.UpdateAPIView):
                 'error': f'Invalid status. Must be one of: {valid_statuses}'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Update orders
-        orders = vendor.vendor_orders.filter(id__in=order_ids)
-        updated_count = 0
+        try:
+            order_ids = [int(order_id) for order_id in order_ids]
+        except (TypeError, ValueError):
+            return Response({
+                'error': 'order_ids must be a list of order ids'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        for order in orders:
-            # Validate status transition
-            if self._can_update_status(order.status, new_status):
-                order.status = new_status
-                if tracking_number:
-                    order.tracking_number = tracking_number
-                if estimated_delivery:
-                    order.estimated_delivery = estimated_delivery
-                order.save()
-                updated_count += 1
+        # [UPDATED] One conditional UPDATE for every order, plus one insert of status events
+        fields = {}
+        if tracking_number:
+            fields['tracking_number'] = tracking_number
+        if estimated_delivery:
+            fields['estimated_delivery'] = estimated_delivery
+        outcomes = transition_orders(vendor, order_ids, new_status, actor=request.user, **fields)
+        updated_count = sum(outcome == UPDATED for outcome in outcomes.values())
         
         return Response({
             'message': f'Updated {updated_count} orders',
-            'updated_count': updated_count
+            'updated_count': updated_count,
+            'results': [{'id': order_id, 'outcome': outcome} for order_id, outcome in sorted(outcomes.items())],
         })
-    
-    def _can_update_status(self, current_status, new_status):
-        """Validate status transitions"""
-        allowed_transitions = {
-            'pending': ['processing', 'cancelled'],
-            'processing': ['shipped', 'cancelled'],
-            'shipped': ['delivered'],
-            'delivered': [],  # Final status
-            'cancelled': [],  # Final status
-        }
-        
-        return new_status in allowed_transitions.get(current_status, [])
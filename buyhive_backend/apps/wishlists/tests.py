@@ -1,3 +1,25 @@
-from django.test import TestCase
+from apps.wishlists.models import Wishlist
+from buyhive_backend.testing import QueryBudgetTestCase, seed_marketplace
 
-# Create your tests here.
+
+class WishlistsQueryBudgetTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_marketplace()
+        cls.customer = cls.data['customers'][0]
+        wishlist = Wishlist.objects.create(user=cls.customer)
+        wishlist.products.add(*cls.data['products'][:20])
+
+    def test_wishlist(self):
+        self.assertQueryBudget(6, 'get', 'user-wishlist', user=self.customer, expected_status=200)
+
+    def test_toggle(self):
+        product = self.data['products'][-1]
+        self.assertQueryBudget(5, 'post', 'wishlist-toggle-product', args=[product.pk],
+                               user=self.customer, expected_status=200)
+        self.assertQueryBudget(5, 'post', 'wishlist-toggle-product', args=[product.pk],
+                               user=self.customer, expected_status=200)
+
+    def test_clear(self):
+        self.assertQueryBudget(1, 'delete', 'wishlist-clear', user=self.customer,
+                               expected_status=200)
@@ -2,6 +2,7 @@ from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db.models import Prefetch
 from django.utils.translation import gettext_lazy as _  # [UPDATED] Added translation support
 from .models import Wishlist
 from .serializers import WishlistSerializer
@@ -16,8 +17,10 @@ class WishlistView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_object(self):
-        # [UPDATED] Added prefetch_related for better performance
-        wishlist, created = Wishlist.objects.prefetch_related('products').get_or_create(user=self.request.user)
+        # [UPDATED] Load the products the way product listings do, so rows cost no queries of their own
+        wishlist, created = Wishlist.objects.prefetch_related(
+            Prefetch('products', queryset=Product.objects.for_listing())
+        ).get_or_create(user=self.request.user)
         return wishlist
 
 class WishlistToggleProductView(APIView):
@@ -0,0 +1,497 @@
+# buyhive_backend/datagen.py
+"""
+Deterministic, parallel synthetic data generator.
+
+Every row's primary key is a pure function of its index (plus an offset past
+the rows already in the table), and every attribute another phase needs to
+know about - a product's price, how many variants it has - is derived from a
+seeded hash of that index. Worker processes can therefore generate any slice
+of the dataset without reading what other workers wrote, and the same seed
+always produces the same data regardless of how many workers are used.
+
+Phases run in foreign-key order (categories, users, catalogue, customer
+activity); within a phase, slices are spread over a process pool and written
+with bulk_create in fixed-size batches. The vendors' daily sales rollup is
+built once at the end.
+"""
+import multiprocessing
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.text import slugify
+
+from apps.accounts.models import User, UserProfile, Address
+from apps.vendors.models import VendorProfile
+from apps.products.alerts import refresh_low_stock
+from apps.products.models import Category, InventoryMovement, LowStockAlert, Product, ProductVariant, ProductImage, ProductReview
+from apps.orders.models import Cart, CartItem, Order, OrderItem, VendorDailySales
+from apps.orders.sales import rebuild_daily_sales
+from apps.wishlists.models import Wishlist
+
+# --- Vocabulary ---
+BUSINESS_NAMES = [
+    "Cozy Home Furnishings", "Elegant Decor Studio", "Rustic Living Co",
+    "Modern Spaces", "Vintage Charm", "Urban Interiors",
+    "Luxury Lounge", "Classic Comfort", "Artisan Furniture",
+    "Trendy Tableware", "Comfort Creations", "Nature's Touch",
+    "Chic Spaces", "Eco Home Styles", "Fine Woodworks",
+    "Minimalist Designs", "Decor Delights", "The Fabric Loft",
+    "Urban Chic Home", "Handcrafted Living", "Dream Interiors",
+    "Contemporary Corner", "Boho Style Studio", "Industrial Edge",
+    "Scandinavian Simplicity",
+]
+FURNITURE_PRODUCTS = [
+    "Sofa", "Armchair", "Dining Table", "Coffee Table", "Bed Frame",
+    "Bookshelf", "Cabinet", "Desk", "Wardrobe", "Nightstand",
+    "TV Stand", "Recliner", "Ottoman", "Chest of Drawers", "Bench",
+    "Dining Chair", "Bar Stool", "Side Table", "Dresser", "Headboard",
+]
+DECOR_PRODUCTS = [
+    "Curtains", "Cushions", "Wall Art", "Area Rug", "Table Lamp",
+    "Floor Lamp", "Mirror", "Candles", "Picture Frame", "Wall Clock",
+    "Planter", "Throw Blanket", "Decorative Bowl", "Sculpture",
+    "Table Runner", "Pendant Light", "Chandelier", "Wall Sconce", "Vase",
+]
+MATERIALS = ["Wood", "Metal", "Fabric", "Leather", "Glass", "Ceramic", "Bamboo", "Rattan"]
+COLORS = ["Natural", "Black", "White", "Brown", "Gray", "Beige", "Navy", "Cream", "Charcoal", "Oak"]
+SIZES = ["Small", "Medium", "Large", "Extra Large"]
+STYLES = ["Modern", "Rustic", "Industrial", "Scandinavian", "Boho", "Minimalist", "Classic", "Contemporary"]
+FIRST_NAMES = ['Emma', 'James', 'Sophia', 'William', 'Olivia', 'Michael', 'Ava', 'David', 'Priya', 'Arjun']
+LAST_NAMES = ['Johnson', 'Smith', 'Brown', 'Davis', 'Miller', 'Wilson', 'Garcia', 'Anderson', 'Sharma']
+CITIES = [('Mumbai', 'MH'), ('Pune', 'MH'), ('Bengaluru', 'KA'), ('Delhi', 'DL'), ('Chennai', 'TN')]
+REVIEW_COMMENTS = [
+    "Exactly as described.", "Good value for money.", "Sturdy and well made.",
+    "Colour was slightly different.", "Arrived quickly, would buy again.",
+]
+# Category levels below the two roots are named by prefixing these words
+CATEGORY_LEVEL_WORDS = [FURNITURE_PRODUCTS + DECOR_PRODUCTS, STYLES, MATERIALS, COLORS]
+ROOT_CATEGORIES = {
+    'Furniture': 'High-quality furniture for every room in your home',
+    'Home Decor': 'Beautiful decorative items to enhance your living space',
+}
+
+MAX_CART_LINES = 4
+MAX_ORDER_LINES = 4
+_MASK = (1 << 64) - 1
+
+# Stream identifiers for the seeded hash
+_PRICE, _VARIANTS, _MODIFIER, _VENDOR, _CUSTOMER, _USER, _ORDER = range(7)
+
+
+def _splitmix(value):
+    value = (value + 0x9E3779B97F4A7C15) & _MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK
+    return value ^ (value >> 31)
+
+
+def _hash(seed, stream, index):
+    return _splitmix(_splitmix(seed * 64 + stream) ^ index)
+
+
+def _rng(seed, stream, index):
+    return random.Random(_hash(seed, stream, index))
+
+
+class DatasetPlan:
+    """Sizes, seed and id offsets shared (by pickling) with every worker."""
+
+    def __init__(self, vendors=15, products_per_vendor=40, customers=200, orders_per_customer=3,
+                 max_variants=3, max_images=2, max_reviews=5, category_depth=3, category_fanout=4,
+                 cart_ratio=0.3, wishlist_ratio=0.3, history_days=365, seed=42, batch_size=1000):
+        self.vendors = vendors
+        self.products_per_vendor = products_per_vendor
+        self.customers = customers
+        self.orders_per_customer = orders_per_customer
+        self.max_variants = max(1, max_variants)
+        self.max_images = max(0, max_images)
+        self.max_reviews = max(0, min(max_reviews, customers))
+        self.category_depth = max(1, category_depth)
+        self.category_fanout = max(1, category_fanout)
+        self.cart_ratio = cart_ratio
+        self.wishlist_ratio = wishlist_ratio
+        self.history_days = max(1, history_days)
+        self.seed = seed
+        self.batch_size = batch_size
+        # Orders per customer vary between 0 and twice the average
+        self.order_slots = 2 * orders_per_customer
+        self.offsets = {}
+        self.seed_in_names = False
+        self.leaf_categories = {}
+        self.passwords = {}
+        self.now = timezone.now()
+
+    @property
+    def products(self):
+        return self.vendors * self.products_per_vendor
+
+    # Ids: a fixed slot per entity so any worker can compute any reference
+    def vendor_user_id(self, v):
+        return self.offsets['user'] + v
+
+    def customer_user_id(self, c):
+        return self.offsets['user'] + self.vendors + c
+
+    def vendor_id(self, v):
+        return self.offsets['vendor'] + v
+
+    def product_id(self, p):
+        return self.offsets['product'] + p
+
+    def variant_id(self, p, k):
+        return self.offsets['variant'] + p * self.max_variants + k
+
+    def cart_id(self, c):
+        return self.offsets['cart'] + c
+
+    def order_id(self, c, k):
+        return self.offsets['order'] + c * self.order_slots + k
+
+    # Attributes other phases depend on
+    def variant_count(self, p):
+        return 1 + _hash(self.seed, _VARIANTS, p) % self.max_variants
+
+    def base_price(self, p):
+        cents = 1500 + _hash(self.seed, _PRICE, p) % 118500  # 15.00 - 1200.00
+        return Decimal(cents) / 100
+
+    def price_modifier(self, p, k):
+        if k == 0:
+            return Decimal('0.00')
+        return Decimal(_hash(self.seed, _MODIFIER, p * self.max_variants + k) % 10000) / 100
+
+
+# --- Helpers ---
+@contextmanager
+def manual_timestamps(*models):
+    """Let generated rows carry historical created_at/updated_at values."""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+TIMESTAMPED_MODELS = (
+    UserProfile, VendorProfile, Category, Product, ProductVariant, ProductImage,
+    ProductReview, Cart, CartItem, Order, Wishlist,
+)
+
+
+def _prepare_connection():
+    """Per-process connection tuning for a bulk load."""
+    if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+        # Workers queue for SQLite's single write lock instead of failing
+        connection.settings_dict['OPTIONS'] = {**connection.settings_dict['OPTIONS'], 'timeout': 600}
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=OFF')
+
+
+def _write(plan, rows_by_model):
+    """bulk_create every batch of a slice inside one transaction."""
+    with transaction.atomic():
+        for model, rows in rows_by_model:
+            if rows:
+                model.objects.bulk_create(rows, batch_size=plan.batch_size)
+    return {model._meta.label: len(rows) for model, rows in rows_by_model}
+
+
+def _ago(plan, rng, max_days=None):
+    seconds = rng.randrange(int((max_days or plan.history_days) * 86400))
+    return plan.now - timedelta(seconds=seconds)
+
+
+# --- Phase 1: categories (parent process, idempotent) ---
+def build_categories(plan):
+    for root_name, description in ROOT_CATEGORIES.items():
+        root, created = Category.objects.get_or_create(
+            name=root_name, defaults={'slug': slugify(root_name), 'description': description},
+        )
+        level = [root]
+        for depth in range(1, plan.category_depth):
+            words = CATEGORY_LEVEL_WORDS[(depth - 1) % len(CATEGORY_LEVEL_WORDS)]
+            next_level = []
+            for parent in level:
+                for word in words[:plan.category_fanout]:
+                    name = f"{word} {parent.name}" if depth > 1 else f"{root_name} {word}"
+                    child, created = Category.objects.get_or_create(
+                        name=name, defaults={'slug': slugify(name)[:255], 'parent': parent},
+                    )
+                    next_level.append(child)
+            level = next_level
+        plan.leaf_categories[root_name] = [category.id for category in level]
+
+
+# --- Phase 2: users ---
+def generate_users(plan, start, stop):
+    """Users with index < plan.vendors become vendors, the rest customers."""
+    users, profiles, addresses, vendor_profiles = [], [], [], []
+    for i in range(start, stop):
+        rng = _rng(plan.seed, _USER, i)
+        is_vendor = i < plan.vendors
+        joined = _ago(plan, rng, plan.history_days * 2)
+        if is_vendor:
+            user_id, email = plan.vendor_user_id(i), f'gen{plan.seed}-vendor{i + 1}@buyhive.com'
+        else:
+            c = i - plan.vendors
+            user_id, email = plan.customer_user_id(c), f'gen{plan.seed}-customer{c + 1}@buyhive.com'
+        users.append(User(
+            id=user_id, email=email, password=plan.passwords['vendor' if is_vendor else 'customer'],
+            first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+            is_vendor=is_vendor, is_active=True, date_joined=joined,
+        ))
+        profiles.append(UserProfile(user_id=user_id, created_at=joined, updated_at=joined))
+        if is_vendor:
+            name = BUSINESS_NAMES[i % len(BUSINESS_NAMES)]
+            if i >= len(BUSINESS_NAMES):
+                name += f" #{i // len(BUSINESS_NAMES) + 1}"
+            if plan.seed_in_names:
+                name += f" ({plan.seed})"
+            vendor_profiles.append(VendorProfile(
+                id=plan.vendor_id(i), user_id=user_id, business_name=name,
+                description=f"Specialising in {rng.choice(STYLES).lower()} furniture and home decor.",
+                is_approved=True, tax_id=f'FUR{rng.randint(100000, 999999)}',
+                created_at=joined, updated_at=joined,
+            ))
+        else:
+            city, state = rng.choice(CITIES)
+            addresses.append(Address(
+                user_id=user_id, street_address=f'{rng.randint(1, 999)} Market Road',
+                city=city, state=state, zip_code=f'{rng.randint(400000, 699999)}',
+                country='India', address_type='shipping', is_default=True,
+            ))
+    return _write(plan, [
+        (User, users), (UserProfile, profiles), (Address, addresses), (VendorProfile, vendor_profiles),
+    ])
+
+
+# --- Phase 3: catalogue ---
+def generate_catalogue(plan, start, stop):
+    """Products, variants, images and reviews for vendors [start, stop)."""
+    products, variants, images, reviews = [], [], [], []
+    roots = list(ROOT_CATEGORIES)
+    for v in range(start, stop):
+        rng = _rng(plan.seed, _VENDOR, v)
+        focus = rng.choice(roots)
+        for j in range(plan.products_per_vendor):
+            p = v * plan.products_per_vendor + j
+            root = focus if rng.random() < 0.7 else rng.choice(roots)
+            noun = rng.choice(FURNITURE_PRODUCTS if root == 'Furniture' else DECOR_PRODUCTS)
+            title = f"{rng.choice(STYLES)} {rng.choice(MATERIALS)} {noun}"
+            created = _ago(plan, rng)
+            product_id = plan.product_id(p)
+            products.append(Product(
+                id=product_id, vendor_id=plan.vendor_id(v),
+                category_id=rng.choice(plan.leaf_categories[root]),
+                title=title, slug=f"{slugify(title)}-g{plan.seed}-{p}",
+                description=f"{title} with a durable finish.",
+                base_price=plan.base_price(p), is_active=rng.random() > 0.05,
+                featured=rng.random() < 0.05, created_at=created, updated_at=created,
+            ))
+            for k in range(plan.variant_count(p)):
+                variants.append(ProductVariant(
+                    id=plan.variant_id(p, k), product_id=product_id,
+                    name=f"{rng.choice(COLORS)} {SIZES[k % len(SIZES)]}",
+                    sku=f"G{plan.seed}-{p}-{k}", price_modifier=plan.price_modifier(p, k),
+                    # A tail of low and zero stock so inventory screens have work to do
+                    stock=rng.choice([0, rng.randint(1, 9)]) if rng.random() < 0.1 else rng.randint(10, 500),
+                    is_active=True, created_at=created,
+                ))
+            for k in range(rng.randint(min(1, plan.max_images), plan.max_images)):
+                images.append(ProductImage(
+                    product_id=product_id, image=f'product_images/placeholder/{p % 100}.jpg',
+                    alt_text=f"Image for {title}", is_primary=(k == 0), created_at=created,
+                ))
+            for c in rng.sample(range(plan.customers), rng.randint(0, plan.max_reviews)):
+                reviewed = _ago(plan, rng)
+                reviews.append(ProductReview(
+                    product_id=product_id, user_id=plan.customer_user_id(c),
+                    rating=rng.choices([1, 2, 3, 4, 5], weights=[1, 1, 3, 6, 8])[0],
+                    comment=rng.choice(REVIEW_COMMENTS), created_at=reviewed, updated_at=reviewed,
+                ))
+    # Bulk inserts send no signals, so open each variant's ledger here
+    movements = [
+        InventoryMovement(variant_id=variant.id, delta=variant.stock, reason='initial', created_at=variant.created_at)
+        for variant in variants if variant.stock
+    ]
+    return _write(plan, [
+        (Product, products), (ProductVariant, variants), (InventoryMovement, movements),
+        (ProductImage, images), (ProductReview, reviews),
+    ])
+
+
+# --- Phase 4: customer activity ---
+def _pick_line(plan, rng, vendor=None):
+    v = rng.randrange(plan.vendors) if vendor is None else vendor
+    p = v * plan.products_per_vendor + rng.randrange(plan.products_per_vendor)
+    k = rng.randrange(plan.variant_count(p))
+    return v, p, k
+
+
+def _order_status(plan, rng, placed):
+    age_days = (plan.now - placed).days
+    if rng.random() < 0.05:
+        return 'cancelled'
+    if age_days > 14:
+        return 'delivered'
+    return rng.choice(['pending', 'processing', 'shipped', 'delivered'])
+
+
+def generate_activity(plan, start, stop):
+    """Carts, orders and wishlists for customers [start, stop)."""
+    carts, cart_items, orders, order_items = [], [], [], []
+    wishlists, wishlist_products = [], []
+    through = Wishlist.products.through
+    for c in range(start, stop):
+        rng = _rng(plan.seed, _CUSTOMER, c)
+        user_id = plan.customer_user_id(c)
+        if rng.random() < plan.cart_ratio:
+            updated = _ago(plan, rng, 14)
+            carts.append(Cart(id=plan.cart_id(c), user_id=user_id, created_at=updated, updated_at=updated))
+            lines = {_pick_line(plan, rng)[1:] for _ in range(rng.randint(1, MAX_CART_LINES))}
+            for p, k in lines:
+                cart_items.append(CartItem(
+                    cart_id=plan.cart_id(c), product_id=plan.product_id(p),
+                    variant_id=plan.variant_id(p, k), quantity=rng.randint(1, 3),
+                    created_at=updated, updated_at=updated,
+                ))
+        for k in range(rng.randint(0, plan.order_slots)):
+            placed = _ago(plan, rng)
+            vendor = rng.randrange(plan.vendors)
+            order_id = plan.order_id(c, k)
+            lines = {_pick_line(plan, rng, vendor)[1:] for _ in range(rng.randint(1, MAX_ORDER_LINES))}
+            total = Decimal('0.00')
+            for p, variant in lines:
+                quantity = rng.randint(1, 3)
+                price = plan.base_price(p) + plan.price_modifier(p, variant)
+                total += price * quantity
+                order_items.append(OrderItem(
+                    order_id=order_id, product_id=plan.product_id(p),
+                    variant_id=plan.variant_id(p, variant), quantity=quantity, price_at_purchase=price,
+                ))
+            status = _order_status(plan, rng, placed)
+            orders.append(Order(
+                id=order_id, customer_id=user_id, vendor_id=plan.vendor_id(vendor),
+                order_id=uuid.UUID(int=(_hash(plan.seed, _ORDER, order_id) << 64) | c, version=4),
+                total_amount=total, status=status,
+                shipping_address_text=f"{rng.randint(1, 999)} Market Road, {rng.choice(CITIES)[0]}, India",
+                payment_method='Mock Payment Gateway',
+                payment_status='refunded' if status == 'cancelled' else 'completed',
+                transaction_id=f"mock_txn_g{plan.seed}_{order_id}",
+                created_at=placed, updated_at=placed,
+            ))
+        if rng.random() < plan.wishlist_ratio:
+            updated = _ago(plan, rng, 90)
+            wishlists.append(Wishlist(id=plan.offsets['wishlist'] + c, user_id=user_id,
+                                      created_at=updated, updated_at=updated))
+            for p in {_pick_line(plan, rng)[1] for _ in range(rng.randint(1, 8))}:
+                wishlist_products.append(through(
+                    wishlist_id=plan.offsets['wishlist'] + c, product_id=plan.product_id(p),
+                ))
+    return _write(plan, [
+        (Cart, carts), (CartItem, cart_items), (Order, orders), (OrderItem, order_items),
+        (Wishlist, wishlists), (through, wishlist_products),
+    ])
+
+
+PHASES = [
+    ('users', generate_users, lambda plan: plan.vendors + plan.customers),
+    ('catalogue', generate_catalogue, lambda plan: plan.vendors),
+    ('activity', generate_activity, lambda plan: plan.customers),
+]
+PHASE_FUNCTIONS = {name: function for name, function, size in PHASES}
+
+
+# --- Driver ---
+def _run_task(args):
+    phase, plan, start, stop = args
+    _prepare_connection()
+    with manual_timestamps(*TIMESTAMPED_MODELS):
+        return PHASE_FUNCTIONS[phase](plan, start, stop)
+
+
+def reserve_ids(plan):
+    """Start every generated id past the rows already in each table."""
+    tables = {
+        'user': User, 'vendor': VendorProfile, 'product': Product, 'variant': ProductVariant,
+        'cart': Cart, 'order': Order, 'wishlist': Wishlist,
+    }
+    for key, model in tables.items():
+        plan.offsets[key] = (model.objects.aggregate(top=Max('id'))['top'] or 0) + 1
+    # Re-running with the same seed on a non-empty database must not collide on
+    # unique business names, which unlike emails and slugs do not embed the seed.
+    plan.seed_in_names = VendorProfile.objects.exists()
+
+
+def generate(plan, workers=1, log=None, chunk_size=None):
+    """
+    Generate the dataset described by ``plan``. ``log`` receives progress lines.
+    Returns a {model label: rows written} dict.
+    """
+    log = log or (lambda message: None)
+    started = time.perf_counter()
+    plan.passwords = {
+        # Hashing is deliberately slow; do it once and share the hash
+        'vendor': make_password('vendor123'),
+        'customer': make_password('customer123'),
+    }
+    reserve_ids(plan)
+    build_categories(plan)
+    log(f"Categories ready ({sum(len(ids) for ids in plan.leaf_categories.values())} leaves)")
+
+    totals = {}
+    for phase, function, size in PHASES:
+        phase_started = time.perf_counter()
+        total = size(plan)
+        step = chunk_size or max(1, min(1000 if phase != 'catalogue' else 20, -(-total // (workers * 4))))
+        tasks = [(phase, plan, start, min(start + step, total)) for start in range(0, total, step)]
+        if workers > 1 and len(tasks) > 1:
+            # Children must open their own connections rather than inherit ours
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with context.Pool(workers) as pool:
+                results = list(pool.imap_unordered(_run_task, tasks))
+        else:
+            results = [_run_task(task) for task in tasks]
+        for result in results:
+            for label, count in result.items():
+                totals[label] = totals.get(label, 0) + count
+        log(f"{phase}: {len(tasks)} slices in {time.perf_counter() - phase_started:.1f}s")
+
+    _reset_sequences()
+    # Orders were bulk-inserted; roll up the new vendors' sales in one pass
+    vendor_ids = [plan.vendor_id(v) for v in range(plan.vendors)]
+    totals[VendorDailySales._meta.label] = rebuild_daily_sales(vendor_ids)
+    # Likewise the variants generated with low stock need their alerts opened
+    totals[LowStockAlert._meta.label] = refresh_low_stock(vendor_ids)
+    log(f"Finished in {time.perf_counter() - started:.1f}s")
+    return totals
+
+
+def _reset_sequences():
+    """Explicit ids bypass sequences on backends that have them (e.g. PostgreSQL)."""
+    models = [
+        User, UserProfile, Address, VendorProfile, Category, Product, ProductVariant,
+        ProductImage, ProductReview, Cart, CartItem, Order, OrderItem, Wishlist,
+    ]
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
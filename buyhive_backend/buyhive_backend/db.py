@@ -0,0 +1,56 @@
+# buyhive_backend/db.py
+"""
+Retrying writes that lose a race for SQLite's write lock.
+
+With BEGIN IMMEDIATE and a busy timeout (see DATABASES in settings) writers
+queue for the lock, but a writer can still give up with "database is locked"
+once the timeout passes under heavy load. ``retry_on_lock`` reruns such a
+write from the start of its transaction, after a jittered exponential
+backoff so the retries of many writers do not collide again.
+
+BEGIN IMMEDIATE takes the write lock for the whole atomic block, so only
+wrap writes in one; reads made in autocommit never wait for it under WAL.
+"""
+import logging
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connection
+
+logger = logging.getLogger(__name__)
+
+LOCK_MESSAGES = ('database is locked', 'database table is locked')
+
+
+def is_lock_error(exc):
+    return isinstance(exc, OperationalError) and any(message in str(exc) for message in LOCK_MESSAGES)
+
+
+def backoff(attempt):
+    """Seconds to wait before retry number ``attempt`` (from 1): full jitter over an exponential ceiling."""
+    return random.uniform(0, settings.DB_LOCK_RETRY_BASE * 2 ** attempt)
+
+
+def retry_on_lock(function):
+    """
+    Rerun ``function`` up to DB_LOCK_RETRIES times when it fails on a locked
+    database. The function must do all its writes in transactions it opens
+    itself; inside an outer atomic block nothing is retried, because the
+    outer transaction is already broken.
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except OperationalError as exc:
+                attempt += 1
+                if not is_lock_error(exc) or connection.in_atomic_block or attempt > settings.DB_LOCK_RETRIES:
+                    raise
+                delay = backoff(attempt)
+                logger.warning('%s hit a locked database; retry %d in %.3fs', function.__qualname__, attempt, delay)
+                time.sleep(delay)
+    return wrapper
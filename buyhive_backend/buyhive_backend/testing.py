@@ -0,0 +1,215 @@
+# buyhive_backend/testing.py
+"""
+Shared test helpers: lightweight model factories and a query-budget
+assertion used by the per-app API test suites.
+"""
+import itertools
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from apps.accounts.models import User, UserProfile, Address
+from apps.vendors.models import VendorProfile
+from apps.products.models import Category, InventoryMovement, Product, ProductVariant, ProductImage, ProductReview
+from apps.orders.models import Cart, CartItem, Order, OrderItem
+from apps.orders.sales import record_orders
+
+_sequence = itertools.count(1)
+
+# Hashing a real password costs ~0.3s with the default hasher, so factory
+# users get an unusable password unless a test explicitly asks for one.
+UNUSABLE_PASSWORD = '!'
+
+
+def _next():
+    return next(_sequence)
+
+
+# --- Factories ---
+def make_user(**fields):
+    n = _next()
+    fields.setdefault('email', f'user{n}@example.com')
+    fields.setdefault('first_name', 'Test')
+    fields.setdefault('last_name', f'User{n}')
+    password = fields.pop('password', None)
+    user = User(**fields)
+    if password:
+        user.set_password(password)
+    else:
+        user.password = UNUSABLE_PASSWORD
+    user.save()
+    UserProfile.objects.create(user=user)
+    return user
+
+
+def make_vendor(user=None, **fields):
+    user = user or make_user(is_vendor=True)
+    n = _next()
+    fields.setdefault('business_name', f'Vendor {n}')
+    fields.setdefault('description', 'Test vendor')
+    fields.setdefault('is_approved', True)
+    return VendorProfile.objects.create(user=user, **fields)
+
+
+def make_category(parent=None, **fields):
+    n = _next()
+    fields.setdefault('name', f'Category {n}')
+    fields.setdefault('slug', f'category-{n}')
+    return Category.objects.create(parent=parent, **fields)
+
+
+def make_product(vendor, category, variants=2, images=1, reviewers=(), **fields):
+    n = _next()
+    fields.setdefault('title', f'Product {n}')
+    fields.setdefault('slug', f'product-{n}')
+    fields.setdefault('base_price', Decimal('100.00'))
+    product = Product.objects.create(vendor=vendor, category=category, **fields)
+    ProductVariant.objects.bulk_create([
+        ProductVariant(
+            product=product,
+            name=f'Variant {i}',
+            sku=f'SKU-{n}-{i}',
+            price_modifier=Decimal(i * 5),
+            stock=50,
+        )
+        for i in range(variants)
+    ])
+    InventoryMovement.objects.bulk_create([  # bulk_create sends no signals
+        InventoryMovement(variant_id=pk, delta=stock, reason='initial')
+        for pk, stock in product.variants.values_list('pk', 'stock')
+    ])
+    ProductImage.objects.bulk_create([
+        ProductImage(
+            product=product,
+            image=f'product_images/placeholder-{n}-{i}.jpg',
+            is_primary=(i == 0),
+        )
+        for i in range(images)
+    ])
+    ProductReview.objects.bulk_create([
+        ProductReview(product=product, user=user, rating=(i % 5) + 1, comment='Nice')
+        for i, user in enumerate(reviewers)
+    ])
+    return product
+
+
+def make_address(user, **fields):
+    fields.setdefault('street_address', '1 Test Street')
+    fields.setdefault('city', 'Testville')
+    fields.setdefault('state', 'TS')
+    fields.setdefault('zip_code', '00000')
+    fields.setdefault('country', 'Testland')
+    fields.setdefault('address_type', 'shipping')
+    return Address.objects.create(user=user, **fields)
+
+
+def fill_cart(user, variants, quantity=1):
+    """Put one line per variant into the user's cart."""
+    cart, created = Cart.objects.get_or_create(user=user)
+    CartItem.objects.bulk_create([
+        CartItem(cart=cart, product_id=variant.product_id, variant=variant, quantity=quantity)
+        for variant in variants
+    ])
+    cache.delete(Cart.summary_cache_key(user.pk))  # bulk_create sends no signals
+    return cart
+
+
+def make_order(customer, vendor, variants, status='processing', quantity=1):
+    order = Order.objects.create(
+        customer=customer,
+        vendor=vendor,
+        total_amount=Decimal('0.01'),
+        status=status,
+        payment_method='Mock Payment Gateway',
+        payment_status='completed',
+        shipping_address_text='1 Test Street, Testville',
+    )
+    items = [
+        OrderItem(
+            order=order,
+            product_id=variant.product_id,
+            variant=variant,
+            quantity=quantity,
+            price_at_purchase=Decimal('100.00'),
+        )
+        for variant in variants
+    ]
+    OrderItem.objects.bulk_create(items)
+    order.total_amount = sum(item.get_total for item in items) or Decimal('0.01')
+    order.save(update_fields=['total_amount'])
+    record_orders([(order, items)])
+    return order
+
+
+def seed_marketplace(vendors=3, products_per_vendor=10, variants=3, images=2,
+                     reviews=3, customers=3, orders_per_customer=3):
+    """
+    Build a small but realistic marketplace: several approved vendors, each
+    with a full catalogue, reviewed products and order history. Sizes are
+    chosen so list endpoints return full pages, which is what exposes
+    per-row queries.
+    """
+    category = make_category()
+    for _ in range(3):
+        make_category(parent=category)
+    customer_users = [make_user() for _ in range(customers)]
+    reviewers = customer_users[:reviews]
+    vendor_profiles = [make_vendor() for _ in range(vendors)]
+    products = [
+        make_product(vendor, category, variants=variants, images=images, reviewers=reviewers)
+        for vendor in vendor_profiles
+        for _ in range(products_per_vendor)
+    ]
+    for customer in customer_users:
+        make_address(customer, is_default=True)
+        for vendor in vendor_profiles:
+            vendor_variants = list(
+                ProductVariant.objects.filter(product__vendor=vendor)[:orders_per_customer]
+            )
+            for _ in range(orders_per_customer):
+                make_order(customer, vendor, vendor_variants)
+    return {
+        'category': category,
+        'customers': customer_users,
+        'vendors': vendor_profiles,
+        'products': products,
+    }
+
+
+# --- Query budgets ---
+class QueryBudgetTestCase(APITestCase):
+    """
+    APITestCase with an assertion that fails when a request runs more SQL
+    statements than its declared budget, printing every statement executed.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Budgets assume a cold cache; ids are reused between tests
+        cache.clear()
+
+    def assertQueryBudget(self, budget, method, url_name, *, args=None, kwargs=None,
+                          data=None, format='json', user=None, expected_status=None, **extra):
+        url = url_name if url_name.startswith('/') else reverse(url_name, args=args, kwargs=kwargs)
+        if user is not None:
+            self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method.lower())(url, data=data, format=format, **extra)
+        if expected_status is not None:
+            self.assertEqual(
+                response.status_code, expected_status,
+                f'{method.upper()} {url} returned {response.status_code}: {getattr(response, "data", "")}'
+            )
+        executed = len(ctx.captured_queries)
+        if executed > budget:
+            statements = '\n'.join(
+                f'{i}. {query["sql"]}' for i, query in enumerate(ctx.captured_queries, start=1)
+            )
+            self.fail(
+                f'{method.upper()} {url} ran {executed} queries, budget is {budget}:\n{statements}'
+            )
+        return response
@@ -20,10 +20,8 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenRefreshView
+from apps.accounts.views import LoginView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -36,7 +34,7 @@ urlpatterns = [
     path('api/wishlist/', include('apps.wishlists.urls')),
     
     # JWT Token URLs
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/', LoginView.as_view(), name='token_obtain_pair'),  # [UPDATED] Also merges the guest cart
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 ]
 
@@ -8,6 +8,8 @@ const OrderHistoryPage = () => {
   const location = useLocation();
   const { isAuthenticated } = useAuth();
   const [orders, setOrders] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
 
@@ -36,9 +38,9 @@ const OrderHistoryPage = () => {
       const response = await ordersAPI.getOrders();
       console.log('Orders response:', response.data);
       
-      // Handle pagination like other APIs
-      const ordersData = response.data.results || response.data;
-      setOrders(ordersData);
+      // Pages are cursor-based: keep the link to the next one for "Load more"
+      setOrders(response.data.results);
+      setNextPage(response.data.next);
       
     } catch (error) {
       console.error('Failed to fetch orders:', error);
@@ -48,6 +50,20 @@ const OrderHistoryPage = () => {
     }
   };
 
+  const loadMoreOrders = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await ordersAPI.getOrders(nextPage);
+      setOrders(prev => [...prev, ...response.data.results]);
+      setNextPage(response.data.next);
+    } catch (error) {
+      console.error('Failed to load more orders:', error);
+      setError('Failed to load more orders');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Status color mapping based on your backend ORDER_STATUS_CHOICES
   const getStatusColor = (status) => {
     switch (status) {
@@ -208,7 +224,7 @@ const OrderHistoryPage = () => {
                           ${formatPrice(order.total_amount)}
                         </p>
                         <p className="text-sm text-neutral-600">
-                          {order.items.length} item{order.items.length !== 1 ? 's' : ''}
+                          {order.items_count} item{order.items_count !== 1 ? 's' : ''}
                         </p>
                       </div>
                       <Link
@@ -224,7 +240,7 @@ const OrderHistoryPage = () => {
                 {/* Order Items Preview */}
                 <div className="p-6">
                   <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 gap-4">
-                    {order.items.slice(0, 3).map((item, index) => (
+                    {order.preview_items.map((item, index) => (
                       <div key={index} className="flex items-center space-x-3">
                         <div className="w-12 h-12 bg-gradient-warm rounded-lg flex items-center justify-center flex-shrink-0">
                           <div className="w-6 h-6 bg-primary-600 rounded-full flex items-center justify-center">
@@ -246,9 +262,9 @@ const OrderHistoryPage = () => {
                         </div>
                       </div>
                     ))}
-                    {order.items.length > 3 && (
+                    {order.items_count > 3 && (
                       <div className="flex items-center justify-center text-sm text-neutral-500">
-                        +{order.items.length - 3} more item{order.items.length - 3 !== 1 ? 's' : ''}
+                        +{order.items_count - 3} more item{order.items_count - 3 !== 1 ? 's' : ''}
                       </div>
                     )}
                   </div>
@@ -285,6 +301,17 @@ const OrderHistoryPage = () => {
                 </div>
               </div>
             ))}
+            {nextPage && (
+              <div className="text-center">
+                <button
+                  onClick={loadMoreOrders}
+                  disabled={loadingMore}
+                  className="bg-primary-800 text-cream-100 px-6 py-3 rounded-lg font-medium hover:bg-primary-900 transition-colors duration-200 disabled:opacity-50"
+                >
+                  {loadingMore ? 'Loading...' : 'Load more orders'}
+                </button>
+              </div>
+            )}
           </div>
         ) : (
           /* Empty State */
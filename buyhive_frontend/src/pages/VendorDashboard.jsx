@@ -32,6 +32,7 @@ const VendorDashboard = () => {
 
   // Products data
   const [products, setProducts] = useState([]);
+  const [productsNext, setProductsNext] = useState(null);
   const [productsLoading, setProductsLoading] = useState(false);
   const [productFilters, setProductFilters] = useState({
     status: 'all',
@@ -40,6 +41,7 @@ const VendorDashboard = () => {
 
   // Orders data
   const [orders, setOrders] = useState([]);
+  const [ordersNext, setOrdersNext] = useState(null);
   const [ordersLoading, setOrdersLoading] = useState(false);
   const [orderFilters, setOrderFilters] = useState({
     status: 'all',
@@ -113,8 +115,14 @@ const VendorDashboard = () => {
   setShowProductModal(true);
 };
 
-const handleEditProduct = (product) => {
-  setEditingProduct(product);
+const handleEditProduct = async (product) => {
+  // The management list has no variants; load them so the form sends each variant's id
+  try {
+    const response = await productsAPI.detail(product.id);
+    setEditingProduct({ ...response.data, is_active: product.is_active });
+  } catch (error) {
+    setEditingProduct(product);
+  }
   setShowProductModal(true);
 };
 
@@ -177,14 +185,27 @@ const handleProductModalSuccess = () => {
       const response = await vendorsAPI.getProductsManage(productFilters);
       console.log('Products response:', response.data);
       setProducts(response.data.products || []);
+      setProductsNext(response.data.next);
     } catch (error) {
       console.error('Failed to fetch products:', error);
       setProducts([]);
+      setProductsNext(null);
     } finally {
       setProductsLoading(false);
     }
   };
 
+  // The listing is cursor-paginated; append the page behind the last `next` link
+  const loadMoreProducts = async () => {
+    try {
+      const response = await vendorsAPI.getProductsManage(productFilters, productsNext);
+      setProducts(prev => [...prev, ...(response.data.products || [])]);
+      setProductsNext(response.data.next);
+    } catch (error) {
+      console.error('Failed to load more products:', error);
+    }
+  };
+
   const fetchOrders = async () => {
     try {
       setOrdersLoading(true);
@@ -192,14 +213,26 @@ const handleProductModalSuccess = () => {
       const response = await vendorsAPI.getOrdersManage(orderFilters);
       console.log('Orders response:', response.data);
       setOrders(response.data.orders || []);
+      setOrdersNext(response.data.next);
     } catch (error) {
       console.error('Failed to fetch orders:', error);
       setOrders([]);
+      setOrdersNext(null);
     } finally {
       setOrdersLoading(false);
     }
   };
 
+  const loadMoreOrders = async () => {
+    try {
+      const response = await vendorsAPI.getOrdersManage(orderFilters, ordersNext);
+      setOrders(prev => [...prev, ...(response.data.orders || [])]);
+      setOrdersNext(response.data.next);
+    } catch (error) {
+      console.error('Failed to load more orders:', error);
+    }
+  };
+
   const handleOrderStatusUpdate = async (orderIds, newStatus, trackingNumber = '') => {
     try {
       console.log('Updating order status...', { orderIds, newStatus, trackingNumber });
@@ -617,6 +650,16 @@ const handleProductModalSuccess = () => {
       ))}
     </tbody>
   </table>
+  {productsNext && (
+    <div className="text-center py-4">
+      <button
+        onClick={loadMoreProducts}
+        className="bg-primary-800 text-cream-100 px-6 py-2 rounded-lg font-medium hover:bg-primary-900 transition-colors duration-200"
+      >
+        Load more products
+      </button>
+    </div>
+  )}
 </div>
             ) : (
               <div className="text-center py-16">
@@ -756,6 +799,16 @@ const handleProductModalSuccess = () => {
                     ))}
                   </tbody>
                 </table>
+                {ordersNext && (
+                  <div className="text-center py-4">
+                    <button
+                      onClick={loadMoreOrders}
+                      className="bg-primary-800 text-cream-100 px-6 py-2 rounded-lg font-medium hover:bg-primary-900 transition-colors duration-200"
+                    >
+                      Load more orders
+                    </button>
+                  </div>
+                )}
               </div>
             ) : (
               <div className="text-center py-16">
@@ -180,7 +180,8 @@ export const ordersAPI = {
   updateCartItem: (itemId, data) => api.patch(`/orders/cart/items/${itemId}/`, data),
   removeFromCart: (itemId) => api.delete(`/orders/cart/items/${itemId}/`),
   checkout: (checkoutData) => api.post('/orders/checkout/', checkoutData),
-  getOrders: () => api.get('/orders/customer-orders/'),
+  // Cursor-paginated: pass a page's `next` link to load the page after it
+  getOrders: (nextUrl) => api.get(nextUrl || '/orders/customer-orders/'),
   getOrderDetail: (orderId) => api.get(`/orders/customer-orders/${orderId}/`),
 };
 
@@ -220,11 +221,15 @@ export const vendorsAPI = {
     }
   },
   getAnalytics: () => api.get('/vendors/analytics/'),
-  getProductsManage: (filters = {}) => {
+  // Cursor-paginated: pass a page's `next` link as nextUrl to load the page after it
+  getProductsManage: (filters = {}, nextUrl = null) => {
+    if (nextUrl) return api.get(nextUrl);
     const queryString = new URLSearchParams(filters).toString();
     return api.get(`/vendors/products/manage/${queryString ? '?' + queryString : ''}`);
   },
-  getOrdersManage: (filters = {}) => {
+  // Cursor-paginated like getProductsManage
+  getOrdersManage: (filters = {}, nextUrl = null) => {
+    if (nextUrl) return api.get(nextUrl);
     const queryString = new URLSearchParams(filters).toString();
     return api.get(`/vendors/orders/manage/${queryString ? '?' + queryString : ''}`);
   },